@@ -0,0 +1,592 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized NumPy evaluation of the NFDRS V4 indexes (ERC, SC, BI and IC).
+
+The calculations mirror NFDRSV4Calc.iCalcIndexes branch for branch so that
+many station-days can be computed in a single call.  Every branch of the
+scalar code is expressed as a masked selection over the input arrays.
+
+"""
+
+import numpy as np
+
+import NFDRSV4Instrument
+
+from NFDRSV4Calc import (CTA, ETASD, ETASL, KBDIThreshold, RHOD, RHOL, STD, STL,
+                         FuelModelCodes, FuelModelFields, USNFDRSFuelModel)
+
+PNORM1 = 0.00232
+PNORM2 = 0.99767
+
+## \var MoistureFields Fuel moisture attributes used by the index calculations
+MoistureFields = ("MC1", "MC10", "MC100", "MC1000", "MCHERB", "MCWOOD")
+
+
+## \var FuelMoistureDtype Record layout of FuelMoistureArray (one float64 field per moisture class)
+FuelMoistureDtype = np.dtype([(Name.lower(), np.float64) for Name in MoistureFields])
+
+
+## \fn _Field Fetch a named field from a mapping, DataFrame, structured array or object
+def _Field(Obj, Name):
+    try:
+        return Obj[Name]
+    except (TypeError, KeyError, IndexError, ValueError):
+        pass
+    # Structured arrays with FuelMoistureDtype name their fields in lower case
+    Names = getattr(getattr(Obj, "dtype", None), "names", None)
+    if Names and Name.lower() in Names:
+        return Obj[Name.lower()]
+    return getattr(Obj, Name)
+
+
+## \class FuelMoistureArray
+## \brief Fuel moistures of many days / stations in one contiguous FuelMoistureDtype buffer
+##
+## Slices are views of the same buffer.  Fields are read as MC["MC1"] (or MC.MC1), which
+## is a strided view, so the batch functions take a FuelMoistureArray as their MC argument
+## without copying.  Indexing a single element gives a record that iCalcIndexes accepts.
+class FuelMoistureArray:
+    __slots__ = ("Data",)
+
+    ## \fn __init__
+    ## \param Data A shape (zero filled), a FuelMoistureDtype array (used without copying)
+    ## or a sequence of (MC1, MC10, MC100, MC1000, MCHERB, MCWOOD) tuples
+    def __init__(self, Data=0):
+        if isinstance(Data, (int, np.integer)) or (isinstance(Data, tuple) and
+                                                   all(isinstance(n, (int, np.integer)) for n in Data)):
+            Data = np.zeros(Data, dtype=FuelMoistureDtype)
+        elif not (isinstance(Data, np.ndarray) and Data.dtype == FuelMoistureDtype):
+            Data = np.array([tuple(x) for x in Data], dtype=FuelMoistureDtype)
+        self.Data = Data
+
+    ## \fn FromFields Pack fuel moistures from a mapping, DataFrame or FuelMoisture-like object
+    ## \param MC Source of MC1..MCWOOD (values or arrays, broadcast against each other)
+    @classmethod
+    def FromFields(cls, MC):
+        Columns = np.broadcast_arrays(*[_AsFloat(_Field(MC, Name)) for Name in MoistureFields])
+        Data = np.empty(Columns[0].shape, dtype=FuelMoistureDtype)
+        for Field, x in zip(FuelMoistureDtype.names, Columns):
+            Data[Field] = x
+        return cls(Data)
+
+    @property
+    def shape(self):
+        return self.Data.shape
+
+    def __len__(self):
+        return len(self.Data)
+
+    ## \fn __getitem__ A field by name ("MC1" or "mc1"), a record for a single element, or a view
+    def __getitem__(self, Key):
+        if isinstance(Key, str):
+            return self.Data[Key.lower()]
+        Item = self.Data[Key]
+        return FuelMoistureArray(Item) if isinstance(Item, np.ndarray) else Item
+
+    def __setitem__(self, Key, Value):
+        if isinstance(Key, str):
+            Key = Key.lower()
+        elif isinstance(Value, FuelMoistureArray):
+            Value = Value.Data
+        self.Data[Key] = Value
+
+    def __repr__(self):
+        return "FuelMoistureArray(%r)" % (self.Data,)
+
+    ## \fn Columns The six moisture fields as views, in MoistureFields order
+    def Columns(self):
+        return tuple(self.Data[Field] for Field in FuelMoistureDtype.names)
+
+
+for _Name in MoistureFields:
+    setattr(FuelMoistureArray, _Name, property(lambda self, _f=_Name.lower(): self.Data[_f]))
+del _Name
+
+
+## \fn _AsFloat Convert a scalar, list, Series or array to a float64 array
+def _AsFloat(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+## \var FuelModelTable Read-only structured array of fuel model parameters.
+## Row i holds FuelModelCodes[i]; the last row (SlashIndex) is the Slash model
+## used for any code that is not in the table.
+FuelModelTable = np.array([USNFDRSFuelModel(Code).Params() for Code in FuelModelCodes] +
+                          [USNFDRSFuelModel("").Params()],
+                          dtype=[(Name, np.float64) for Name in FuelModelFields])
+FuelModelTable.flags.writeable = False
+SlashIndex = len(FuelModelCodes)
+_CodeIndex = {Code: i for i, Code in enumerate(FuelModelCodes)}
+
+
+## \fn FuelModelIndex Map fuel model codes to rows of FuelModelTable
+## \param FMCodes A code or array of codes (case-insensitive)
+## \return int array of FuelModelTable row indexes, same shape as FMCodes
+def FuelModelIndex(FMCodes):
+    Codes, Inverse = np.unique(np.asarray(FMCodes, dtype=str), return_inverse=True)
+    Rows = np.array([_CodeIndex.get(Code.upper(), SlashIndex) for Code in Codes], dtype=np.intp)
+    return Rows[Inverse].reshape(np.shape(FMCodes))
+
+
+## \fn GatherFuelParams Gather fuel model parameters for an array of table indexes
+## \param Index int array of FuelModelTable rows (see FuelModelIndex)
+## \return dict of parameter name to array shaped like Index
+def GatherFuelParams(Index):
+    Rows = FuelModelTable[np.asarray(Index, dtype=np.intp)]
+    return {Name: Rows[Name] for Name in FuelModelFields}
+
+
+## \fn FuelParams Collect the fuel model parameters needed by the batch engine
+## \param FM A USNFDRSFuelModel, an FMCode, an array of FMCodes or of FuelModelTable
+## indexes (mixed fuel models), or any object / mapping with the fuel model attributes
+## \return dict of parameter name to value
+def FuelParams(FM):
+    if isinstance(FM, str):
+        FM = USNFDRSFuelModel(FM)
+    elif isinstance(FM, (list, tuple, np.ndarray)):
+        FM = np.asarray(FM)
+        if FM.dtype.kind in "iu":
+            return GatherFuelParams(FM)
+        return GatherFuelParams(FuelModelIndex(FM))
+    return {Name: _Field(FM, Name) for Name in FuelModelFields}
+
+
+## \fn SlopeFactor Slope class to slope factor, any class outside 1-5 uses class 1
+def SlopeFactor(iSlopeCls):
+    iSlopeCls = np.asarray(iSlopeCls)
+    return np.select([iSlopeCls == 2, iSlopeCls == 3, iSlopeCls == 4, iSlopeCls == 5],
+                     [0.533, 1.068, 2.134, 4.273], 0.267)
+
+
+## \fn StageDrought Fuel loads after the KBDI drought-load transfer
+## \param P Fuel model parameters (see FuelParams)
+## \param KBDI Keetch-Byram Drought Index
+## \return dict of adjusted loads, fuel bed depth and packing ratio
+def StageDrought(P, KBDI):
+    KBDI = _AsFloat(KBDI)
+    W1 = P["L1"] * CTA
+    W10 = P["L10"] * CTA
+    W100 = P["L100"] * CTA
+    W1000 = P["L1000"] * CTA
+    WWOOD = P["LWOOD"] * CTA
+    WHERB = P["LHERB"] * CTA
+    WDROUGHT = P["DROUGHT"] * CTA
+    fDEPTH = P["DEPTH"]
+
+    Dry = KBDI > KBDIThreshold
+    WTOTD = W1 + W10 + W100
+    WTOTL = WHERB + WWOOD
+    WTOT = WTOTD + WTOTL
+    PackingRatio = WTOT / fDEPTH
+    PackingRatio = np.where(PackingRatio == 0, 1.0, PackingRatio)
+    WTOTD = WTOTD + W1000
+
+    DroughtUnit = WDROUGHT / (800.0 - KBDIThreshold)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        DW1 = W1 + (W1 / WTOTD) * (KBDI - 100) * DroughtUnit
+        DW10 = W10 + (W10 / WTOTD) * (KBDI - 100) * DroughtUnit
+        DW100 = W100 + (W100 / WTOTD) * (KBDI - 100) * DroughtUnit
+        DW1000 = W1000 + (W1000 / WTOTD) * (KBDI - 100) * DroughtUnit
+        DWTOT = DW1 + DW10 + DW100 + DW1000 + WTOTL
+        DDEPTH = (DWTOT - DW1000) / PackingRatio
+
+    return {"W1": np.where(Dry, DW1, W1),
+            "W10": np.where(Dry, DW10, W10),
+            "W100": np.where(Dry, DW100, W100),
+            "W1000": np.where(Dry, DW1000, W1000),
+            "WWOOD": WWOOD,
+            "WHERB": WHERB,
+            "fDEPTH": np.where(Dry, DDEPTH, fDEPTH),
+            "PackingRatio": PackingRatio,
+            "Dry": Dry}
+
+
+## \fn StageFuelBed Moisture-independent fuel bed terms (herbaceous transfer, surface area weights)
+## \param P Fuel model parameters (see FuelParams)
+## \param D Output of StageDrought
+## \param MCHERB Herbaceous fuel moisture (drives the herbaceous curing transfer)
+## \return dict of fuel bed terms consumed by StageMoisture and StageSpread
+def StageFuelBed(P, D, MCHERB):
+    SG1 = P["SG1"]
+    SG10 = P["SG10"]
+    SG100 = P["SG100"]
+    SG1000 = P["SG1000"]
+    SGWOOD = P["SGWOOD"]
+    SGHERB = P["SGHERB"]
+    W10 = D["W10"]
+    W100 = D["W100"]
+    W1000 = D["W1000"]
+    WWOOD = D["WWOOD"]
+    WHERB = D["WHERB"]
+
+    # Herbaceous transfer to the 1hr class
+    fctCur = np.clip(1.33 - .0111 * _AsFloat(MCHERB), 0.0, 1.0)
+    W1P = D["W1"] + WHERB * fctCur
+    WHERBP = WHERB * (1 - fctCur)
+
+    WTOTD = W1P + W10 + W100 + W1000
+    WTOTL = WHERBP + WWOOD
+    WTOT = WTOTD + WTOTL
+
+    W1N = W1P * (1.0 - STD)
+    W10N = W10 * (1.0 - STD)
+    W100N = W100 * (1.0 - STD)
+    WHERBN = WHERBP * (1.0 - STL)
+    WWOODN = WWOOD * (1.0 - STL)
+    WTOTLN = WTOTL * (1.0 - STL)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        RHOBED = (WTOT - W1000) / D["fDEPTH"]
+        RHOBAR = ((WTOTL * RHOL) + (WTOTD * RHOD)) / WTOT
+        BETBAR = RHOBED / RHOBAR
+
+        # Terms of the live fuel moisture of extinction that do not depend on moisture
+        EX1 = np.exp(-138.0 / SG1)
+        EX10 = np.exp(-138.0 / SG10)
+        EX100 = np.exp(-138.0 / SG100)
+        HN1 = W1N * EX1
+        HN10 = W10N * EX10
+        HN100 = W100N * EX100
+        HNHERB = np.where((-500 / SGHERB) < -180.218, 0, WHERBN * np.exp(-500.0 / SGHERB))
+        HNWOOD = np.where((-500 / SGWOOD) < -180.218, 0, WWOODN * np.exp(-500.0 / SGWOOD))
+        HNLIVE = HNHERB + HNWOOD
+        WRAT = np.where(HNLIVE == 0, 0, (HN1 + HN10 + HN100) / HNLIVE)
+
+        SA1 = (W1P / RHOD) * SG1
+        SA10 = (W10 / RHOD) * SG10
+        SA100 = (W100 / RHOD) * SG100
+        SAHERB = (WHERBP / RHOL) * SGHERB
+        SAWOOD = (WWOOD / RHOL) * SGWOOD
+        SADEAD = SA1 + SA10 + SA100
+        SALIVE = SAHERB + SAWOOD
+
+        F1 = SA1 / SADEAD
+        F10 = SA10 / SADEAD
+        F100 = SA100 / SADEAD
+        NoLive = WTOTL <= 0
+        FHERB = np.where(NoLive, 0, SAHERB / SALIVE)
+        FWOOD = np.where(NoLive, 0, SAWOOD / SALIVE)
+        FDEAD = SADEAD / (SADEAD + SALIVE)
+        FLIVE = SALIVE / (SADEAD + SALIVE)
+        WDEADN = (F1 * W1N) + (F10 * W10N) + (F100 * W100N)
+        WLIVEN = np.where((SGWOOD > 1200) & (SGHERB > 1200), WTOTLN,
+                          (FWOOD * WWOODN) + (FHERB * WHERBN))
+
+        SGBRD = (F1 * SG1) + (F10 * SG10) + (F100 * SG100)
+        SGBRL = (FHERB * SGHERB) + (FWOOD * SGWOOD)
+        SGBRT = (FDEAD * SGBRD) + (FLIVE * SGBRL)
+        BETOP = 3.348 * SGBRT ** -0.8189
+        GMAMX = SGBRT ** 1.5 / (495.0 + 0.0594 * SGBRT ** 1.5)
+        AD = 133 * SGBRT ** -0.7913
+        GMAOP = GMAMX * (BETBAR / BETOP) ** AD * np.exp(AD * (1.0 - (BETBAR / BETOP)))
+        ZETA = np.exp((0.792 + 0.681 * SGBRT ** 0.5) * (BETBAR + 0.1))
+        ZETA = ZETA / (192.0 + 0.2595 * SGBRT)
+
+        B = 0.02526 * SGBRT ** 0.54
+        C = 7.47 * np.exp(-0.133 * SGBRT ** 0.55)
+        E = 0.715 * np.exp(-3.59 * 10.0 ** -4.0 * SGBRT)
+        UFACT = C * (BETBAR / BETOP) ** (-1 * E)
+
+        # Energy release component weights (loading weighted)
+        F1E = W1P / WTOTD
+        F10E = W10 / WTOTD
+        F100E = W100 / WTOTD
+        F1000E = W1000 / WTOTD
+        FHERBE = np.where(NoLive, 0, WHERBP / WTOTL)
+        FWOODE = np.where(NoLive, 0, WWOOD / WTOTL)
+        FDEADE = WTOTD / WTOT
+        FLIVEE = WTOTL / WTOT
+        WDEDNE = WTOTD * (1.0 - STD)
+        WLIVNE = WTOTL * (1.0 - STL)
+        SGBRDE = (F1E * SG1) + (F10E * SG10) + (F100E * SG100) + (F1000E * SG1000)
+        SGBRLE = (FHERBE * SGHERB) + (FWOODE * SGWOOD)
+        SGBRTE = (FDEADE * SGBRDE) + (FLIVEE * SGBRLE)
+        BETOPE = 3.348 * SGBRTE ** -0.8189
+        GMAMXE = SGBRTE ** 1.5 / (495.0 + 0.0594 * SGBRTE ** 1.5)
+        ADE = 133 * SGBRTE ** -0.7913
+        GMAOPE = GMAMXE * (BETBAR / BETOPE) ** ADE * np.exp(ADE * (1.0 - (BETBAR / BETOPE)))
+        TAU = 384.0 / SGBRT
+
+    return {"Live": WTOTLN > 0, "Empty": SADEAD <= 0,
+            "HN1": HN1, "HN10": HN10, "HN100": HN100, "WRAT": WRAT,
+            "EX1": EX1, "EX10": EX10, "EX100": EX100,
+            "EXHERB": np.exp(-138.0 / SGHERB), "EXWOOD": np.exp(-138.0 / SGWOOD),
+            "F1": F1, "F10": F10, "F100": F100, "FHERB": FHERB, "FWOOD": FWOOD,
+            "FDEAD": FDEAD, "FLIVE": FLIVE, "WDEADN": WDEADN, "WLIVEN": WLIVEN,
+            "RHOBED": RHOBED, "BETBAR": BETBAR, "GMAOP": GMAOP, "ZETA": ZETA,
+            "B": B, "UFACT": UFACT,
+            "F1E": F1E, "F10E": F10E, "F100E": F100E, "F1000E": F1000E,
+            "FHERBE": FHERBE, "FWOODE": FWOODE, "FDEADE": FDEADE, "FLIVEE": FLIVEE,
+            "WDEDNE": WDEDNE, "WLIVNE": WLIVNE, "GMAOPE": GMAOPE, "TAU": TAU}
+
+
+## \fn _Eta Rothermel moisture damping polynomial clamped to [0,1]
+## \param Clamped Optional dict; Clamped[Name] is set to the mask of clamped values
+def _Eta(r, a, b, c, Name=None, Clamped=None):
+    Eta = 1.0 - a * r + b * r ** 2.0 - c * r ** 3.0
+    if Clamped is not None:
+        Clamped[Name] = (Eta < 0.0) | (Eta > 1.0)
+    return np.clip(Eta, 0.0, 1.0)
+
+
+## \fn StageMoisture Moisture dependent terms: live extinction moisture, reaction intensity, heat sink and ERC
+## \param P Fuel model parameters (see FuelParams)
+## \param S Output of StageFuelBed
+## \return dict with IR, HTSINK and ERC
+def StageMoisture(P, S, MC1, MC10, MC100, MC1000, MCHERB, MCWOOD):
+    MXD = P["MXD"]
+    HD = P["HD"]
+    MC1 = _AsFloat(MC1)
+    MC10 = _AsFloat(MC10)
+    MC100 = _AsFloat(MC100)
+    MC1000 = _AsFloat(MC1000)
+    MCHERB = _AsFloat(MCHERB)
+    MCWOOD = _AsFloat(MCWOOD)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Live Fuel Moisture of Extinction
+        HN1 = S["HN1"]
+        HN10 = S["HN10"]
+        HN100 = S["HN100"]
+        MCLFE = ((MC1 * HN1) + (MC10 * HN10) + (MC100 * HN100)) / (HN1 + HN10 + HN100)
+        MXL = np.where(S["Live"], (2.9 * S["WRAT"] * (1.0 - MCLFE / MXD) - 0.226) * 100, 0)
+        MXL = np.where(MXL < MXD, MXD, MXL)
+
+        # Spread component reaction intensity and heat sink
+        F1 = S["F1"]
+        F10 = S["F10"]
+        F100 = S["F100"]
+        FHERB = S["FHERB"]
+        FWOOD = S["FWOOD"]
+        WTMCD = (F1 * MC1) + (F10 * MC10) + (F100 * MC100)
+        WTMCL = (FHERB * MCHERB) + (FWOOD * MCWOOD)
+        # Clamping masks are only kept while instrumentation is enabled
+        Clamped = None if NFDRSV4Instrument.Active is None else {}
+        ETAMD = _Eta(WTMCD / MXD, 2.59, 5.11, 3.52, "ETAMD", Clamped)
+        ETAML = _Eta(WTMCL / MXL, 2.59, 5.11, 3.52, "ETAML", Clamped)
+        IR = S["GMAOP"] * ((S["WDEADN"] * HD * ETASD * ETAMD) + (S["WLIVEN"] * HD * ETASL * ETAML))
+
+        XF1 = F1 * S["EX1"] * (250.0 + 11.16 * MC1)
+        XF10 = F10 * S["EX10"] * (250.0 + 11.16 * MC10)
+        XF100 = F100 * S["EX100"] * (250.0 + 11.16 * MC100)
+        XFHERB = FHERB * S["EXHERB"] * (250.0 + 11.16 * MCHERB)
+        XFWOOD = FWOOD * S["EXWOOD"] * (250.0 + 11.16 * MCWOOD)
+        HTSINK = S["RHOBED"] * (S["FDEAD"] * (XF1 + XF10 + XF100) + S["FLIVE"] * (XFHERB + XFWOOD))
+
+        # Energy Release Component
+        WTMCDE = (S["F1E"] * MC1) + (S["F10E"] * MC10) + (S["F100E"] * MC100) + (S["F1000E"] * MC1000)
+        WTMCLE = (S["FHERBE"] * MCHERB) + (S["FWOODE"] * MCWOOD)
+        ETAMDE = _Eta(WTMCDE / MXD, 2.0, 1.5, 0.5, "ETAMDE", Clamped)
+        ETAMLE = _Eta(WTMCLE / MXL, 2.0, 1.5, 0.5, "ETAMLE", Clamped)
+        IRE = (S["FDEADE"] * S["WDEDNE"] * HD * ETASD * ETAMDE)
+        IRE = S["GMAOPE"] * (IRE + (S["FLIVEE"] * S["WLIVNE"] * (HD) * ETASL * ETAMLE))
+        ERC = 0.04 * IRE * S["TAU"]
+
+    return {"MXL": MXL, "IR": IR, "HTSINK": HTSINK, "ERC": ERC, "Clamped": Clamped}
+
+
+## \fn StageSpread Wind and slope dependent spread component
+## \param P Fuel model parameters (see FuelParams)
+## \param S Output of StageFuelBed
+## \param M Output of StageMoisture
+## \param iWS 20ft wind speed (mph)
+## \param iSlopeCls Slope class (1-5)
+## \return Spread component (unrounded)
+def StageSpread(P, S, M, iWS, iSlopeCls):
+    iWS = _AsFloat(iWS)
+    IR = M["IR"]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        PHIWND = np.where(88.0 * iWS * P["WNDFC"] > 0.9 * IR,
+                          S["UFACT"] * (0.9 * IR) ** S["B"],
+                          S["UFACT"] * (iWS * 88.0 * P["WNDFC"]) ** S["B"])
+        PHISLP = SlopeFactor(iSlopeCls) * S["BETBAR"] ** -0.3
+        return IR * S["ZETA"] * (1.0 + PHISLP + PHIWND) / M["HTSINK"]
+
+
+## \fn StageIgnition Ignition component from the spread component, 1hr moisture and fuel temperature
+## \param P Fuel model parameters (see FuelParams)
+## \param SC Spread component (unrounded)
+## \param MC1 1hr fuel moisture
+## \param FuelTemperature Nelson-derived fuel surface temperature
+## \return Ignition component (unrounded)
+def StageIgnition(P, SC, MC1, FuelTemperature):
+    MC1 = _AsFloat(MC1)
+    TMPPRM = _AsFloat(FuelTemperature)
+    QIGN = 144.5 - (0.266 * TMPPRM) - (0.00058 * TMPPRM * TMPPRM) - (0.01 * TMPPRM * MC1) + 18.54 * (1.0 - np.exp(-0.151 * MC1)) + 6.4 * MC1
+    # QIGN >= 344 gives a negative CHI; the probability of ignition is then zero
+    CHI = np.maximum((344.0 - QIGN) / 10.0, 0.0)
+    PI = np.clip(((CHI ** 3.66 * 0.000923 / 50) - PNORM1) * 100.0 / PNORM2, 0, 100)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        SCN = 100.0 * SC / P["SCM"]
+    SCN = np.where(SCN > 100.0, 100.0, SCN)
+    IC = 0.10 * PI * SCN ** 0.5
+    return np.where(SC < 0.00001, 0, IC)
+
+
+## \fn CalcIndexesFromParams Batch index calculation from a fuel parameter mapping
+## \param P Fuel model parameters (see FuelParams), scalars or arrays broadcastable against the weather
+## \return tuple (ERC, SC, BI, IC) of unrounded float64 arrays
+def CalcIndexesFromParams(P, MC1, MC10, MC100, MC1000, MCHERB, MCWOOD, iWS, iSlopeCls, KBDI, FuelTemperature):
+    Probe = NFDRSV4Instrument.Active
+    if Probe is not None:
+        Probe.Begin("batch")
+    D = StageDrought(P, KBDI)
+    if Probe is not None:
+        Probe.Lap("Drought")
+    return _IndexesFromDrought(P, D, MC1, MC10, MC100, MC1000, MCHERB, MCWOOD, iWS, iSlopeCls, FuelTemperature)
+
+
+## \fn _IndexesFromDrought The stages after StageDrought (D may broadcast against the weather)
+def _IndexesFromDrought(P, D, MC1, MC10, MC100, MC1000, MCHERB, MCWOOD, iWS, iSlopeCls, FuelTemperature):
+    Probe = NFDRSV4Instrument.Active
+    S = StageFuelBed(P, D, MCHERB)
+    if Probe is not None:
+        Probe.Lap("FuelBed")
+    M = StageMoisture(P, S, MC1, MC10, MC100, MC1000, MCHERB, MCWOOD)
+    if Probe is not None:
+        Probe.Lap("Moisture")
+    SC = StageSpread(P, S, M, iWS, iSlopeCls)
+    if Probe is not None:
+        Probe.Lap("Spread")
+    ERC = M["ERC"]
+    with np.errstate(invalid="ignore"):
+        BI = (.301 * (SC * ERC) ** 0.46) * 10.0
+    if Probe is not None:
+        Probe.Lap("BI")
+    IC = StageIgnition(P, SC, MC1, FuelTemperature)
+    if Probe is not None:
+        Probe.Lap("Ignition")
+    # No dead fuel surface area: the scalar code returns 0 for everything
+    Empty = S["Empty"]
+    Out = tuple(np.where(Empty, 0.0, x) for x in np.broadcast_arrays(ERC, SC, BI, IC))
+    if Probe is not None:
+        _CountBranches(Probe, Out[0].shape, P, D, S, M, iWS)
+    return Out
+
+
+## \fn _CountBranches Per-element branch counters of one batch call (instrumentation only)
+def _CountBranches(Probe, Shape, P, D, S, M, iWS):
+    Probe.Count("Cells", int(np.prod(Shape)))
+    Probe.Count("KBDI>Threshold", np.count_nonzero(np.broadcast_to(D["Dry"], Shape)))
+    Probe.Count("SADEAD<=0", np.count_nonzero(np.broadcast_to(S["Empty"], Shape)))
+    for Name, Mask in M["Clamped"].items():
+        Probe.Count(Name + " clamped", np.count_nonzero(np.broadcast_to(Mask, Shape)))
+    Limit = 88.0 * _AsFloat(iWS) * P["WNDFC"] > 0.9 * M["IR"]
+    Probe.Count("PHIWND wind limit", np.count_nonzero(np.broadcast_to(Limit, Shape)))
+
+
+## \fn iCalcIndexesBatch Compute ERC, SC, BI and IC for arrays of station-days
+## \param FM USNFDRSFuelModel, FMCode, or an array of FMCodes / table indexes (see FuelParams)
+## \param MC Fuel moistures: a FuelMoistureArray, or a FuelMoisture-like object, mapping, DataFrame or
+## structured array with MC1..MCWOOD
+## \param iWS 20ft wind speed (mph)
+## \param iSlopeCls Slope class (1-5)
+## \param KBDI Keetch-Byram Drought Index
+## \param FuelTemperature Nelson-derived fuel surface temperature
+## \param Round Decimal places to round to (as the scalar iCalcIndexes does), None for full precision
+## \return tuple (ERC, SC, BI, IC) of float64 arrays broadcast over all inputs
+def iCalcIndexesBatch(FM, MC, iWS, iSlopeCls, KBDI, FuelTemperature, Round=2):
+    P = FuelParams(FM)
+    Out = CalcIndexesFromParams(P, *[_Field(MC, Name) for Name in MoistureFields],
+                                iWS, iSlopeCls, KBDI, FuelTemperature)
+    if Round is not None:
+        Out = tuple(np.round(x, Round) for x in Out)
+    return Out
+
+
+## \fn iCalcIndexesHourly Compute ERC, SC, BI and IC for hourly weather, sharing the daily work
+## \param FM USNFDRSFuelModel, FMCode, or an array of FMCodes / table indexes (see FuelParams)
+## \param MC Fuel moistures; MC1 is hourly, shaped (days, hours, ...)
+## \param iWS, iSlopeCls, FuelTemperature Hourly values (or scalars)
+## \param KBDI Daily KBDI, shaped (days, ...) (or a scalar)
+## \param Round Decimal places to round to, None for full precision
+## \return tuple (ERC, SC, BI, IC) of float64 arrays shaped (days, hours, ...)
+##
+## An input with one dimension fewer than MC1 is a daily value and is used for every hour
+## of its day (typically KBDI, MCHERB and MCWOOD).  The drought load transfer (loads,
+## fDEPTH and packing ratio) is computed once per day, and so are the fuel bed terms when
+## MCHERB is daily; only the moisture, wind and ignition terms are evaluated per hour.
+def iCalcIndexesHourly(FM, MC, iWS, iSlopeCls, KBDI, FuelTemperature, Round=2):
+    Hourly = np.ndim(_Field(MC, "MC1"))
+
+    def PerHour(x):
+        x = _AsFloat(x)
+        return x[:, None] if x.ndim and x.ndim == Hourly - 1 else x
+
+    P = FuelParams(FM)
+    Probe = NFDRSV4Instrument.Active
+    if Probe is not None:
+        Probe.Begin("batch")
+    D = StageDrought(P, PerHour(KBDI))
+    if Probe is not None:
+        Probe.Lap("Drought")
+    Out = _IndexesFromDrought(P, D, *[PerHour(_Field(MC, Name)) for Name in MoistureFields],
+                              PerHour(iWS), PerHour(iSlopeCls), PerHour(FuelTemperature))
+    if Round is not None:
+        Out = tuple(np.round(x, Round) for x in Out)
+    return Out
+
+
+## \var V4FuelModels Fuel models reported by NFDRS V4 products
+V4FuelModels = ("V", "W", "X", "Y", "Z")
+
+## \var ModelChunkCells Day x model cells iCalcIndexesModels evaluates per pass; a pass this
+## size keeps the stage temporaries in cache, where one pass over decades of days does not
+ModelChunkCells = 1 << 14
+
+
+## \fn iCalcIndexesModels Compute ERC, SC, BI and IC for several fuel models over the same weather
+## \param FuelModels Sequence of FMCodes or USNFDRSFuelModel (default V4FuelModels)
+## \param MC, iWS, iSlopeCls, KBDI, FuelTemperature As iCalcIndexesBatch, for one series of days
+## \param Round Decimal places to round to, None for full precision
+## \return tuple (ERC, SC, BI, IC) of float64 arrays shaped (days, models), or (models,)
+## for scalar weather
+##
+## The fuel model parameters are stacked along a trailing axis and the weather gets a length
+## 1 axis there, so terms that only depend on the weather (or only on the fuel model) are
+## computed once and broadcast across the other.  Long series are evaluated in runs of
+## days of about ModelChunkCells cells.
+def iCalcIndexesModels(MC, iWS, iSlopeCls, KBDI, FuelTemperature, FuelModels=V4FuelModels, Round=2):
+    Params = [FuelParams(FM) for FM in FuelModels]
+    P = {Name: np.array([p[Name] for p in Params], dtype=np.float64) for Name in FuelModelFields}
+
+    def PerModel(x):
+        x = _AsFloat(x)
+        return x[..., None] if x.ndim else x
+
+    Weather = ([PerModel(_Field(MC, Name)) for Name in MoistureFields] +
+               [PerModel(iWS), PerModel(iSlopeCls), PerModel(KBDI), PerModel(FuelTemperature)])
+    Shape = np.broadcast_shapes(*(x.shape for x in Weather), (len(Params),))
+    Step = max(1, ModelChunkCells // int(np.prod(Shape[1:])))
+    if len(Shape) == 1 or Shape[0] <= Step:
+        Out = CalcIndexesFromParams(P, *Weather)
+    else:
+        Out = tuple(np.empty(Shape) for _ in range(4))
+        for a in range(0, Shape[0], Step):
+            Part = CalcIndexesFromParams(P, *[x[a:a + Step] if x.ndim == len(Shape) and len(x) > 1 else x
+                                              for x in Weather])
+            for o, x in zip(Out, Part):
+                o[a:a + Step] = x
+    if Round is not None:
+        Out = tuple(np.round(x, Round) for x in Out)
+    return Out
+
+
+## \fn iCalcIndexesFrame Compute the indexes for every row of a DataFrame
+## \param FM USNFDRSFuelModel
+## \param df DataFrame with MC1, MC10, MC100, MC1000, MCHERB and MCWOOD columns
+## \param iWS Wind speed column name or value
+## \param iSlopeCls Slope class column name or value
+## \param KBDI KBDI column name or value
+## \param FuelTemperature Fuel temperature column name or value
+## \return copy of df with ERC, SC, BI and IC columns added
+def iCalcIndexesFrame(FM, df, iWS="WS", iSlopeCls=1, KBDI="KBDI", FuelTemperature="FuelTemperature", Round=2):
+    Args = [df[x].to_numpy() if isinstance(x, str) else x for x in (iWS, iSlopeCls, KBDI, FuelTemperature)]
+    ERC, SC, BI, IC = iCalcIndexesBatch(FM, df, *Args, Round=Round)
+    df = df.copy()
+    n = len(df)
+    df["ERC"] = np.broadcast_to(ERC, (n,))
+    df["SC"] = np.broadcast_to(SC, (n,))
+    df["BI"] = np.broadcast_to(BI, (n,))
+    df["IC"] = np.broadcast_to(IC, (n,))
+    return df
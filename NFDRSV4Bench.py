@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the NFDRS V4 hot paths.
+
+Times iCalcIndexes (scalar and batch), the V4 fuel models over shared weather
+(iCalcIndexesModels against one iCalcIndexesBatch call per model),
+USNFDRSFuelModel construction and the GSI / daylength functions on seeded synthetic inputs and on the bundled
+Data/045433.csv station file, at three sizes: one day, one station-year and
+1,000 station-decades.  Each run is appended to a JSON lines history; with a
+baseline the run fails when a case's median time is more than Threshold x the
+baseline and also more than NoiseFloor seconds per call slower, so cases that
+take microseconds per call are reported but cannot fail the gate on scheduler
+noise alone.  The scalar iCalcIndexes case at 1,000 station-decades takes a few
+minutes per call.
+
+    python NFDRSV4Bench.py --size day --size year
+    python NFDRSV4Bench.py --baseline bench_baseline.json --save-baseline
+    python NFDRSV4Bench.py --baseline bench_baseline.json --threshold 1.25
+
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from NFDRSV4Batch import MoistureFields, V4FuelModels, iCalcIndexesBatch, iCalcIndexesModels
+from NFDRSV4Calc import FuelModelCodes, FuelMoisture, USNFDRSFuelModel, iCalcIndexes
+from NFDRSV4GSI import CalcDayl, CalcGSIArrays, CalcVPD, GSIAccumulator, GSILimits, LookupDayl
+
+## \var Sizes Benchmark sizes: name -> (stations, days per station); "bundled" is Data/045433.csv
+Sizes = {"day": (1, 1), "year": (1, 365), "decades": (1000, 3652), "bundled": (1, None)}
+
+## \var DefaultThreshold Allowed slowdown against the baseline (1.25 = 25% slower)
+DefaultThreshold = 1.25
+
+## \var NoiseFloor Smallest per-call slowdown (s) that can fail the gate, whatever the ratio
+NoiseFloor = 1e-3
+
+## \var DefaultRepeat Timed intervals per case; the median is reported
+DefaultRepeat = 5
+
+## \var MinTime Shortest timed interval (s); faster calls are looped until they take this long
+MinTime = 0.2
+
+## \var LongTime A single calibration call at least this long (s) is kept as a timed interval,
+## so multi-minute cases are not run again just to be timed
+LongTime = 5.0
+
+## \var DefaultHistory History file, one JSON record per run
+DefaultHistory = "bench_history.jsonl"
+
+## \var BundledFile Station file used by the "bundled" size
+BundledFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data", "045433.csv")
+
+## \var Cases Benchmark cases: name -> sizes it runs at
+Cases = {
+    "iCalcIndexes": ("day", "year", "decades"),
+    "iCalcIndexesBatch": ("day", "year", "decades"),
+    "iCalcIndexesModels": ("year", "decades"),
+    "iCalcIndexesBatch.PerModel": ("year", "decades"),
+    "USNFDRSFuelModel": ("day", "year"),
+    "USNFDRSFuelModel.Custom": ("day", "year"),
+    "CalcGSIArrays": ("year", "decades", "bundled"),
+    "GSIAccumulator.Update": ("year", "bundled"),
+    "CalcDayl": ("year", "decades"),
+    "LookupDayl": ("year", "decades"),
+}
+
+
+## \fn SyntheticWeather Seeded daily inputs for one station
+## \param Days Number of days
+## \param Seed Random seed
+## \return dict of arrays: MC1..MCWOOD, WS, KBDI, FuelTemperature, Tmin, VPDMax, Prcp, JDay
+def SyntheticWeather(Days, Seed=0):
+    Rng = np.random.default_rng(Seed)
+    t = np.arange(Days)
+    Season = np.sin(2 * np.pi * (t - 100) / 365.0)
+    W = {}
+    W["MC1"] = np.clip(8 - 4 * Season + Rng.normal(0, 2, Days), 2, 30)
+    W["MC10"] = np.clip(W["MC1"] + Rng.uniform(0, 3, Days), 2, 35)
+    W["MC100"] = np.clip(W["MC10"] + Rng.uniform(0, 5, Days), 3, 40)
+    W["MC1000"] = np.clip(W["MC100"] + Rng.uniform(0, 8, Days), 5, 45)
+    W["MCHERB"] = np.clip(120 + 100 * Season + Rng.normal(0, 20, Days), 30, 250)
+    W["MCWOOD"] = np.clip(110 + 60 * Season + Rng.normal(0, 15, Days), 60, 200)
+    W["WS"] = np.round(Rng.gamma(2.0, 4.0, Days))
+    W["KBDI"] = np.round(np.clip(300 + 250 * Season + Rng.normal(0, 50, Days), 0, 800))
+    W["FuelTemperature"] = 60 + 25 * Season + Rng.normal(0, 5, Days)
+    W["Tmin"] = 45 + 20 * Season + Rng.normal(0, 6, Days)
+    W["VPDMax"] = CalcVPD(np.clip(40 - 20 * Season + Rng.normal(0, 10, Days), 5, 100), W["Tmin"] + 25)
+    W["Prcp"] = Rng.exponential(0.3, Days) * (Rng.random(Days) < 0.2)
+    W["JDay"] = t % 365 + 1
+    return W
+
+
+## \fn BundledWeather GSI inputs from Data/045433.csv
+def BundledWeather():
+    from NFDRSV4IO import ReadWeatherBatches
+    Batches = list(ReadWeatherBatches(BundledFile, Columns=("MinT", "VPDM", "Rain"), DailyHour=13))
+    Dates = np.concatenate([b["DateTime"] for b in Batches])
+    Col = lambda Name: np.concatenate([b[Name] for b in Batches])
+    JDay = (Dates.astype("datetime64[D]") - Dates.astype("datetime64[Y]")).astype(int) + 1
+    return {"Tmin": Col("MinT"), "VPDMax": Col("VPDM"), "Prcp": Col("Rain"), "JDay": JDay}
+
+
+## \fn _Stations Station inputs for a size (the same seeds every run)
+def _Stations(Size, Seed):
+    Stations, Days = Sizes[Size]
+    if Days is None:
+        return [BundledWeather()]
+    # 1,000 station-decades share a handful of weather series so setup stays small
+    Series = [SyntheticWeather(Days, Seed + i) for i in range(min(Stations, 8))]
+    return [Series[i % len(Series)] for i in range(Stations)]
+
+
+## \var StationGroup Stations stacked as columns of one iCalcIndexesModels call
+StationGroup = 100
+
+
+## \fn _StationColumns Station series stacked into (days, stations) arrays, StationGroup stations at a time
+def _StationColumns(Data):
+    Built = {}
+    Groups = []
+    for g in range(0, len(Data), StationGroup):
+        Members = Data[g:g + StationGroup]
+        Key = tuple(id(W) for W in Members)
+        if Key not in Built:
+            Built[Key] = {k: np.stack([W[k] for W in Members], axis=1)
+                          for k in MoistureFields + ("WS", "KBDI", "FuelTemperature")}
+        Groups.append(Built[Key])
+    return Groups
+
+
+## \fn _GSILimits Calibrated GSI limits used by the GSI cases
+def _GSILimits():
+    Lim = GSILimits()
+    Lim.Lat = 34
+    return Lim
+
+
+## \fn MakeCase Build a benchmark case
+## \param Name Key of Cases
+## \param Size Key of Sizes
+## \param Seed Random seed for the synthetic inputs
+## \return (function taking no arguments, number of work units per call, unit name)
+def MakeCase(Name, Size, Seed=0):
+    Data = _Stations(Size, Seed)
+    Units = sum(len(W["JDay"]) for W in Data)
+    Codes = list(FuelModelCodes)
+
+    if Name == "iCalcIndexes":
+        # Inputs are built once per distinct series; stations sharing a series share its list
+        Built = {}
+        for W in Data:
+            if id(W) in Built:
+                continue
+            Days = Built[id(W)] = []
+            for i in range(len(W["JDay"])):
+                MC = FuelMoisture()
+                MC.MC1, MC.MC10, MC.MC100, MC.MC1000, MC.MCHERB, MC.MCWOOD = (
+                    W[k][i] for k in ("MC1", "MC10", "MC100", "MC1000", "MCHERB", "MCWOOD"))
+                Days.append((MC, W["WS"][i], W["KBDI"][i], W["FuelTemperature"][i]))
+        Series = [Built[id(W)] for W in Data]
+        FM = USNFDRSFuelModel("Y")
+
+        def Run():
+            for Days in Series:
+                for MC, WS, KBDI, FuelTemperature in Days:
+                    iCalcIndexes(FM, MC, WS, 1, 0.5, KBDI, FuelTemperature)
+        return Run, Units, "days"
+
+    if Name == "iCalcIndexesBatch":
+        FM = USNFDRSFuelModel("Y")
+
+        def Run():
+            for W in Data:
+                iCalcIndexesBatch(FM, W, W["WS"], 1, W["KBDI"], W["FuelTemperature"])
+        return Run, Units, "days"
+
+    # The V4 fuel models over the same weather: one stacked call against a call per model
+    if Name == "iCalcIndexesModels":
+        Groups = _StationColumns(Data)
+
+        def Run():
+            for W in Groups:
+                iCalcIndexesModels(W, W["WS"], 1, W["KBDI"], W["FuelTemperature"], V4FuelModels)
+        return Run, Units * len(V4FuelModels), "model-days"
+
+    if Name == "iCalcIndexesBatch.PerModel":
+        Groups = _StationColumns(Data)
+
+        def Run():
+            for W in Groups:
+                for Code in V4FuelModels:
+                    iCalcIndexesBatch(Code, W, W["WS"], 1, W["KBDI"], W["FuelTemperature"])
+        return Run, Units * len(V4FuelModels), "model-days"
+
+    if Name == "USNFDRSFuelModel":
+        def Run():
+            for i in range(Units):
+                USNFDRSFuelModel(Codes[i % len(Codes)])
+        return Run, Units, "models"
+
+    if Name == "USNFDRSFuelModel.Custom":
+        def Run():
+            for i in range(Units):
+                USNFDRSFuelModel.Custom(Codes[i % len(Codes)], DEPTH=1.0 + i % 7)
+        return Run, Units, "models"
+
+    if Name == "CalcGSIArrays":
+        Lim = _GSILimits()
+
+        def Run():
+            for W in Data:
+                CalcGSIArrays(W["Tmin"], W["VPDMax"], W["Prcp"], W["JDay"], Lim)
+        return Run, Units, "days"
+
+    if Name == "GSIAccumulator.Update":
+        Lim = _GSILimits()
+        Days = [list(zip(*(W[k].tolist() for k in ("Tmin", "VPDMax", "Prcp", "JDay")))) for W in Data]
+
+        def Run():
+            for Series in Days:
+                Acc = GSIAccumulator(Lim)
+                for Tmin, VPDMax, Prcp, JDay in Series:
+                    Acc.Update(Tmin, VPDMax, Prcp, JDay)
+        return Run, Units, "days"
+
+    if Name == "CalcDayl":
+        Lats = np.linspace(30, 48, len(Data)).repeat([len(W["JDay"]) for W in Data])
+        JDay = np.concatenate([W["JDay"] for W in Data])
+        return (lambda: CalcDayl(Lats, JDay)), Units, "days"
+
+    if Name == "LookupDayl":
+        Lats = np.linspace(30, 48, len(Data))
+
+        def Run():
+            for Lat, W in zip(Lats, Data):
+                LookupDayl(Lat, W["JDay"])
+        return Run, Units, "days"
+
+    raise KeyError("Unknown benchmark case %s" % Name)
+
+
+## \fn TimeCase Time a case
+## \param Run Function to time
+## \param Repeat Number of timed intervals of at least MinTime; the median is reported
+## \param Memory Also measure the peak traced allocation of one extra call (MB); skipped
+## (PeakMB None) for calls of LongTime or more, which tracing would slow several-fold
+## \return dict with Seconds (per call, median interval), Min and Mean (per call), Loops, Intervals
+## and PeakMB
+def TimeCase(Run, Repeat=DefaultRepeat, Memory=True):
+    Loops = 1
+    Times = []
+    while True:
+        t = time.perf_counter()
+        for _ in range(Loops):
+            Run()
+        Elapsed = time.perf_counter() - t
+        if Elapsed >= MinTime:
+            break
+        Loops *= 2
+    if Loops == 1 and Elapsed >= LongTime:
+        Times.append(Elapsed)
+    while len(Times) < max(1, Repeat):
+        gc.collect()
+        t = time.perf_counter()
+        for _ in range(Loops):
+            Run()
+        Times.append((time.perf_counter() - t) / Loops)
+    Result = {"Seconds": float(np.median(Times)), "Min": min(Times), "Mean": sum(Times) / len(Times),
+              "Loops": Loops, "Intervals": len(Times), "PeakMB": None}
+    if Memory and Result["Seconds"] < LongTime:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            Run()
+            Result["PeakMB"] = tracemalloc.get_traced_memory()[1] / 2.0 ** 20
+        finally:
+            tracemalloc.stop()
+    return Result
+
+
+## \fn RunBenchmarks Run the selected cases
+## \param SizeNames Sizes to run (default: all)
+## \param CaseNames Cases to run (default: all)
+## \param Repeat Timed intervals per case (the "decades" size is timed once)
+## \param Memory Record peak memory
+## \param Seed Random seed of the synthetic inputs
+## \param Report Optional callback Report(Key, Result) after each case
+## \return dict "Case/Size" -> result dict (Seconds, Mean, PeakMB, Units, Unit, PerSecond)
+def RunBenchmarks(SizeNames=None, CaseNames=None, Repeat=DefaultRepeat, Memory=True, Seed=0, Report=None):
+    Results = {}
+    for Name in (CaseNames or list(Cases)):
+        for Size in Cases[Name]:
+            if SizeNames is not None and Size not in SizeNames:
+                continue
+            Run, Units, Unit = MakeCase(Name, Size, Seed)
+            Result = TimeCase(Run, 1 if Size == "decades" else Repeat, Memory)
+            Result.update(Units=Units, Unit=Unit, PerSecond=Units / Result["Seconds"] if Result["Seconds"] else None)
+            Key = "%s/%s" % (Name, Size)
+            Results[Key] = Result
+            if Report is not None:
+                Report(Key, Result)
+    return Results
+
+
+## \fn Environment Description of the machine and library versions for the history
+def Environment():
+    return {"Python": platform.python_version(), "NumPy": np.__version__, "Platform": platform.platform(),
+            "Machine": platform.machine(), "CPUs": os.cpu_count()}
+
+
+## \fn AppendHistory Append one run to a JSON lines history file
+def AppendHistory(Path, Results, Extra=None):
+    Record = {"Time": datetime.datetime.now().isoformat(timespec="seconds"), "Environment": Environment(),
+              "Results": Results}
+    if Extra:
+        Record.update(Extra)
+    with open(Path, "a") as f:
+        f.write(json.dumps(Record) + "\n")
+    return Record
+
+
+## \fn CompareBaseline Cases slower than Threshold x their baseline time
+## \param Results Output of RunBenchmarks
+## \param Baseline "Case/Size" -> result dict (cases missing from it are not checked)
+## \param Floor Per-call slowdown (s) a case must also exceed to count as a regression
+## \return list of (Key, Seconds, BaselineSeconds, Ratio), slowest first
+def CompareBaseline(Results, Baseline, Threshold=DefaultThreshold, Floor=NoiseFloor):
+    Slow = []
+    for Key, Result in Results.items():
+        Base = Baseline.get(Key)
+        if not Base or not Base.get("Seconds"):
+            continue
+        Ratio = Result["Seconds"] / Base["Seconds"]
+        if Ratio > Threshold and Result["Seconds"] - Base["Seconds"] > Floor:
+            Slow.append((Key, Result["Seconds"], Base["Seconds"], Ratio))
+    return sorted(Slow, key=lambda s: -s[3])
+
+
+## \fn _Print Print one result line
+def _Print(Key, Result):
+    Peak = "" if Result["PeakMB"] is None else "%10.1f MB" % Result["PeakMB"]
+    Rate = "" if Result["PerSecond"] is None else "%14.0f %s/s" % (Result["PerSecond"], Result["Unit"])
+    print("%-34s %12.6f s%s%s" % (Key, Result["Seconds"], Rate, Peak))
+    sys.stdout.flush()
+
+
+## \fn main Command line entry point
+## \return process exit code (1 if a case regressed past the threshold)
+def main(argv=None):
+    Parser = argparse.ArgumentParser(description="Benchmark the NFDRS V4 hot paths.")
+    Parser.add_argument("--size", action="append", choices=list(Sizes), help="size to run (repeatable)")
+    Parser.add_argument("--case", action="append", choices=list(Cases), help="case to run (repeatable)")
+    Parser.add_argument("--repeat", type=int, default=DefaultRepeat,
+                        help="timed intervals per case, median reported (default %(default)s)")
+    Parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic inputs")
+    Parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    Parser.add_argument("--history", default=DefaultHistory, help="JSON lines history file ('' to skip)")
+    Parser.add_argument("--baseline", help="baseline JSON file to compare against")
+    Parser.add_argument("--save-baseline", action="store_true", help="write this run to --baseline")
+    Parser.add_argument("--threshold", type=float, default=DefaultThreshold,
+                        help="fail when a case is slower than THRESHOLD x baseline (default %(default)s)")
+    Parser.add_argument("--noise-floor", type=float, default=NoiseFloor,
+                        help="per-call slowdown in seconds a case must also exceed to fail (default %(default)s)")
+    Args = Parser.parse_args(argv)
+
+    Results = RunBenchmarks(Args.size, Args.case, Args.repeat, not Args.no_memory, Args.seed, _Print)
+    if Args.history:
+        AppendHistory(Args.history, Results, {"Seed": Args.seed})
+    if Args.baseline and Args.save_baseline:
+        with open(Args.baseline, "w") as f:
+            json.dump({"Environment": Environment(), "Results": Results}, f, indent=1)
+        return 0
+    if Args.baseline:
+        with open(Args.baseline) as f:
+            Baseline = json.load(f)["Results"]
+        Slow = CompareBaseline(Results, Baseline, Args.threshold, Args.noise_floor)
+        for Key, Seconds, BaseSeconds, Ratio in Slow:
+            print("REGRESSION %s: %.6f s vs %.6f s baseline (x%.2f > x%.2f)" %
+                  (Key, Seconds, BaseSeconds, Ratio, Args.threshold))
+        if Slow:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Command line entry point.
+
+    python -m NFDRSV4CLI indexes --fuel-model Y --slope-class 2 weather.csv > indexes.csv
+    cat days.jsonl | python -m NFDRSV4CLI indexes -f V -f W -f X -f Y -f Z --output ndjson
+    python -m NFDRSV4CLI gsi --lat 34.2 --state 045433.gsi.json Data/045433.csv
+    python -m NFDRSV4CLI models
+
+Records are read from CSV or newline-delimited JSON files, or stdin ("-"), and
+result rows are written to stdout a chunk at a time as they are computed.  Only
+the standard library is imported at start-up; NumPy and the calculation
+modules are imported by the subcommand that needs them, which keeps the cold
+start short when the command is run many times from cron or shell pipelines.
+
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+## \var KeepColumns Input columns copied to the output by default (when present)
+KeepColumns = ("StationID", "Station", "DateTime", "DATE", "Date")
+
+## \var IndexColumns Names of the index values written by the indexes subcommand
+IndexColumns = ("ERC", "SC", "BI", "IC")
+
+## \var GSIInputs Accepted input column names of the gsi subcommand (first match wins)
+GSIInputs = {"Date": ("DateTime", "DATE", "Date"), "Tmin": ("Tmin", "MinT"), "VPDMax": ("VPDMax", "VPDM"),
+             "Prcp": ("Prcp", "Rain")}
+
+## \var GSIOutputs GSI values written by the gsi subcommand
+GSIOutputs = ("GSI", "GSI_RS", "GSI_PE", "GSI_PE_RS", "LFMWood", "LFMWoodP")
+
+
+## \fn _Value A CSV field as a float when it is numeric (NaN when empty), else the stripped string
+def _Value(s):
+    s = s.strip()
+    if not s:
+        return float("nan")
+    try:
+        return float(s)
+    except ValueError:
+        return s
+
+
+## \fn _ReadFile Records of one open text file
+## \param Format "csv", "ndjson" or None to decide from the first non-blank line
+def _ReadFile(File, Format):
+    Lines = iter(File)
+    First = ""
+    for First in Lines:
+        if First.strip():
+            break
+    if not First.strip():
+        return
+    if Format is None:
+        Format = "ndjson" if First.lstrip().startswith("{") else "csv"
+    if Format == "ndjson":
+        yield json.loads(First)
+        for Line in Lines:
+            if Line.strip():
+                yield json.loads(Line)
+        return
+    Reader = csv.reader(_Chain(First, Lines))
+    Header = [h.strip() for h in next(Reader)]
+    for Row in Reader:
+        if Row and any(f.strip() for f in Row):
+            yield {h: _Value(f) for h, f in zip(Header, Row) if h}
+
+
+## \fn _Chain Put a line back in front of an iterator of lines
+def _Chain(First, Lines):
+    yield First
+    yield from Lines
+
+
+## \fn ReadRecords Records (dicts) of several CSV / NDJSON sources in turn
+## \param Sources File names; "-" (or none) reads stdin
+## \param Format "csv" or "ndjson"; None picks by extension, or by content for stdin
+def ReadRecords(Sources, Format=None):
+    for Source in Sources or ["-"]:
+        if Source == "-":
+            yield from _ReadFile(sys.stdin, Format)
+            continue
+        Fmt = Format
+        if Fmt is None and Source.lower().endswith((".jsonl", ".ndjson", ".json")):
+            Fmt = "ndjson"
+        with open(Source, newline="") as File:
+            yield from _ReadFile(File, Fmt)
+
+
+## \fn _Chunks Lists of up to Size items of an iterator
+def _Chunks(Items, Size):
+    Chunk = []
+    for Item in Items:
+        Chunk.append(Item)
+        if len(Chunk) >= Size:
+            yield Chunk
+            Chunk = []
+    if Chunk:
+        yield Chunk
+
+
+## \class _Writer
+## \brief Streams output rows as CSV (header from the first row) or NDJSON
+class _Writer:
+
+    def __init__(self, File, Format):
+        self.File = File
+        self.Format = Format
+        self._Csv = None
+
+    def Write(self, Rows):
+        for Row in Rows:
+            if self.Format == "ndjson":
+                self.File.write(json.dumps(Row) + "\n")
+                continue
+            if self._Csv is None:
+                self._Csv = csv.DictWriter(self.File, fieldnames=list(Row), lineterminator="\n",
+                                           extrasaction="ignore")
+                self._Csv.writeheader()
+            self._Csv.writerow(Row)
+        self.File.flush()
+
+
+## \fn _Column Values of a field over a chunk of records (the first of several accepted names)
+def _Column(Chunk, Names, Default=None):
+    for Name in Names:
+        if Name in Chunk[0]:
+            return [Rec.get(Name, Default) for Rec in Chunk]
+    if Default is None:
+        raise SystemExit("Input records have no %s column" % " / ".join(Names))
+    return [Default] * len(Chunk)
+
+
+## \fn _CheckCodes Upper-cased fuel model codes, exiting on a code not in FuelModelCodes
+## (the calculation modules would silently use the Slash model for it)
+## \param Where Description of where the codes came from, for the error message
+def _CheckCodes(Codes, Where):
+    from NFDRSV4Calc import FuelModelCodes
+    Codes = [str(c).strip().upper() for c in Codes]
+    Unknown = sorted(set(Codes) - set(FuelModelCodes))
+    if Unknown:
+        raise SystemExit("Unknown fuel model %s in %s (known: %s)"
+                         % (", ".join(map(repr, Unknown)), Where, " ".join(FuelModelCodes)))
+    return Codes
+
+
+## \fn RunIndexes The indexes subcommand
+def RunIndexes(Args):
+    import numpy as np
+    from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch, iCalcIndexesModels
+
+    Out = _Writer(sys.stdout, Args.output)
+    Models = _CheckCodes(Args.fuel_model or ["Y"], "--fuel-model")
+    Done = 0
+    for Chunk in _Chunks(ReadRecords(Args.input, Args.format), Args.chunk):
+        Keep = [k for k in (Args.keep or KeepColumns) if k in Chunk[0]]
+        MC = {Name: np.array(_Column(Chunk, (Name,)), dtype=np.float64) for Name in MoistureFields}
+        WS = np.array(_Column(Chunk, ("WS", "WindSpeed")), dtype=np.float64)
+        Slope = np.array(_Column(Chunk, ("SlopeCls",), Args.slope_class), dtype=np.float64)
+        KBDI = np.array(_Column(Chunk, ("KBDI",)), dtype=np.float64)
+        FuelTemperature = np.array(_Column(Chunk, ("FuelTemperature",)), dtype=np.float64)
+        if "FM" in Chunk[0] and not Args.fuel_model:
+            # One fuel model per record
+            Codes = _CheckCodes(_Column(Chunk, ("FM",)), "the FM column of records %d-%d"
+                                % (Done + 1, Done + len(Chunk)))
+            Result = iCalcIndexesBatch(np.array(Codes), MC, WS, Slope, KBDI, FuelTemperature, Round=Args.round)
+            Result = [x[:, None] for x in Result]
+            RowModels = [[c] for c in Codes]
+        else:
+            Result = iCalcIndexesModels(MC, WS, Slope, KBDI, FuelTemperature, Models, Round=Args.round)
+            RowModels = [Models] * len(Chunk)
+        Rows = []
+        for i, Rec in enumerate(Chunk):
+            for j, FM in enumerate(RowModels[i]):
+                Row = {k: Rec[k] for k in Keep}
+                Row["FM"] = FM
+                Row.update((Name, float(x[i, j])) for Name, x in zip(IndexColumns, Result))
+                Rows.append(Row)
+        Out.Write(Rows)
+        Done += len(Chunk)
+    return 0
+
+
+## \fn RunGSI The gsi subcommand: daily GSI and live fuel moisture, one day at a time
+def RunGSI(Args):
+    import numpy as np
+    from NFDRSV4GSI import GSIAccumulator, GSILimits
+
+    Acc = None
+    if Args.state and os.path.exists(Args.state):
+        with open(Args.state) as f:
+            Acc = GSIAccumulator.Loads(f.read())
+    if Acc is None:
+        gsilim = GSILimits()
+        gsilim.Lat = Args.lat
+        gsilim.LFMMin = Args.lfm_min
+        gsilim.LFMMax = Args.lfm_max
+        Acc = GSIAccumulator(gsilim)
+    Out = _Writer(sys.stdout, Args.output)
+    for Chunk in _Chunks(ReadRecords(Args.input, Args.format), Args.chunk):
+        Dates = np.array([_IsoDay(d) for d in _Column(Chunk, GSIInputs["Date"])], dtype="datetime64[D]")
+        JDay = (Dates - Dates.astype("datetime64[Y]")).astype(int) + 1
+        Tmin, VPDMax, Prcp = (_Column(Chunk, GSIInputs[k]) for k in ("Tmin", "VPDMax", "Prcp"))
+        Rows = []
+        for i in range(len(Chunk)):
+            Day = Acc.Update(Tmin[i], VPDMax[i], Prcp[i], JDay[i], Dates[i])
+            Row = {"Date": str(Dates[i])}
+            Row.update((Name, Day[Name]) for Name in GSIOutputs)
+            Rows.append(Row)
+        Out.Write(Rows)
+    if Args.state:
+        with open(Args.state, "w") as f:
+            f.write(Acc.Dumps())
+    return 0
+
+
+## \fn _IsoDay Date part (YYYY-MM-DD) of a record date
+def _IsoDay(s):
+    from NFDRSV4IO import IsoDate
+    return IsoDate(str(s))[:10]
+
+
+## \fn RunModels The models subcommand: list the fuel model codes
+def RunModels(Args):
+    from NFDRSV4Calc import FuelModelCodes
+    for Code in FuelModelCodes:
+        print(Code)
+    return 0
+
+
+## \fn MakeParser Argument parser of the CLI
+def MakeParser():
+    Parser = argparse.ArgumentParser(prog="python -m NFDRSV4CLI", description="NFDRS V4 command line tools.")
+    Sub = Parser.add_subparsers(dest="command", required=True)
+
+    def Common(p):
+        p.add_argument("input", nargs="*", help="CSV or NDJSON files ('-' or none for stdin)")
+        p.add_argument("--format", choices=("csv", "ndjson"), help="input format (default: detect)")
+        p.add_argument("--output", choices=("csv", "ndjson"), default="csv", help="output format")
+        p.add_argument("--chunk", type=int, default=512, help="records computed and written together")
+
+    p = Sub.add_parser("indexes", help="ERC, SC, BI and IC from MC1..MCWOOD, WS, KBDI and FuelTemperature")
+    Common(p)
+    p.add_argument("-f", "--fuel-model", action="append",
+                   help="fuel model code (repeatable; default: the records' FM column, else Y)")
+    p.add_argument("-s", "--slope-class", type=int, default=1, choices=range(1, 6),
+                   help="slope class for records without SlopeCls")
+    p.add_argument("--round", type=int, default=2, help="decimal places")
+    p.add_argument("--keep", action="append", help="input column to copy to the output (repeatable)")
+    p.set_defaults(Run=RunIndexes)
+
+    p = Sub.add_parser("gsi", help="daily GSI and live fuel moisture from Tmin, VPDMax and Prcp")
+    Common(p)
+    p.add_argument("--lat", type=float, default=45.0, help="station latitude (degrees)")
+    p.add_argument("--lfm-min", type=float, default=60.0, help="minimum live fuel moisture")
+    p.add_argument("--lfm-max", type=float, default=200.0, help="maximum live fuel moisture")
+    p.add_argument("--state", help="GSI state file, read if it exists (its limits and latitude then apply) "
+                        "and written back, for nightly runs")
+    p.set_defaults(Run=RunGSI)
+
+    p = Sub.add_parser("models", help="list the fuel model codes")
+    p.set_defaults(Run=RunModels)
+    return Parser
+
+
+## \fn main Parse the command line and run a subcommand
+def main(argv=None):
+    Args = MakeParser().parse_args(argv)
+    if getattr(Args, "chunk", 1) < 1:
+        raise SystemExit("--chunk must be at least 1")
+    try:
+        return Args.Run(Args)
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head)
+        sys.stderr.close()
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
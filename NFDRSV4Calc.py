@@ -6,7 +6,10 @@ Created on Thu Nov  3 14:32:41 2022
 
 """
 
+from collections import OrderedDict, namedtuple
 from math import exp
+
+import NFDRSV4Instrument
 def pow(base, expn):
     return base ** expn
 
@@ -24,544 +27,147 @@ def fToc(f):
 def cTof(c):
     return (c * 9/5) + 32
 
+## \var FuelModelFields Fuel model parameters, in the column order of the fuel model table
+FuelModelFields = ("SG1", "SG10", "SG100", "SG1000", "SGWOOD", "SGHERB",
+                   "L1", "L10", "L100", "L1000", "LWOOD", "LHERB",
+                   "DEPTH", "MXD", "HD", "SCM", "WNDFC", "DROUGHT")
+
+## \var _FuelModelData Fuel model parameters by FMCode (surface area to volume ratios,
+## loadings, depth, dead fuel moisture of extinction, heat content, SC max, wind factor
+## and drought fuel loading)
+_FuelModelData = {
+    #      SG1  SG10 SG100 SG1000 SGWOOD SGHERB  L1    L10   L100  L1000  LWOOD LHERB DEPTH MXD  HD    SCM  WNDFC DROUGHT
+    "A": (3000,   0,   0,    0,     0,  3000,  0.2,  0,    0,    0,     0,    0.3,  0.8,  15, 8000, 301, 0.6, 0),    # Grass
+    "B": ( 700, 109,  30,    8,  1250,  3000,  3.5,  4,    0.5,  0,    11.5,  0,    4.5,  15, 9500,  58, 0.5, 0),
+    "C": (2000, 109,  30,    8,  1500,  2500,  0.4,  1,    0,    0,     0.5,  0.8,  0.75, 20, 8000,  32, 0.5, 0),
+    "D": (1250, 109,  30,    8,  1500,  1500,  2,    1,    0,    0,     3,    0.75, 2,    30, 9000,  68, 0.4, 0),
+    "E": (2000, 109,  30,    8,  1500,  2000,  1.5,  0.5,  0.25, 0,     0.5,  0.5,  0.4,  25, 8000,  25, 0.4, 0),
+    "F": ( 700, 109,  30,    0,  1250,     0,  2.5,  2,    1.5,  0,     9,    0,    4.5,  15, 9500,  24, 0.5, 0),    # Brush
+    "G": (2000, 109,  30,    8,  1500,  2000,  2.5,  2,    5,    12,    0.5,  0.5,  1,    25, 8000,  30, 0.4, 0),    # Timber understory
+    "H": (2000, 109,  30,    8,  1500,  2000,  1.5,  1,    2,    2,     0.5,  0.5,  0.3,  20, 8000,   8, 0.4, 0),
+    "I": (1500, 109,  30,    8,  1500,  2000, 12,   12,   10,    12,    0,    0,    2,    25, 8000,  65, 0.5, 0),
+    "J": (1500, 109,  30,    8,  1500,  2000,  7,    7,    6,    5.5,   0,    0,    1.3,  25, 8000,  44, 0.5, 0),
+    "K": (1500, 109,  30,    8,  1500,  2000,  2.5,  2.5,  2,    2.5,   0,    0,    0.6,  25, 8000,  23, 0.5, 0),
+    "L": (2000, 109,  30,    8,  1500,  2000,  0.25, 0,    0,    0,     0,    0.5,  1,    15, 8000, 178, 0.6, 0),
+    "N": (1600, 109,  30,    8,  1500,  2000,  1.5,  1.5,  0,    0,     2,    0,    3,    25, 8700, 167, 0.6, 0),
+    "O": (1500, 109,  30,    8,  1500,  1500,  2,    3,    3,    2,     7,    0,    4,    30, 9000,  99, 0.5, 0),
+    "P": (1750, 109,  30,    8,  1500,  2000,  1,    1,    0.5,  2,     0.5,  0.5,  0.4,  30, 8000,  14, 0.4, 0),
+    "Q": (1500, 109,  30,    8,  1200,  1500,  2,    2.5,  2,    1,     4,    0.5,  3,    25, 8000,  59, 0.4, 0),
+    "R": (1500, 109,  30,    8,  1500,  2000,  0.5,  0.5,  0.5,  0,     0.5,  0.5,  0.25, 25, 8000,   6, 0.4, 0),
+    "S": (1500, 109,  30,    8,  1200,  1500,  0.5,  0.5,  0.5,  0.5,   0.5,  0.5,  0.4,  25, 8000,  17, 0.6, 0),
+    "T": (2500, 109,  30,    8,  1500,  2000,  1,    0.5,  0,    0,     2.5,  0.5,  1.25, 15, 8000,  96, 0.6, 0),
+    "U": (1750, 109,  30,    8,  1500,  2000,  1.5,  1.5,  1,    0,     0.5,  0.5,  0.5,  20, 8000,  16, 0.4, 0),    # Western Pines
+    "V": (2000, 109,  30,    8,  1500,  2000,  0.1,  0.0,  0.0,  0.0,   0.0,  1.0,  1,    15, 8000, 108, 0.6, 0),    # Grass
+    "W": (2000, 109,  30,    8,  1500,  2000,  0.5,  0.5,  0.0,  0.0,   1.0,  0.6,  1.5,  15, 8000,  62, 0.4, 1),    # Grass
+    "X": (2000, 109,  30,    8,  1500,  2000,  4.5,  2.45, 0.0,  0.0,   7.0,  1.55, 4.4,  25, 8000, 104, 0.4, 2.5),  # Grass
+    "Y": (2000, 109,  30,    8,  1500,  2000,  2.5,  2.2,  3.6,  10.16, 0,    0,    0.6,  25, 8000,   5, 0.2, 5),    # Timber understory
+    "Z": (2000, 109,  30,    8,  1500,  2000,  4.5,  4.25, 4.0,  4.0,   0.0,  0.0,  1.5,  25, 8000,  19, 0.4, 7),    # Grass
+}
+
+## \var _SlashFuelModel Parameters assigned to any FMCode not in the table (Slash)
+_SlashFuelModel = (1500, 109, 30, 8, 0, 0, 7, 7, 6, 5.5, 0, 0, 1.3, 25, 8000, 44, 0.5, 0)
+
+## \var _DefaultFuelModel Parameter defaults for custom fuel models built with USNFDRSFuelModel.Custom
+_DefaultFuelModel = dict(zip(FuelModelFields, (2000, 109, 30, 8, 1, 1, 1, 1, 1, 1, 1, 1, 1, 15, 8000, 301, 0.6, 0)))
+
 ## \class USNFDRSFuelModel
 ## \brief US NFDRS Fuel Model Class
+##
+## Fuel models are immutable records. The standard models are built once at import
+## so USNFDRSFuelModel(FMCode) is a dictionary lookup returning a shared instance;
+## the Slash model of an unknown code is built on first use and shared the same way.
+## Use Replace() or Custom() to derive a model with different parameters.
 class USNFDRSFuelModel:
+    __slots__ = ("FMCode", "FuelModel") + FuelModelFields + \
+                ("W1", "W1P", "W10", "W100", "W1000", "WWOOD", "WHERB", "WHERBP")
     CTA = 0.046
-    SG1 = 2000	## \var SG1 1hr Surface Area to Volume Ratio
-    SG10 = 109	## 10hr Surface Area to Volume Ratio
-    SG100 = 30	## 100hr Surface Area to Volume Ratio
-    SG1000 = 8	## 1000hr Surface Area to Volume Ratio
-    SGWOOD = 1	## Wood Surface Area to Volume Ratio
-    SGHERB = 1	## Herbaceous Surface Area to Volume Ratio
-    L1 = 1		## 1hr fuel loading
-    L10 = 1		## 10hr fuel loading
-    L100 = 1	## 100hr fuel loading
-    L1000 = 1	## 1000hr fuel loading
-    LWOOD = 1	## Woody fuel loading
-    LHERB = 1	## Herbaceous fuel loading
-    DEPTH = 1	## Fuel bed depth
-    MXD = 15	## Dead fuel moisture of extinction
-    DROUGHT = 0 ## Drought fuel loading
-    HD = 8000
-    SCM = 301
-    WNDFC = 0.6
-    FuelModel = ""
-    FMCode = ""
-    W1 = L1 * CTA
-    W1P = 0.0
-    W10 = L10 * CTA
-    W100 = L100 * CTA
-    W1000 = L1000 * CTA
-    WWOOD = LWOOD * CTA
-    WHERB = LHERB * CTA
-    WHERBP = 0.0
-
-    ## \fn __init__(self,FMCode)
+
+    ## \fn __new__(cls,FMCode)
     ## \param FMCode Fuel Model Code (A = Grass, F = Brush, G = Timber Understory, Anything else is set to the Slash model)
-    def __init__(self,FMCode):
-        self.FMCode = FMCode.upper()
-
-        if self.FMCode == "A":	#Grass fuel model
-            self.SG1 = 3000
-            self.SG10 = 0
-            self.SG100 = 0
-            self.SG1000 = 0
-            self.SGWOOD = 0
-            self.SGHERB = 3000
-            self.L1 = .2
-            self.L10 = 0
-            self.L100 = 0
-            self.L1000 = 0
-            self.LWOOD = 0
-            self.LHERB = .3
-            self.DEPTH = .8
-            self.MXD = 15
-            self.HD = 8000
-            self.SCM = 301
-            self.WNDFC = 0.6
-        elif self.FMCode == "B":
-            self.SG1 = 700
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1250
-            self.SGHERB = 3000
-            self.L1 = 3.5
-            self.L10 = 4
-            self.L100 = 0.5
-            self.L1000 = 0
-            self.LWOOD = 11.5
-            self.LHERB = 0
-            self.DEPTH = 4.5
-            self.MXD = 15
-            self.HD = 9500
-            self.SCM = 58
-            self.WNDFC = 0.5
-        elif self.FMCode == "C":
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2500
-            self.L1 = 0.4
-            self.L10 = 1
-            self.L100 = 0
-            self.L1000 = 0
-            self.LWOOD = 0.5
-            self.LHERB = 0.8
-            self.DEPTH = 0.75
-            self.MXD = 20
-            self.HD = 8000
-            self.SCM = 32
-            self.WNDFC = 0.5
-        elif self.FMCode == "D":
-            self.SG1 = 1250
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 1500
-            self.L1 = 2
-            self.L10 = 1
-            self.L100 = 0
-            self.L1000 = 0
-            self.LWOOD = 3
-            self.LHERB = 0.75
-            self.DEPTH = 2
-            self.MXD = 30
-            self.HD = 9000
-            self.SCM = 68
-            self.WNDFC = 0.4
-        elif self.FMCode == "E":
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2000
-            self.L1 = 1.5
-            self.L10 = 0.5
-            self.L100 = 0.25
-            self.L1000 = 0
-            self.LWOOD = 0.5
-            self.LHERB = 0.5
-            self.DEPTH = 0.4
-            self.MXD = 25
-            self.HD = 8000
-            self.SCM = 25
-            self.WNDFC = 0.4
-        elif self.FMCode == "F":	# Brush fuel model
-            self.SG1 = 700
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 0
-            self.SGWOOD = 1250
-            self.SGHERB = 0
-            self.L1 = 2.5
-            self.L10 = 2
-            self.L100 = 1.5
-            self.L1000 = 0
-            self.LWOOD = 9
-            self.LHERB = 0
-            self.DEPTH = 4.5
-            self.MXD = 15
-            self.HD = 9500
-            self.SCM = 24
-            self.WNDFC = 0.5
-        elif self.FMCode == "G":	# Timber understory fuel model
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2000
-            self.L1 = 2.5
-            self.L10 = 2
-            self.L100 = 5
-            self.L1000 = 12
-            self.LWOOD = .5
-            self.LHERB = .5
-            self.DEPTH = 1
-            self.MXD = 25
-            self.HD = 8000
-            self.SCM = 30
-            self.WNDFC = 0.4
-        elif self.FMCode == "H":	# Timber understory fuel model
-            self.L1 = 1.5
-            self.L10 = 1
-            self.L100 = 2
-            self.L1000 = 2
-            self.LHERB = .5
-            self.LWOOD = .5
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 20
-            self.DEPTH = 0.3
-            self.WNDFC = 0.4
-            self.SCM = 8
-        elif self.FMCode == "I":	# Timber understory fuel model
-            self.L1 = 12
-            self.L10 = 12
-            self.L100 = 10
-            self.L1000 = 12
-            self.LHERB = 0
-            self.LWOOD = 0
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 25
-            self.DEPTH = 2
-            self.WNDFC = 0.5
-            self.SCM = 65
-        elif self.FMCode == "J":	# Timber understory fuel model
-            self.L1 = 7
-            self.L10 = 7
-            self.L100 = 6
-            self.L1000 = 5.5
-            self.LHERB = 0
-            self.LWOOD = 0
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 25
-            self.DEPTH = 1.3
-            self.WNDFC = 0.5
-            self.SCM = 44
-        elif self.FMCode == "K":	# Timber understory fuel model
-            self.L1 = 2.5
-            self.L10 = 2.5
-            self.L100 = 2
-            self.L1000 = 2.5
-            self.LHERB = 0
-            self.LWOOD = 0
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 25
-            self.DEPTH = 0.6
-            self.WNDFC = 0.5
-            self.SCM = 23
-        elif self.FMCode == "L":	# Timber understory fuel model
-            self.L1 = 0.25
-            self.L10 = 0
-            self.L100 = 0
-            self.L1000 = 0
-            self.LHERB = 0.5
-            self.LWOOD = 0
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 15
-            self.DEPTH = 1
-            self.WNDFC = 0.6
-            self.SCM = 178
-        elif self.FMCode == "N":	# Timber understory fuel model
-            self.L1 = 1.5
-            self.L10 = 1.5
-            self.L100 = 0
-            self.L1000 = 0
-            self.LHERB = 0
-            self.LWOOD = 2
-            self.SG1 = 1600
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8700
-            self.MXD = 25
-            self.DEPTH = 3
-            self.WNDFC = 0.6
-            self.SCM = 167
-        elif self.FMCode == "O":	# Timber understory fuel model
-            self.L1 = 2
-            self.L10 = 3
-            self.L100 = 3
-            self.L1000 = 2
-            self.LHERB = 0
-            self.LWOOD = 7
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 1500
-            self.SGWOOD = 1500
-            self.HD = 9000
-            self.MXD = 30
-            self.DEPTH = 4
-            self.WNDFC = 0.5
-            self.SCM = 99
-        elif self.FMCode == "P":	# Timber understory fuel model
-            self.L1 = 1
-            self.L10 = 1
-            self.L100 = 0.5
-            self.L1000 = 2
-            self.LHERB = 0.5
-            self.LWOOD = 0.5
-            self.SG1 = 1750
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 30
-            self.DEPTH = 0.4
-            self.WNDFC = 0.4
-            self.SCM = 14
-        elif self.FMCode == "Q":	# Timber understory fuel model
-            self.L1 = 2
-            self.L10 = 2.5
-            self.L100 = 2
-            self.L1000 = 1
-            self.LHERB = 0.5
-            self.LWOOD = 4
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 1500
-            self.SGWOOD = 1200
-            self.HD = 8000
-            self.MXD = 25
-            self.DEPTH = 3
-            self.WNDFC = 0.4
-            self.SCM = 59
-        elif self.FMCode == "R":	# Timber understory fuel model
-            self.L1 = 0.5
-            self.L10 = 0.5
-            self.L100 = 0.5
-            self.L1000 = 0
-            self.LHERB = 0.5
-            self.LWOOD = 0.5
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 25
-            self.DEPTH = 0.25
-            self.WNDFC = 0.4
-            self.SCM = 6
-        elif self.FMCode == "S":	# Timber understory fuel model
-            self.L1 = 0.5
-            self.L10 = 0.5
-            self.L100 = 0.5
-            self.L1000 = 0.5
-            self.LHERB = 0.5
-            self.LWOOD = 0.5
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 1500
-            self.SGWOOD = 1200
-            self.HD = 8000
-            self.MXD = 25
-            self.DEPTH = 0.4
-            self.WNDFC = 0.6
-            self.SCM = 17
-        elif self.FMCode == "T":	# Timber understory fuel model
-            self.L1 = 1
-            self.L10 = 0.5
-            self.L100 = 0
-            self.L1000 = 0
-            self.LHERB = 0.5
-            self.LWOOD = 2.5
-            self.SG1 = 2500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 15
-            self.DEPTH = 1.25
-            self.WNDFC = 0.6
-            self.SCM = 96
-        elif self.FMCode == "U":	# Western Pines
-            self.L1 = 1.5
-            self.L10 = 1.5
-            self.L100 = 1
-            self.L1000 = 0
-            self.LHERB = 0.5
-            self.LWOOD = 0.5
-            self.SG1 = 1750
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGHERB = 2000
-            self.SGWOOD = 1500
-            self.HD = 8000
-            self.MXD = 20
-            self.DEPTH = 0.5
-            self.WNDFC = 0.4
-            self.SCM = 16
-        
-        elif self.FMCode == "V":  # Grass
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2000
-            self.L1 = 0.1
-            self.L10 = 0.0
-            self.L100 = 0.0
-            self.L1000 = 0.0
-            self.LWOOD = 0.0
-            self.LHERB = 1.0
-            self.DEPTH = 1
-            self.MXD = 15
-            self.HD = 8000
-            self.SCM = 108
-            self.WNDFC = 0.6
-            self.DROUGHT = 0
-
-        elif self.FMCode == "W":  # Grass
-            
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2000
-            self.L1 = 0.5
-            self.L10 = 0.5
-            self.L100 = 0.0
-            self.L1000 = 0.0
-            self.LWOOD = 1.0
-            self.LHERB = 0.6
-            self.DEPTH = 1.5
-            self.MXD = 15
-            self.HD = 8000
-            self.SCM = 62
-            self.WNDFC = 0.4
-            self.DROUGHT = 1
-        elif self.FMCode == "X":  # Grass
-            print("X")
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2000
-            self.L1 = 4.5
-            self.L10 = 2.45
-            self.L100 = 0.0
-            self.L1000 = 0.0
-            self.LWOOD = 7.0
-            self.LHERB = 1.55
-            self.DEPTH = 4.4
-            self.MXD = 25
-            self.HD = 8000
-            self.SCM = 104
-            self.WNDFC = 0.4
-            self.DROUGHT = 2.5
-
-
-        elif self.FMCode == "Y":  # Timber understory fuel model
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2000
-            self.L1 = 2.5
-            self.L10 = 2.2
-            self.L100 = 3.6
-            self.L1000 = 10.16
-            self.LWOOD = 0
-            self.LHERB = 0
-            self.DEPTH = 0.6
-            self.MXD = 25
-            self.HD = 8000
-            self.SCM = 5
-            self.WNDFC = 0.2
-            self.DROUGHT = 5
- 
-        elif self.FMCode == "Z":  # Grass
-            self.SG1 = 2000
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 1500
-            self.SGHERB = 2000
-            self.L1 = 4.5
-            self.L10 = 4.25
-            self.L100 = 4.0
-            self.L1000 = 4.0
-            self.LWOOD = 0.0
-            self.LHERB = 0.0
-            self.DEPTH = 1.5
-            self.MXD = 25
-            self.HD = 8000
-            self.SCM = 19
-            self.WNDFC = 0.4
-            self.DROUGHT = 7
-        else:	# Assign the Slash Fuel Model Parameters
-
-            self.SG1 = 1500
-            self.SG10 = 109
-            self.SG100 = 30
-            self.SG1000 = 8
-            self.SGWOOD = 0
-            self.SGHERB = 0
-            self.L1 = 7
-            self.L10 = 7
-            self.L100 = 6
-            self.L1000 = 5.5
-            self.LWOOD = 0
-            self.LHERB = 0
-            self.DEPTH = 1.3
-            self.MXD = 25
-            self.HD = 8000
-            self.SCM = 44
-            self.WNDFC = 0.5
-
-        if (self.SG1 <= 0):
-            self.SG1 = 2000
-        if (self.SG10 <= 0):
-            self.SG10 = 109
-        if (self.SG100 <=0 ):
-            self.SG100 = 30
-        if (self.SG1000 <= 0):
-            self.SG1000 = 8
-        if (self.SGWOOD <= 0):
-            self.SGWOOD = 1
-        if (self.SGHERB <= 0):
-            self.SGHERB = 1
-        self.W1 = self.L1 * self.CTA
-        self.W10 = self.L10 * self.CTA
-        self.W100 = self.L100 * self.CTA
-        self.W1000 = self.L1000 * self.CTA
-        self.WWOOD = self.LWOOD * self.CTA
-        self.WHERB = self.LHERB * self.CTA
+    def __new__(cls, FMCode):
+        FMCode = FMCode.upper()
+        FM = _FuelModels.get(FMCode)
+        if FM is None:
+            FM = _SlashModels.get(FMCode)
+            if FM is None:
+                FM = _SlashModels[FMCode] = cls._Build(FMCode, _SlashFuelModel)
+        return FM
+
+    ## \fn _Build Create a fuel model record from a tuple of FuelModelFields values
+    @classmethod
+    def _Build(cls, FMCode, Values):
+        FM = object.__new__(cls)
+        Set = object.__setattr__
+        Set(FM, "FMCode", FMCode)
+        Set(FM, "FuelModel", "")
+        for Name, Value in zip(FuelModelFields, Values):
+            Set(FM, Name, Value)
+        if (FM.SG1 <= 0):
+            Set(FM, "SG1", 2000)
+        if (FM.SG10 <= 0):
+            Set(FM, "SG10", 109)
+        if (FM.SG100 <= 0):
+            Set(FM, "SG100", 30)
+        if (FM.SG1000 <= 0):
+            Set(FM, "SG1000", 8)
+        if (FM.SGWOOD <= 0):
+            Set(FM, "SGWOOD", 1)
+        if (FM.SGHERB <= 0):
+            Set(FM, "SGHERB", 1)
+        Set(FM, "W1", FM.L1 * cls.CTA)
+        Set(FM, "W1P", 0.0)
+        Set(FM, "W10", FM.L10 * cls.CTA)
+        Set(FM, "W100", FM.L100 * cls.CTA)
+        Set(FM, "W1000", FM.L1000 * cls.CTA)
+        Set(FM, "WWOOD", FM.LWOOD * cls.CTA)
+        Set(FM, "WHERB", FM.LHERB * cls.CTA)
+        Set(FM, "WHERBP", 0.0)
+        return FM
+
+    ## \fn Custom Build a fuel model that is not in the standard table
+    ## \param FMCode Code to label the model with
+    ## \param Params Fuel model parameters (FuelModelFields), missing values take the class defaults
+    @classmethod
+    def Custom(cls, FMCode, **Params):
+        Unknown = set(Params) - set(FuelModelFields)
+        if Unknown:
+            raise TypeError("Unknown fuel model parameters: %s" % ", ".join(sorted(Unknown)))
+        Values = dict(_DefaultFuelModel, **Params)
+        return cls._Build(FMCode.upper(), tuple(Values[Name] for Name in FuelModelFields))
+
+    ## \fn Replace Copy of this fuel model with some parameters changed
+    def Replace(self, **Params):
+        return self.Custom(self.FMCode, **dict(zip(FuelModelFields, self.Params()), **Params))
+
+    ## \fn Params Tuple of the FuelModelFields values for this model
+    def Params(self):
+        return tuple(getattr(self, Name) for Name in FuelModelFields)
+
+    def __setattr__(self, Name, Value):
+        raise AttributeError("USNFDRSFuelModel is immutable, use Replace() to change %s" % Name)
+
+    def __delattr__(self, Name):
+        raise AttributeError("USNFDRSFuelModel is immutable")
+
+    def __reduce__(self):
+        if (_FuelModels.get(self.FMCode) or _SlashModels.get(self.FMCode)) is self:
+            return (USNFDRSFuelModel, (self.FMCode,))
+        return (USNFDRSFuelModel._Build, (self.FMCode, self.Params()))
+
+    def __repr__(self):
+        return "USNFDRSFuelModel(%r)" % self.FMCode
+
+## \var _FuelModels Registry of the standard fuel models, built once at import
+_FuelModels = {}
+for _Code, _Values in _FuelModelData.items():
+    _FuelModels[_Code] = USNFDRSFuelModel._Build(_Code, _Values)
+del _Code, _Values
+
+## \var _SlashModels Slash models of the unknown FMCodes seen so far, by code
+_SlashModels = {}
+
+## \var FuelModelCodes Codes of the standard fuel models, in table order
+FuelModelCodes = tuple(_FuelModels)
     
 class FuelMoisture:
     MC1 = 4
@@ -572,190 +178,367 @@ class FuelMoisture:
     MCWOOD = 90
 
 
+## Constants used by the index calculations
+CTA = 0.0459137
+KBDIThreshold = 100
+STD = .0555
+STL = .0555
+RHOD = 32
+RHOL = 32
+ETASD = 0.4173969
+ETASL = 0.4173969
+
+## \var PreparedCacheSize Number of custom (non-standard) prepared fuel models kept in the LRU cache
+PreparedCacheSize = 128
+## \class FuelBed
+## \brief Fuel bed terms that depend on the fuel model, the drought-adjusted loads and
+## the herbaceous curing fraction, but not on dead/woody moisture, wind or slope
+FuelBed = namedtuple("FuelBed", (
+    "HN1", "HN10", "HN100", "WRAT", "Live",
+    "XF1", "XF10", "XF100", "XFHERB", "XFWOOD",
+    "F1", "F10", "F100", "FHERB", "FWOOD", "FDEAD", "FLIVE", "WDEADN", "WLIVEN",
+    "RHOBED", "BETBAR", "GMAOP", "ZETA", "B", "UFACT", "BETSLP",
+    "F1E", "F10E", "F100E", "F1000E", "FHERBE", "FWOODE", "FDEADE", "FLIVEE",
+    "WDEDNE", "WLIVNE", "GMAOPE", "TAU"))
+_NewTuple = tuple.__new__
+
+## \class PreparedFuelModel
+## \brief Fuel model with the weather-independent terms of iCalcIndexes precomputed
+##
+## Obtain instances with PrepareFuelModel(FM). The terms that only depend on the fuel
+## model (base and drought loads, packing ratio, SG exponentials, live heating factors)
+## are computed once; the drought loads depend on the KBDI (see Drought) and the fuel
+## bed on those loads and the curing fraction, and are built per call (see Bed).
+class PreparedFuelModel:
+    __slots__ = ("FM",) + FuelModelFields + (
+        "W1", "W10", "W100", "W1000", "WWOOD", "WHERB", "WDROUGHT", "WTOTD", "WTOTL", "DroughtUnit",
+        "PackingRatio",
+        "EX1", "EX10", "EX100", "EXHERB", "EXWOOD", "HNHERB", "HNWOOD", "_Beds")
+
+    def __init__(self, FM):
+        self.FM = FM
+        for Name in FuelModelFields:
+            setattr(self, Name, getattr(FM, Name))
+        self.W1 = self.L1 * CTA
+        self.W10 = self.L10 * CTA
+        self.W100 = self.L100 * CTA
+        self.W1000 = self.L1000 * CTA
+        self.WWOOD = self.LWOOD * CTA
+        self.WHERB = self.LHERB * CTA
+        self.WDROUGHT = self.DROUGHT * CTA
+        self.WTOTD = self.W1 + self.W10 + self.W100 + self.W1000
+        self.WTOTL = self.WHERB + self.WWOOD
+        self.DroughtUnit = self.WDROUGHT / (800.0 - KBDIThreshold)
+
+        # Packing ratio used to rescale the depth after a drought load transfer
+        PackingRatio = (self.W1 + self.W10 + self.W100 + (self.WHERB + self.WWOOD)) / self.DEPTH
+        if (PackingRatio == 0):
+            PackingRatio = 1.0
+        self.PackingRatio = PackingRatio
+
+        self.EX1 = exp(-138.0 / self.SG1)
+        self.EX10 = exp(-138.0 / self.SG10)
+        self.EX100 = exp(-138.0 / self.SG100)
+        self.EXHERB = exp(-138.0 / self.SGHERB)
+        self.EXWOOD = exp(-138.0 / self.SGWOOD)
+        # Live extinction moisture heating number factors
+        if ((-500 / self.SGHERB) < -180.218):
+            self.HNHERB = 0
+        else:
+            self.HNHERB = exp(-500.0 / self.SGHERB)
+        if ((-500 / self.SGWOOD) < -180.218):
+            self.HNWOOD = 0
+        else:
+            self.HNWOOD = exp(-500.0 / self.SGWOOD)
+        self._Beds = {}
+
+    ## \fn Drought Dead loads and depth after the drought load transfer for a KBDI
+    ## \return (W1, W10, W100, W1000, DEPTH), or None at or below KBDIThreshold
+    def Drought(self, KBDI):
+        if (KBDI <= KBDIThreshold):
+            return None
+        # Drought load transfer of WDROUGHT into the dead classes, depth rescaled
+        Transfer = (KBDI - 100) * self.DroughtUnit
+        WTOTD = self.WTOTD
+        W1 = self.W1 + (self.W1 / WTOTD) * Transfer
+        W10 = self.W10 + (self.W10 / WTOTD) * Transfer
+        W100 = self.W100 + (self.W100 / WTOTD) * Transfer
+        W1000 = self.W1000 + (self.W1000 / WTOTD) * Transfer
+        fDEPTH = (W1 + W10 + W100 + W1000 + self.WTOTL - W1000) / self.PackingRatio
+        return (W1, W10, W100, W1000, fDEPTH)
+
+    ## \fn Bed Fuel bed for the drought loads and a herbaceous curing fraction
+    ## \param Loads Drought(KBDI)
+    ## \return FuelBed, or None when there is no dead fuel surface area
+    ##
+    ## Only the beds without drought transfer and with fully cured or fully green herbs
+    ## recur exactly from day to day, so only those two are memoized; any other bed is
+    ## built directly (a lookup keyed on the float KBDI and curing would almost never hit).
+    def Bed(self, Loads, fctCur):
+        if Loads is None and (fctCur == 0.0 or fctCur == 1.0):
+            Bed = self._Beds.get(fctCur, False)
+            if Bed is False:
+                Bed = self._Beds[fctCur] = self._MakeBed(None, fctCur)
+            return Bed
+        return self._MakeBed(Loads, fctCur)
+
+    def _MakeBed(self, Loads, fctCur):
+        if Loads is None:
+            W1 = self.W1
+            W10 = self.W10
+            W100 = self.W100
+            W1000 = self.W1000
+            fDEPTH = self.DEPTH
+        else:
+            W1, W10, W100, W1000, fDEPTH = Loads
+        SG1 = self.SG1
+        SG10 = self.SG10
+        SG100 = self.SG100
+        SG1000 = self.SG1000
+        SGWOOD = self.SGWOOD
+        SGHERB = self.SGHERB
+        WWOOD = self.WWOOD
+        WHERB = self.WHERB
+
+        W1P = W1 + WHERB * fctCur
+        WHERBP = WHERB * (1 - fctCur)
+
+        WTOTD = W1P + W10 + W100 + W1000					# Total Dead Fuel Loading
+        WTOTL = WHERBP + WWOOD								# Total Live Fuel Loading
+        WTOT = WTOTD + WTOTL								# Total Fuel Loading
+
+        W1N = W1P * (1.0 - STD)							# Net 1hr Fuel Loading
+        W10N = W10 * (1.0 - STD)							# Net 10hr Fuel Loading
+        W100N = W100 * (1.0 - STD)							# Net 100hr Fuel Loading
+        WHERBN = WHERBP * (1.0 - STL)						# Net Herbaceous Fuel Loading
+        WWOODN = WWOOD * (1.0 - STL)						# Net Woody Fuel Loading
+        WTOTLN = WTOTL * (1.0 - STL)						# Net Total Live Fuel Lodaing
+        RHOBED = (WTOT - W1000) / fDEPTH					# Bulk density of the fuel bed
+        RHOBAR = ((WTOTL * RHOL) + (WTOTD * RHOD)) / WTOT  # Weighted particle density of the fuel bed
+        BETBAR = RHOBED / RHOBAR							# Ratio of bulk density to particle density
+
+        # Moisture independent part of the Live Fuel Moisture of Extinction
+        HN1 = HN10 = HN100 = WRAT = 0
+        if (WTOTLN > 0):
+            HN1 = W1N * self.EX1
+            HN10 = W10N * self.EX10
+            HN100 = W100N * self.EX100
+            HNHERB = WHERBN * self.HNHERB if self.HNHERB else 0
+            HNWOOD = WWOODN * self.HNWOOD if self.HNWOOD else 0
+            if ((HNHERB + HNWOOD) == 0):
+                WRAT = 0
+            else:
+                WRAT = (HN1 + HN10 + HN100) / (HNHERB + HNWOOD)
+
+        SA1 = (W1P / RHOD) * SG1           # Surface area of dead 1hr fuel
+        SA10 = (W10 / RHOD) * SG10         # Surface area of dead 10hr fuel
+        SA100 = (W100 / RHOD) * SG100       # Surface area of dead 100hr fuel
+        SAHERB = (WHERBP / RHOL) * SGHERB   # Surface area of live herbaceous fuel
+        SAWOOD = (WWOOD / RHOL) * SGWOOD    # Surface area of live woody fuel
+        SADEAD = SA1 + SA10 + SA100		# Surface area of dead fuel
+        SALIVE = SAHERB + SAWOOD			# Surface area of live fuel
+
+        if (SADEAD <= 0):
+            return None
+
+        F1 = SA1 / SADEAD      #Proportion of dead-fuel surface area in 1-hour class,used as a weighting factor for ROS calculation
+        F10 = SA10 / SADEAD    #Proportion of dead-fuel surface area in 10-hour class,used as a weighting factor for ROS calculation
+        F100 = SA100 / SADEAD  #Proportion of dead-fuel surface area in 100-hour class,used as a weighting factor for ROS calculation
+        if (WTOTL <= 0):
+            FHERB = 0
+            FWOOD = 0
+        else:
+            FHERB = SAHERB / SALIVE
+            FWOOD = SAWOOD / SALIVE
+
+        FDEAD = SADEAD / (SADEAD + SALIVE)		# Fraction of Dead Fuel Surface area to total loading
+        FLIVE = SALIVE / (SADEAD + SALIVE)		# Fraction of Live Fuel Surface area to total loading
+        WDEADN = (F1 * W1N) + (F10 * W10N) + (F100 * W100N)	# Weighted deaf-fuel loading
+
+        if (SGWOOD > 1200 and SGHERB > 1200):
+            WLIVEN = WTOTLN
+        else:
+            WLIVEN = (FWOOD * WWOODN) + (FHERB * WHERBN)
+
+        # Characteristic surface area-to-volume ratio of dead fuel, surface area weighted
+        SGBRD = (F1 * SG1) + (F10 * SG10) + (F100 * SG100)
+        # Characteristic surface area-to-volume ratio of live fuel, surface area weighted.
+        SGBRL = (FHERB * SGHERB) + (FWOOD * SGWOOD)
+        # Characteristic surface area-to-volume ratio of fuel bed, surface area weighted.
+        SGBRT = (FDEAD * SGBRD) + (FLIVE * SGBRL)
+        # Optimum packing ratio, surface area weighted
+        BETOP = 3.348 * SGBRT ** -0.8189
+        # Weighted maximum reaction velocity of surface area
+        GMAMX = SGBRT ** 1.5 / (495.0 + 0.0594 * SGBRT ** 1.5)
+        AD = 133 * SGBRT ** -0.7913
+        # Weighted optimum reaction velocity of surface area
+        GMAOP = GMAMX * (BETBAR / BETOP) ** AD * exp(AD * (1.0 - (BETBAR / BETOP)))
+
+        ZETA = exp((0.792 + 0.681 * SGBRT ** 0.5) * (BETBAR + 0.1))
+        ZETA = ZETA / (192.0 + 0.2595 * SGBRT)
+
+        B = 0.02526 * SGBRT ** 0.54
+        C = 7.47 * exp(-0.133 * SGBRT ** 0.55)
+        E = 0.715 * exp(-3.59 * 10.0 ** -4.0 * SGBRT)
+        UFACT = C * (BETBAR / BETOP) ** (-1 * E)
+
+        # Loading weighted terms for the Energy Release Component
+        F1E = W1P / WTOTD
+        F10E = W10 / WTOTD
+        F100E = W100 / WTOTD
+        F1000E = W1000 / WTOTD
+        if (WTOTL <= 0):
+            FHERBE = 0
+            FWOODE = 0
+        else:
+            FHERBE = WHERBP / WTOTL
+            FWOODE = WWOOD / WTOTL
+        FDEADE = WTOTD / WTOT
+        FLIVEE = WTOTL / WTOT
+        WDEDNE = WTOTD * (1.0 - STD)
+        WLIVNE = WTOTL * (1.0 - STL)
+        SGBRDE = (F1E * SG1) + (F10E * SG10) + (F100E * SG100) + (F1000E * SG1000)
+        SGBRLE = (FHERBE * SGHERB) + (FWOODE * SGWOOD)
+        SGBRTE = (FDEADE * SGBRDE) + (FLIVEE * SGBRLE)
+        BETOPE = 3.348 * SGBRTE ** -0.8189
+        GMAMXE = SGBRTE ** 1.5 / (495.0 + 0.0594 * SGBRTE ** 1.5)
+        ADE = 133 * SGBRTE ** -0.7913
+        GMAOPE = GMAMXE * (BETBAR / BETOPE) ** ADE * exp(ADE * (1.0 - (BETBAR / BETOPE)))
+        TAU = 384.0 / SGBRT
+
+        # tuple.__new__ skips the namedtuple constructor's per-field argument handling
+        return _NewTuple(FuelBed, (HN1, HN10, HN100, WRAT, WTOTLN > 0,
+                       F1 * self.EX1, F10 * self.EX10, F100 * self.EX100,
+                       FHERB * self.EXHERB, FWOOD * self.EXWOOD,
+                       F1, F10, F100, FHERB, FWOOD, FDEAD, FLIVE, WDEADN, WLIVEN,
+                       RHOBED, BETBAR, GMAOP, ZETA, B, UFACT, BETBAR ** -0.3,
+                       F1E, F10E, F100E, F1000E, FHERBE, FWOODE, FDEADE, FLIVEE,
+                       WDEDNE, WLIVNE, GMAOPE, TAU))
+
+
+## \var _PreparedStandard Prepared standard fuel models (never evicted)
+_PreparedStandard = {}
+## \var _PreparedCustom LRU cache of prepared custom fuel models
+_PreparedCustom = OrderedDict()
+
+
+## \fn PrepareFuelModel Memoized PreparedFuelModel for a fuel model
+## \param FM USNFDRSFuelModel (or any object with the same attributes)
+## \return PreparedFuelModel
+##
+## USNFDRSFuelModel records are immutable and are cached by identity. Any other
+## object is cached by its parameter values, so a model whose parameters have
+## changed gets a fresh entry and the stale one ages out of the LRU.
+def PrepareFuelModel(FM):
+    PFM = _PreparedStandard.get(FM)
+    if PFM is not None:
+        return PFM
+    if isinstance(FM, PreparedFuelModel):
+        return FM
+    if isinstance(FM, USNFDRSFuelModel):
+        Key = FM
+    else:
+        Key = (getattr(FM, "FMCode", ""),) + tuple(getattr(FM, Name) for Name in FuelModelFields)
+    PFM = _PreparedCustom.get(Key)
+    if PFM is not None:
+        _PreparedCustom.move_to_end(Key)
+        return PFM
+    PFM = PreparedFuelModel(FM)
+    _PreparedCustom[Key] = PFM
+    while len(_PreparedCustom) > PreparedCacheSize:
+        _PreparedCustom.popitem(last=False)
+    return PFM
+
+
+## \fn ClearPreparedCache Drop every prepared custom fuel model
+def ClearPreparedCache():
+    _PreparedCustom.clear()
+
+
+for _FM in _FuelModels.values():
+    _PreparedStandard[_FM] = PreparedFuelModel(_FM)
+del _FM
+
+
+## \fn iCalcIndexes Calculate ERC, SC, BI and IC for one station-day
+## \param FM USNFDRSFuelModel or PreparedFuelModel
+## \param MC FuelMoisture, a FuelMoistureArray record or a (MC1, MC10, MC100, MC1000, MCHERB, MCWOOD) sequence
+## \param iWS 20ft wind speed (mph)
+## \param iSlopeCls Slope class (1-5)
+## \param fGSI Growing season index (unused)
+## \param KBDI Keetch-Byram Drought Index
+## \param FuelTemperature Nelson-derived fuel surface temperature
+## \return [ERC, SC, BI, IC] rounded to 2 places, or 0 when there is no dead fuel
 def iCalcIndexes (FM,MC,iWS, iSlopeCls,fGSI, KBDI,FuelTemperature):
 
-    CTA = 0.0459137
-    KBDIThreshold = 100
-    STD = .0555
-    STL = .0555
-    RHOD = 32
-    RHOL = 32
-    ETASD = 0.4173969
-    ETASL = 0.4173969
-       
-    # Fuel Model Y Parameters
-    SG1 = FM.SG1
-    SG10 = FM.SG10
-    SG100 = FM.SG100
-    SG1000 = FM.SG1000
-    SGWOOD = FM.SGWOOD
-    SGHERB = FM.SGHERB
-    L1 = FM.L1
-    L10 = FM.L10
-    L100 = FM.L100
-    L1000 = FM.L1000
-    LWOOD = FM.LWOOD
-    LHERB = FM.LHERB
-    DEPTH = FM.DEPTH
-    MXD = FM.MXD
-    HD = FM.HD
-    SCM = FM.SCM
-    WNDFC = FM.WNDFC
-    LDROUGHT = FM.DROUGHT
-    
+    Probe = NFDRSV4Instrument.Active
+    if Probe is not None:
+        Probe.Begin("scalar")
+        if KBDI > KBDIThreshold:
+            Probe.Count("KBDI>Threshold")
+
+    PFM = PrepareFuelModel(FM)
+    MXD = PFM.MXD
+    HD = PFM.HD
+    SCM = PFM.SCM
+    WNDFC = PFM.WNDFC
+
     # Fuel Moistures
-    MC1 = MC.MC1
-    MC10 = MC.MC10
-    MC100 = MC.MC100
-    MC1000 = MC.MC1000
-    MCHERB = MC.MCHERB
-    MCWOOD = MC.MCWOOD
-        
-    W1 = L1 * CTA
-    W10 = L10 * CTA
-    W100 = L100 * CTA
-    W1000 = L1000 * CTA
-    WWOOD = LWOOD * CTA
-    WHERB = LHERB * CTA
-    WWOOD = LWOOD * CTA
-    WDROUGHT = LDROUGHT * CTA
-    fDEPTH = DEPTH
-   
-    if (KBDI > KBDIThreshold ):
-        WTOTD = W1 + W10 + W100
-        WTOTL = WHERB + WWOOD
-        WTOT = WTOTD + WTOTL
-        PackingRatio = WTOT / fDEPTH
-        if (PackingRatio == 0):
-            PackingRatio = 1.0
-        WTOTD = WTOTD + W1000
-        
-        DroughtUnit = WDROUGHT / (800.0 - KBDIThreshold)
-
-        W1 = W1 + (W1 / WTOTD) * (KBDI - 100) * DroughtUnit
-        W10 = W10 + (W10 / WTOTD) * (KBDI - 100) * DroughtUnit
-        W100 = W100 + (W100 / WTOTD) * (KBDI - 100) * DroughtUnit
-        W1000 = W1000 + (W1000 / WTOTD) * (KBDI - 100) * DroughtUnit
-        WTOT = W1 + W10 + W100 + W1000 + WTOTL
-        fDEPTH = (WTOT - W1000) / PackingRatio
-    
+    if hasattr(MC, "MC1"):
+        MC1 = MC.MC1
+        MC10 = MC.MC10
+        MC100 = MC.MC100
+        MC1000 = MC.MC1000
+        MCHERB = MC.MCHERB
+        MCWOOD = MC.MCWOOD
+    else:
+        # A FuelMoistureArray record (or any sequence) in MC1..MCWOOD order, unpacked at once
+        MC1, MC10, MC100, MC1000, MCHERB, MCWOOD = MC.item() if hasattr(MC, "item") else MC
+
     fctCur = 1.33 - .0111 * MCHERB
     if (fctCur < 0):
         fctCur = 0.0
     if (fctCur > 1):
         fctCur = 1.0;
-    W1P = W1 + WHERB * fctCur
-    WHERBP = WHERB * (1 - fctCur)
-    
 
-
-    WTOTD = W1P + W10 + W100 + W1000					# Total Dead Fuel Loading
-    
-    WTOTL = WHERBP + WWOOD								# Total Live Fuel Loading
-    WTOT = WTOTD + WTOTL								# Total Fuel Loading
-   
-    W1N = W1P * (1.0 - STD)							# Net 1hr Fuel Loading
-    W10N = W10 * (1.0 - STD)							# Net 10hr Fuel Loading
-    W100N = W100 * (1.0 - STD)							# Net 100hr Fuel Loading
-    WHERBN = WHERBP * (1.0 - STL)						# Net Herbaceous Fuel Loading
-    WWOODN = WWOOD * (1.0 - STL)						# Net Woody Fuel Loading
-    WTOTLN = WTOTL * (1.0 - STL)						# Net Total Live Fuel Lodaing
-    RHOBED = (WTOT - W1000) / fDEPTH					# Bulk density of the fuel bed
-    RHOBAR = ((WTOTL * RHOL) + (WTOTD * RHOD)) / WTOT  # Weighted particle density of the fuel bed
-    BETBAR = RHOBED / RHOBAR							# Ratio of bulk density to particle density
-
-    # If live net fuel loading is greater than 0, calculate the 
-           	# Live Fuel Moisture of Extinction
-    if (WTOTLN > 0):
-    
-        HN1 = W1N * exp(-138.0 / SG1)
-        HN10 =W10N  * exp(-138.0 / SG10)
-        HN100 = W100N * exp(-138.0 / SG100)
-        
-        if ((-500 / SGHERB) < -180.218):
-            HNHERB = 0
-        else:
-            HNHERB = WHERBN * exp(-500.0 / SGHERB)
-        
-        if ((-500 / SGWOOD) < -180.218):
-            HNWOOD = 0
-        else:
-            HNWOOD = WWOODN * exp(-500.0 / SGWOOD)
-        
-        if ((HNHERB + HNWOOD) == 0):
-            WRAT = 0
-        else:
-            WRAT = (HN1 + HN10 + HN100) / (HNHERB + HNWOOD)
+    Loads = PFM.Drought(KBDI)
+    if Probe is not None:
+        Probe.Lap("Drought")
+    Bed = PFM.Bed(Loads, fctCur)
+    if Probe is not None:
+        Probe.Lap("FuelBed")
+    if Bed is None:
+        if Probe is not None:
+            Probe.Count("SADEAD<=0")
+        return(0)
+    (HN1, HN10, HN100, WRAT, Live, XF1, XF10, XF100, XFHERB, XFWOOD,
+     F1, F10, F100, FHERB, FWOOD, FDEAD, FLIVE, WDEADN, WLIVEN,
+     RHOBED, BETBAR, GMAOP, ZETA, B, UFACT, BETSLP,
+     F1E, F10E, F100E, F1000E, FHERBE, FWOODE, FDEADE, FLIVEE,
+     WDEDNE, WLIVNE, GMAOPE, TAU) = Bed
+
+    # Live Fuel Moisture of Extinction
+    if Live:
         MCLFE = ((MC1 * HN1) + (MC10 * HN10) + (MC100 * HN100)) / (HN1 + HN10 + HN100)
         MXL = (2.9 * WRAT * (1.0 - MCLFE / MXD) - 0.226) * 100
-        
     else:
         MXL = 0
 
     if (MXL < MXD):
         MXL = MXD
-    SA1 = (W1P / RHOD) * SG1           # Surface area of dead 1hr fuel
-    SA10 = (W10 / RHOD) * SG10         # Surface area of dead 10hr fuel
-    SA100 = (W100 / RHOD) * SG100       # Surface area of dead 100hr fuel
-    SAHERB = (WHERBP / RHOL) * SGHERB   # Surface area of live herbaceous fuel
-    SAWOOD = (WWOOD / RHOL) * SGWOOD    # Surface area of live woody fuel
-    SADEAD = SA1 + SA10 + SA100		# Surface area of dead fuel
-    SALIVE = SAHERB + SAWOOD			# Surface area of live fuel
-
-    
-    if (SADEAD <= 0):
-        return(0)
-
-    F1 = SA1 / SADEAD      #Proportion of dead-fuel surface area in 1-hour class,used as a weighting factor for ROS calculation
-    F10 = SA10 / SADEAD    #Proportion of dead-fuel surface area in 10-hour class,used as a weighting factor for ROS calculation
-    F100 = SA100 / SADEAD  #Proportion of dead-fuel surface area in 100-hour class,used as a weighting factor for ROS calculation
-    if (WTOTL <=0):
-    
-       FHERB = 0
-       FWOOD = 0
-    
-    else:
-    
-        FHERB = SAHERB / SALIVE
-        FWOOD = SAWOOD / SALIVE
-    
-    FDEAD = SADEAD / (SADEAD + SALIVE)		# Fraction of Dead Fuel Surface area to total loading
-    FLIVE = SALIVE / (SADEAD + SALIVE)		# Fraction of Live Fuel Surface area to total loading
-    WDEADN = (F1 * W1N) + (F10 * W10N) + (F100 * W100N)	# Weighted deaf-fuel loading
-
-    if (SGWOOD > 1200 and SGHERB > 1200):
-        WLIVEN = WTOTLN
-    else:
-        WLIVEN = (FWOOD * WWOODN) + (FHERB * WHERBN)
-
-	# Characteristic surface area-to-volume ratio of dead fuel, surface area weighted
-    SGBRD = (F1 * SG1) + (F10 * SG10) + (F100 * SG100)
-
-	# Characteristic surface area-to-volume ratio of live fuel, surface area weighted.
-    SGBRL = (FHERB * SGHERB) + (FWOOD * SGWOOD)
-
-	# Characteristic surface area-to-volume ratio of fuel bed, surface area weighted.
-    SGBRT = (FDEAD * SGBRD) + (FLIVE * SGBRL)
-
-	# Optimum packing ratio, surface area weighted
-    BETOP = 3.348 * pow(SGBRT, -0.8189)
-
-	# Weighted maximum reaction velocity of surface area
-    GMAMX = pow(SGBRT, 1.5) / (495.0 + 0.0594 * pow(SGBRT, 1.5))
-    AD = 133 * pow(SGBRT, -0.7913)
-	# Weighted optimum reaction velocity of surface area
-    GMAOP = GMAMX * pow((BETBAR / BETOP), AD) * exp(AD * (1.0 - (BETBAR / BETOP)))
-
-    ZETA = exp((0.792 + 0.681 * pow(SGBRT, 0.5)) * (BETBAR + 0.1))
-    ZETA = ZETA / (192.0 + 0.2595 * SGBRT)
+    if Probe is not None:
+        Probe.Lap("LiveExtinction")
 
     WTMCD = (F1 * MC1) + (F10 * MC10) + (F100 * MC100)
     WTMCL = (FHERB * MCHERB) + (FWOOD * MCWOOD)
     DEDRT = WTMCD / MXD
     LIVRT = WTMCL / MXL
-    ETAMD = 1.0 - 2.59 * DEDRT + 5.11 * pow(DEDRT,2.0) - 3.52 * pow(DEDRT, 3.0)
-    ETAML = 1.0 - 2.59 * LIVRT + 5.11 * pow(LIVRT,2.0) - 3.52 * pow(LIVRT, 3.0)
-    
+    ETAMD = 1.0 - 2.59 * DEDRT + 5.11 * DEDRT ** 2.0 - 3.52 * DEDRT ** 3.0
+    ETAML = 1.0 - 2.59 * LIVRT + 5.11 * LIVRT ** 2.0 - 3.52 * LIVRT ** 3.0
+    if Probe is not None:
+        Probe.Count("ETAMD clamped", not 0 <= ETAMD <= 1)
+        Probe.Count("ETAML clamped", not 0 <= ETAML <= 1)
+
     if (ETAMD < 0):
         ETAMD = 0
     if (ETAMD > 1):
@@ -765,22 +548,18 @@ def iCalcIndexes (FM,MC,iWS, iSlopeCls,fGSI, KBDI,FuelTemperature):
     if (ETAML > 1):
         ETAML = 1
 
-    B = 0.02526 * pow(SGBRT, 0.54)
-    C = 7.47 * exp(-0.133 * pow(SGBRT,0.55))
-    E = 0.715 * exp(-3.59 * pow(10.0, -4.0) * SGBRT)
-    
-    UFACT = C * pow(BETBAR / BETOP, -1 * E)
-    
     IR = GMAOP * ((WDEADN * HD * ETASD * ETAMD) + (WLIVEN * HD * ETASL * ETAML))
-   
+
     fWNDFC = WNDFC
 
     if (88.0 * iWS * fWNDFC > 0.9 * IR):
-        PHIWND = UFACT * pow(0.9 * IR, B)
-    
+        PHIWND = UFACT * (0.9 * IR) ** B
+        if Probe is not None:
+            Probe.Count("PHIWND wind limit")
+
     else:
-        PHIWND = UFACT * pow(iWS * 88.0 * fWNDFC, B)
-    
+        PHIWND = UFACT * (iWS * 88.0 * fWNDFC) ** B
+
 
     # Actual slopes in degrees (>5) can now be input
     # Matches forumla used in WIMS developed by Larry Bradshaw (31 Aug 2016)
@@ -795,52 +574,29 @@ def iCalcIndexes (FM,MC,iWS, iSlopeCls,fGSI, KBDI,FuelTemperature):
         slpfct = 2.134
     elif iSlopeCls == 5:
         slpfct = 4.273
-     
-    
 
-    PHISLP = slpfct * pow(BETBAR, -0.3)
-    
-    XF1 = F1 * exp(-138.0 /  (SG1)) * (250.0 + 11.16 * MC1)
-    XF10 = F10 * exp(-138.0 / (SG10)) * (250.0 + 11.16 * MC10)
-    XF100 = F100 * exp(-138.0 / (SG100)) * (250.0 + 11.16 * MC100)
-    XFHERB = FHERB * exp(-138.0 /(SGHERB)) * (250.0 + 11.16 * MCHERB)
-    XFWOOD = FWOOD * exp(-138.0 / (SGWOOD)) * (250.0 + 11.16 * MCWOOD)
+    PHISLP = slpfct * BETSLP
+
+    XF1 = XF1 * (250.0 + 11.16 * MC1)
+    XF10 = XF10 * (250.0 + 11.16 * MC10)
+    XF100 = XF100 * (250.0 + 11.16 * MC100)
+    XFHERB = XFHERB * (250.0 + 11.16 * MCHERB)
+    XFWOOD = XFWOOD * (250.0 + 11.16 * MCWOOD)
     HTSINK = RHOBED * (FDEAD * (XF1 + XF10 + XF100) + FLIVE * (XFHERB + XFWOOD))
-    
+
     fSC = IR * ZETA * (1.0 + PHISLP + PHIWND) / HTSINK
-    
-    F1E = W1P / WTOTD
-    F10E = W10 / WTOTD
-    F100E = W100 / WTOTD
-    F1000E = W1000 / WTOTD
-    
-    if (WTOTL <=0):
-        FHERBE = 0
-        FWOODE = 0
-    
-    else:
-        FHERBE = WHERBP / WTOTL
-        FWOODE = WWOOD / WTOTL
-    
-    FDEADE = WTOTD / WTOT
-    FLIVEE = WTOTL / WTOT
-    WDEDNE = WTOTD * (1.0 - STD)
-    WLIVNE = WTOTL * (1.0 - STL)
-    SGBRDE = (F1E * SG1) + (F10E * SG10) + (F100E * SG100) + (F1000E * SG1000)
-    
-    SGBRLE = (FHERBE * SGHERB) + (FWOODE * SGWOOD)
-    SGBRTE = (FDEADE * SGBRDE) + (FLIVEE * SGBRLE)
-    BETOPE = 3.348 * pow(SGBRTE, -0.8189)
-    GMAMXE = pow(SGBRTE, 1.5) / (495.0 + 0.0594 * pow(SGBRTE, 1.5))
-    ADE = 133 * pow(SGBRTE, -0.7913)
-    GMAOPE = GMAMXE * pow( (BETBAR/BETOPE), ADE) * exp(ADE * (1.0 - (BETBAR / BETOPE)))
-    
+    if Probe is not None:
+        Probe.Lap("Spread")
+
     WTMCDE = (F1E * MC1) + (F10E * MC10) + (F100E * MC100) + (F1000E * MC1000)
     WTMCLE = (FHERBE * MCHERB) + (FWOODE * MCWOOD)
     DEDRTE = WTMCDE / MXD
     LIVRTE = WTMCLE / MXL
-    ETAMDE = 1.0 - 2.0 * DEDRTE + 1.5 * pow(DEDRTE,2.0) - 0.5 * pow(DEDRTE, 3.0)
-    ETAMLE = 1.0 - 2.0 * LIVRTE + 1.5 * pow(LIVRTE,2.0) - 0.5 * pow(LIVRTE, 3.0)
+    ETAMDE = 1.0 - 2.0 * DEDRTE + 1.5 * DEDRTE ** 2.0 - 0.5 * DEDRTE ** 3.0
+    ETAMLE = 1.0 - 2.0 * LIVRTE + 1.5 * LIVRTE ** 2.0 - 0.5 * LIVRTE ** 3.0
+    if Probe is not None:
+        Probe.Count("ETAMDE clamped", not 0 <= ETAMDE <= 1)
+        Probe.Count("ETAMLE clamped", not 0 <= ETAMLE <= 1)
     if (ETAMDE < 0):
         ETAMDE = 0
     if (ETAMDE > 1):
@@ -851,16 +607,17 @@ def iCalcIndexes (FM,MC,iWS, iSlopeCls,fGSI, KBDI,FuelTemperature):
         ETAMLE = 1
 
     IRE = (FDEADE * WDEDNE * HD * ETASD * ETAMDE)
-    
+
     IRE = GMAOPE * (IRE + (FLIVEE * WLIVNE * (HD) * ETASL * ETAMLE))
-    TAU = 384.0 / SGBRT
     fERC = 0.04 * IRE * TAU
-    
-    fBI = (.301 * pow((fSC * fERC), 0.46)) * 10.0
+
+    fBI = (.301 * (fSC * fERC) ** 0.46) * 10.0
     ERC = fERC
     BI = fBI
     SC = fSC
-    
+    if Probe is not None:
+        Probe.Lap("ERC")
+
     # Finally, calculate the Igntion Component
     TMPPRM = 0.0
     PNORM1 = 0.00232
@@ -878,15 +635,15 @@ def iCalcIndexes (FM,MC,iWS, iSlopeCls,fGSI, KBDI,FuelTemperature):
     TMPPRM = FuelTemperature
 
     QIGN = 144.5 - (0.266 * TMPPRM) - (0.00058 * TMPPRM * TMPPRM) - (0.01 * TMPPRM * MC1) + 18.54 * (1.0 - exp(-0.151 * MC1)) + 6.4 * MC1
-    
+
     if (QIGN >= 344.0):
         IC = 0
 
     CHI = (344.0 - QIGN) / 10.0
-    if ((pow(CHI, 3.66) * 0.000923 / 50) <= PNORM1):
+    if ((CHI ** 3.66 * 0.000923 / 50) <= PNORM1):
         IC = 0
 
-    PI = ((pow(CHI, 3.66) * 0.000923 / 50) - PNORM1) * 100.0 / PNORM2
+    PI = ((CHI ** 3.66 * 0.000923 / 50) - PNORM1) * 100.0 / PNORM2
     if (PI < 0):
         PI = 0
     if (PI > 100):
@@ -894,11 +651,13 @@ def iCalcIndexes (FM,MC,iWS, iSlopeCls,fGSI, KBDI,FuelTemperature):
     SCN = 100.0 * SC / SCM
     if (SCN > 100.0):
         SCN = 100.0
-    PFI = pow(SCN, 0.5)
+    PFI = SCN ** 0.5
     IC = 0.10 * PI * PFI
-    
+
     if (SC < 0.00001):
         IC = 0
+    if Probe is not None:
+        Probe.Lap("Ignition")
+
 
-       
     return ([round(ERC,2),round(SC,2),round(BI,2),round(IC,2)])
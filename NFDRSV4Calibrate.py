@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+GSI live fuel moisture parameter calibration.
+
+Station weather and LFM observations are prepared once (indicator inputs,
+precipitation prefix sums and the observation to weather join).  Candidate
+11-element GSI parameter vectors are then scored in vectorized batches,
+optionally across a process pool, by Spearman rho and mean absolute error
+against the observations, as MakeGSILFMCompareNew does in the notebook.
+
+No bound-based pruning is done: every candidate that is not degenerate (see
+CalibrationData.Degenerate) is scored in full.  The modeled LFM is rescaled by
+the largest GSI of the whole model period, so a partial score over a subset of
+days or observations does not bound the final score, and a candidate cannot be
+dropped early without risking the loss of the best one.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import os
+import random
+
+import numpy as np
+
+from NFDRSV4GSI import CalcDayl, RollingSum
+from NFDRSV4LFM import JoinMap
+
+## \var GSIParamNames Names of the 11 GSI parameters, in parameter vector order
+GSIParamNames = ("TminLow", "TminUp", "VPDLow", "VPDUp", "DaylLow", "DaylUp",
+                 "PrcpRTLow", "PrcpRTUp", "GSIPeriod", "GUThresh", "PrcpRTPeriod")
+
+## \var DefaultGSIParams Default GSI parameter vector
+DefaultGSIParams = (-2, 5, 900, 4100, 36000, 39600, 0.9, 1.5, 21, 0.25, 21)
+
+## \var FailedScore (Rho, MAE) reported when the modeled LFM is constant, as in the notebook
+FailedScore = (-999.9, 999.9)
+
+_Windows = (GSIParamNames.index("GSIPeriod"), GSIParamNames.index("PrcpRTPeriod"))
+
+
+## \fn _Column First of several column names present in a DataFrame
+def _Column(df, *Names):
+    for Name in Names:
+        if Name in df:
+            return df[Name].to_numpy()
+    raise KeyError("None of %s in DataFrame" % (Names,))
+
+
+## \fn _Ind GSI ramp function with per-row (broadcast) limits
+def _Ind(Var, Low, Up):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Out = np.where(Var < Low, 0.0, np.where(Var > Up, 1.0, (Var - Low) / (Up - Low)))
+    return np.where(Up == Low, 0.0, Out)
+
+
+## \fn _Rolling Trailing window sums of each row with its own window length
+## \param Cum Row-wise cumulative sums with a leading 0 column, shape (K, n+1)
+## \param Miss Row-wise cumulative NaN counts with a leading 0 column, shape (K, n+1)
+## \param Windows Window length per row
+def _Rolling(Cum, Miss, Windows):
+    K, n = Cum.shape[0], Cum.shape[1] - 1
+    Out = np.full((K, n), np.nan)
+    for w in np.unique(Windows):
+        Rows = np.flatnonzero(Windows == w)
+        if w < 1 or w > n:
+            continue
+        c = Cum[Rows]
+        m = Miss[Rows]
+        Out[Rows, w - 1:] = np.where(m[:, w:] - m[:, :-w] > 0, np.nan, c[:, w:] - c[:, :-w])
+    return Out
+
+
+## \fn _PrefixSums Cumulative sums (NaN as 0) and NaN counts along the last axis, with a leading 0
+def _PrefixSums(x):
+    Missing = np.isnan(x)
+    Pad = [(0, 0)] * (x.ndim - 1) + [(1, 0)]
+    return (np.pad(np.cumsum(np.where(Missing, 0.0, x), axis=-1), Pad),
+            np.pad(np.cumsum(Missing, axis=-1), Pad))
+
+
+## \fn AverageRanks Ranks with ties given their average rank (1-based)
+def AverageRanks(a):
+    Order = np.argsort(a, kind="mergesort")
+    s = a[Order]
+    First = np.concatenate(([True], s[1:] != s[:-1]))
+    Starts = np.flatnonzero(First)
+    Counts = np.diff(np.append(Starts, len(a)))
+    Ranks = np.empty(len(a))
+    Ranks[Order] = (Starts + (Counts - 1) / 2.0 + 1)[np.cumsum(First) - 1]
+    return Ranks
+
+
+## \class CalibrationData
+## \brief Station weather and LFM observations prepared once for repeated scoring
+class CalibrationData:
+
+    ## \fn __init__
+    ## \param Dates Daily weather dates (datetime64), ascending and unique
+    ## \param Tmin Daily minimum temperature (deg F)
+    ## \param VPDMax Daily maximum VPD (Pa)
+    ## \param Prcp Daily precipitation (in)
+    ## \param ObsDates LFM observation dates (matched to the weather by day, see Tolerance)
+    ## \param ObsLFM Observed live fuel moisture (%)
+    ## \param Lat Station latitude
+    ## \param LFMMin, LFMMax LFM limits; default to the 3rd and 97th percentiles of ObsLFM
+    ## \param PLowLim, PUpperLim GSI model period (PLowLim < date <= PUpperLim), as in CalcGSI
+    ## \param CompareLow, CompareUp Period compared with observations (CompareLow < date <= CompareUp)
+    ## \param UsePrcp Score the precipitation-enhanced LFM (LFMWoodP) rather than LFMWood
+    ## \param Tolerance, Direction As-of matching of observations to weather days (see
+    ## NFDRSV4LFM.JoinMap); the default 0 matches the same day only, as the notebook's merge
+    def __init__(self, Dates, Tmin, VPDMax, Prcp, ObsDates, ObsLFM, Lat, LFMMin=None, LFMMax=None,
+                 PLowLim='2014-01-01', PUpperLim='2020-12-31', CompareLow='2014-01-01',
+                 CompareUp='2019-12-31', UsePrcp=True, Tolerance=0, Direction="backward"):
+        Dates = np.asarray(Dates, dtype="datetime64[s]")
+        ObsDates = np.asarray(ObsDates, dtype="datetime64[s]")
+        ObsLFM = np.asarray(ObsLFM, dtype=np.float64)
+        if LFMMin is None:
+            LFMMin = int(np.nanquantile(ObsLFM, 0.03))
+        if LFMMax is None:
+            LFMMax = int(np.nanquantile(ObsLFM, 0.97))
+        self.LFMMin = LFMMin
+        self.LFMMax = LFMMax
+        self.Lat = Lat
+        self.UsePrcp = UsePrcp
+
+        Keep = (Dates > np.datetime64(PLowLim)) & (Dates <= np.datetime64(PUpperLim))
+        self.Dates = Dates[Keep]
+        self.TminC = (np.asarray(Tmin, dtype=np.float64)[Keep] - 32.0) * 5.0 / 9.0
+        self.VPDMax = np.asarray(VPDMax, dtype=np.float64)[Keep]
+        self.Dayl = CalcDayl(Lat, (self.Dates.astype("datetime64[D]") -
+                                   self.Dates.astype("datetime64[Y]")).astype(int) + 1)
+        self.Prcp = np.asarray(Prcp, dtype=np.float64)[Keep]
+        self._PrcpRT = {}
+
+        # Join observations to the weather once; every evaluation gathers with ObsIdx
+        InWindow = (ObsDates > np.datetime64(CompareLow)) & (ObsDates <= np.datetime64(CompareUp)) & ~np.isnan(ObsLFM)
+        Idx = JoinMap(self.Dates.astype("datetime64[D]").astype(np.int64),
+                      ObsDates.astype("datetime64[D]").astype(np.int64), Tolerance, Direction)
+        Found = InWindow & (Idx >= 0)
+        self.ObsIdx = Idx[Found]
+        self.ObsLFM = ObsLFM[Found]
+        self.ObsRanks = AverageRanks(self.ObsLFM)
+
+    ## \fn FromFrames Prepare from notebook style DataFrames
+    ## \param Met Daily weather with DateTime and Tmin/MinT, VPDMax/VPDM and Prcp/Rain columns
+    ## \param LFMObs LFM observations with DateTime and Percent columns (see ReadNFMDData)
+    @classmethod
+    def FromFrames(cls, Met, LFMObs, Lat, **Options):
+        return cls(_Column(Met, "DateTime"), _Column(Met, "Tmin", "MinT"), _Column(Met, "VPDMax", "VPDM"),
+                   _Column(Met, "Prcp", "Rain"), _Column(LFMObs, "DateTime"), _Column(LFMObs, "Percent"),
+                   Lat, **Options)
+
+    ## \fn FromObservations Prepare from notebook style weather and an LFM observation store
+    ## \param Met Daily weather DataFrame (see FromFrames)
+    ## \param Obs NFDRSV4LFM.LFMObservations
+    ## \param Site, Fuel Observations to calibrate against
+    @classmethod
+    def FromObservations(cls, Met, Obs, Site, Fuel, Lat, **Options):
+        return cls(_Column(Met, "DateTime"), _Column(Met, "Tmin", "MinT"), _Column(Met, "VPDMax", "VPDM"),
+                   _Column(Met, "Prcp", "Rain"), Obs.Dates(Site, Fuel), Obs.Select(Site, Fuel)[1],
+                   Lat, **Options)
+
+    ## \fn PrcpRT Running total precipitation for a window length (memoized per window)
+    def PrcpRT(self, Window):
+        RT = self._PrcpRT.get(Window)
+        if RT is None:
+            RT = self._PrcpRT[Window] = RollingSum(self.Prcp, Window)
+        return RT
+
+    ## \fn ModelLFM Modeled LFM at the observations for a batch of parameter vectors
+    ## \param Params array (K, 11) of GSI parameter vectors
+    ## \return array (K, number of observations)
+    def ModelLFM(self, Params):
+        P = np.asarray(Params, dtype=np.float64).reshape(-1, len(GSIParamNames))
+        Col = lambda j: P[:, j:j + 1]
+        iGSI = (_Ind(self.TminC, Col(0), Col(1)) * (1 - _Ind(self.VPDMax, Col(2), Col(3))) *
+                _Ind(self.Dayl, Col(4), Col(5)))
+        if self.UsePrcp:
+            PrcpRT = np.stack([self.PrcpRT(w) for w in np.rint(P[:, _Windows[1]]).astype(int)])
+            iGSI = iGSI * _Ind(PrcpRT, Col(6), Col(7))
+        GSIPeriod = np.rint(P[:, _Windows[0]]).astype(int)
+        GSI = _Rolling(*_PrefixSums(iGSI), GSIPeriod) / GSIPeriod[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            Max = np.nanmax(np.where(np.isnan(GSI), -np.inf, GSI), axis=1, keepdims=True)
+            GSI_RS = GSI / np.where(np.isinf(Max), np.nan, Max)
+            GUThresh = Col(9)
+            m = (self.LFMMax - self.LFMMin) / (1 - GUThresh)
+            b = self.LFMMax - m
+            LFM = np.where(GSI_RS >= GUThresh, m * GSI_RS + b, self.LFMMin)
+        return LFM[:, self.ObsIdx]
+
+    ## \fn Score Spearman rho and MAE for a batch of parameter vectors
+    ## \return (Rho, MAE) arrays of length K
+    def Score(self, Params):
+        Pred = self.ModelLFM(Params)
+        K = len(Pred)
+        Rho = np.full(K, FailedScore[0])
+        MAE = np.full(K, FailedScore[1])
+        if Pred.shape[1] == 0:
+            return Rho, MAE
+        x = self.ObsRanks - self.ObsRanks.mean()
+        for k in range(K):
+            if Pred[k].max() == Pred[k].min():
+                continue
+            y = AverageRanks(Pred[k])
+            y = y - y.mean()
+            Rho[k] = (x * y).sum() / np.sqrt((x * x).sum() * (y * y).sum())
+            MAE[k] = np.mean(np.abs(self.ObsLFM - Pred[k]))
+        return Rho, MAE
+
+    ## \fn Degenerate True for parameter vectors whose modeled LFM is constant by construction
+    ##
+    ## These get FailedScore without being modeled; this is the only candidate filtering done.
+    def Degenerate(self, Params):
+        P = np.asarray(Params, dtype=np.float64)
+        n = len(self.Dates)
+        Bad = (P[0] == P[1]) or (P[4] == P[5]) or not (1 <= round(P[_Windows[0]]) <= n)
+        if self.UsePrcp:
+            Bad = Bad or (P[6] == P[7]) or not (1 <= round(P[_Windows[1]]) <= n)
+        return Bad
+
+
+## \var _WorkerData CalibrationData of a worker process, set once by the pool initializer
+_WorkerData = None
+
+
+## \fn _InitWorker Pool initializer; the prepared data is sent to each worker only once
+def _InitWorker(Data):
+    global _WorkerData
+    _WorkerData = Data
+
+
+## \fn _ScoreBatchWith Score a batch of parameter vectors as a list of (Rho, MAE)
+def _ScoreBatchWith(Data, Params):
+    Rho, MAE = Data.Score(Params)
+    return list(zip(Rho.tolist(), MAE.tolist()))
+
+
+## \fn _ScoreBatch Score a batch against the worker's data (runs in a worker)
+def _ScoreBatch(Params):
+    return _ScoreBatchWith(_WorkerData, Params)
+
+
+## \class GSICalibrator
+## \brief Grid, random and coordinate-descent search over GSI parameter vectors
+class GSICalibrator:
+
+    ## \fn __init__
+    ## \param Data CalibrationData
+    ## \param Workers Worker processes (0 = evaluate in this process, None = os.cpu_count())
+    ## \param BatchSize Parameter vectors scored per vectorized batch
+    ## \param Checkpoint Optional JSON lines file; scores already in it are not recomputed,
+    ## new scores are appended as batches finish, so an interrupted search can be resumed
+    ## \param Objective "MAE" (minimize) or "Rho" (maximize), used to pick the best vector
+    def __init__(self, Data, Workers=0, BatchSize=64, Checkpoint=None, Objective="MAE"):
+        if Objective not in ("MAE", "Rho"):
+            raise ValueError("Objective must be 'MAE' or 'Rho'")
+        self.Data = Data
+        self.Workers = Workers
+        self.BatchSize = BatchSize
+        self.Checkpoint = Checkpoint
+        self.Objective = Objective
+        self.Results = {}
+        self._Executor = None
+        if Checkpoint is not None and os.path.exists(Checkpoint):
+            with open(Checkpoint) as f:
+                for Line in f:
+                    if Line.strip():
+                        Rec = json.loads(Line)
+                        self.Results[self._Key(Rec["Params"])] = (Rec["Rho"], Rec["MAE"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *Exc):
+        self.Close()
+
+    ## \fn Close Shut down the worker pool
+    def Close(self):
+        if self._Executor is not None:
+            self._Executor.shutdown()
+            self._Executor = None
+
+    ## \fn _Key Hashable key of a parameter vector
+    @staticmethod
+    def _Key(Params):
+        return tuple(float(x) for x in Params)
+
+    ## \fn Evaluate Score parameter vectors, reusing earlier and checkpointed scores
+    ## \param Candidates iterable of 11-element parameter vectors
+    ## \return list of (Params, Rho, MAE) in candidate order
+    def Evaluate(self, Candidates):
+        Keys = [self._Key(c) for c in Candidates]
+        Todo = []
+        for Key in dict.fromkeys(Keys):
+            if Key in self.Results:
+                continue
+            if self.Data.Degenerate(Key):
+                self._Record([(Key, FailedScore)])
+            else:
+                Todo.append(Key)
+        Batches = [Todo[i:i + self.BatchSize] for i in range(0, len(Todo), self.BatchSize)]
+        if self.Workers == 0:
+            Scored = map(lambda B: _ScoreBatchWith(self.Data, B), Batches)
+        else:
+            if self._Executor is None:
+                self._Executor = ProcessPoolExecutor(max_workers=self.Workers, initializer=_InitWorker,
+                                                     initargs=(self.Data,))
+            Scored = self._Executor.map(_ScoreBatch, Batches)
+        for Batch, Scores in zip(Batches, Scored):
+            self._Record(list(zip(Batch, Scores)))
+        return [(Key,) + tuple(self.Results[Key]) for Key in Keys]
+
+    ## \fn _Record Store (Params, (Rho, MAE)) pairs and append them to the checkpoint
+    def _Record(self, Pairs):
+        for Key, Score in Pairs:
+            self.Results[Key] = tuple(Score)
+        if self.Checkpoint is not None:
+            with open(self.Checkpoint, "a") as f:
+                for Key, Score in Pairs:
+                    f.write(json.dumps({"Params": Key, "Rho": Score[0], "MAE": Score[1]}) + "\n")
+
+    ## \fn _Better True if score a beats score b under the objective
+    def _Better(self, a, b):
+        if b is None:
+            return a[1] != FailedScore[0]
+        if a[1] == FailedScore[0]:
+            return False
+        return a[2] < b[2] if self.Objective == "MAE" else a[1] > b[1]
+
+    ## \fn Best Best (Params, Rho, MAE) of a list of results, or of everything scored so far
+    def Best(self, Results=None):
+        if Results is None:
+            Results = [(Key,) + Score for Key, Score in self.Results.items()]
+        Best = None
+        for r in Results:
+            if self._Better(r, Best):
+                Best = r
+        return Best
+
+    ## \fn _Axes Parameter axes keyed by position
+    @staticmethod
+    def _Axes(Axes):
+        return {(GSIParamNames.index(k) if isinstance(k, str) else k): list(v) for k, v in Axes.items()}
+
+    ## \fn GridSearch Score the full product of the parameter axes
+    ## \param Axes dict of parameter name (or index) -> list of values; others come from Base
+    ## \param Base Parameter vector for parameters not on an axis
+    ## \return best (Params, Rho, MAE)
+    def GridSearch(self, Axes, Base=DefaultGSIParams):
+        Axes = self._Axes(Axes)
+        Index = sorted(Axes)
+        Candidates = []
+        for Values in itertools.product(*(Axes[i] for i in Index)):
+            p = list(Base)
+            for i, v in zip(Index, Values):
+                p[i] = v
+            Candidates.append(p)
+        return self.Best(self.Evaluate(Candidates))
+
+    ## \fn RandomSearch Score N parameter vectors drawn uniformly from bounds
+    ## \param Bounds dict of parameter name (or index) -> (low, high); window lengths are drawn as integers
+    ## \param N Number of vectors
+    ## \param Seed Random seed (the same seed draws the same vectors)
+    ## \return best (Params, Rho, MAE)
+    def RandomSearch(self, Bounds, N, Seed=0, Base=DefaultGSIParams):
+        Bounds = self._Axes(Bounds)
+        Rng = random.Random(Seed)
+        Candidates = []
+        for _ in range(N):
+            p = list(Base)
+            for i in sorted(Bounds):
+                Low, High = Bounds[i]
+                p[i] = Rng.randint(int(Low), int(High)) if i in _Windows else Rng.uniform(Low, High)
+            Candidates.append(p)
+        return self.Best(self.Evaluate(Candidates))
+
+    ## \fn CoordinateDescent Improve one parameter at a time over its axis until nothing improves
+    ## \param Axes dict of parameter name (or index) -> list of values to try
+    ## \param Start Starting parameter vector
+    ## \param MaxRounds Maximum passes over all axes
+    ## \return best (Params, Rho, MAE)
+    def CoordinateDescent(self, Axes, Start=DefaultGSIParams, MaxRounds=10):
+        Axes = self._Axes(Axes)
+        Best = self.Best(self.Evaluate([Start]))
+        Current = list(Start) if Best is None else list(Best[0])
+        for _ in range(MaxRounds):
+            Improved = False
+            for i in sorted(Axes):
+                Candidates = []
+                for v in Axes[i]:
+                    p = list(Current)
+                    p[i] = v
+                    Candidates.append(p)
+                Trial = self.Best(self.Evaluate(Candidates))
+                if Trial is not None and self._Better(Trial, Best):
+                    Best = Trial
+                    Current = list(Best[0])
+                    Improved = True
+            if not Improved:
+                break
+        return Best
+
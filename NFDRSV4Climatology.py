@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""
+ERC / BI climatology and percentile sketches.
+
+QuantileSketch keeps a sorted table of distinct values (at a fixed resolution,
+0.01 by default, which is the rounding of iCalcIndexes) and their counts.
+Values stream in one array or one day at a time; "what percentile is today's
+ERC" and quantile queries are binary searches of the cumulative counts, and
+two sketches merge by adding counts, so stations and years can be summarized
+separately (or in different processes) and combined afterwards.
+
+CellSketches is the same table for many cells at once (one value per cell
+per Add, e.g. per ensemble member), held as padded 2-D arrays so adding,
+merging and querying are whole-array operations.
+
+Climatology holds one sketch plus day-of-year count / mean / min / max per
+station, fuel model and index.
+
+"""
+
+import json
+
+import numpy as np
+
+## \var DefaultResolution Value resolution of the sketches (iCalcIndexes rounds to 2 decimals)
+DefaultResolution = 0.01
+
+## \var ClimatologyColumns Indexes summarized by default
+ClimatologyColumns = ("ERC", "BI")
+
+## \var _CompactSize Number of buffered values that triggers merging them into the sorted table
+_CompactSize = 1 << 16
+
+
+## \class QuantileSketch
+## \brief Mergeable value -> count table answering quantile and percentile queries in O(log n)
+##
+## The quantiles are those of the values rounded to Resolution, with the linear
+## interpolation of numpy.quantile / pandas quantile; memory grows with the number
+## of distinct rounded values, not with the number of values added.
+class QuantileSketch:
+
+    ## \fn __init__
+    ## \param Resolution Values are binned to multiples of Resolution
+    def __init__(self, Resolution=DefaultResolution):
+        self.Resolution = float(Resolution)
+        self.Keys = np.empty(0, dtype=np.int64)
+        self.Counts = np.empty(0, dtype=np.int64)
+        self.Sum = 0.0
+        self._Pending = []
+        self._PendingCount = 0
+        self._Cum = None
+
+    ## \fn Add Add a value or an array of values (NaN ignored)
+    def Add(self, Values):
+        v = np.asarray(Values, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        if not len(v):
+            return
+        self.Sum += float(v.sum())
+        self._Pending.append(np.rint(v / self.Resolution).astype(np.int64))
+        self._PendingCount += len(v)
+        self._Cum = None
+        if self._PendingCount >= _CompactSize:
+            self._Compact()
+
+    ## \fn _Compact Merge the buffered values into the sorted table
+    def _Compact(self):
+        if not self._Pending:
+            return
+        New = np.concatenate(self._Pending)
+        Keys, Inverse = np.unique(np.concatenate((self.Keys, New)), return_inverse=True)
+        Weights = np.concatenate((self.Counts, np.ones(len(New), dtype=np.int64)))
+        self.Keys = Keys
+        self.Counts = np.bincount(Inverse, weights=Weights, minlength=len(Keys)).astype(np.int64)
+        self._Pending = []
+        self._PendingCount = 0
+        self._Cum = None
+
+    ## \fn _Cumulative Cumulative counts of the sorted table, with a leading 0
+    def _Cumulative(self):
+        if self._Cum is None:
+            self._Compact()
+            self._Cum = np.concatenate(([0], np.cumsum(self.Counts)))
+        return self._Cum
+
+    ## \fn Count Number of values added
+    @property
+    def Count(self):
+        return int(self.Counts.sum()) + self._PendingCount
+
+    ## \fn Mean Mean of the values added (unrounded)
+    @property
+    def Mean(self):
+        n = self.Count
+        return self.Sum / n if n else np.nan
+
+    ## \fn Min Smallest value (rounded to Resolution)
+    @property
+    def Min(self):
+        self._Compact()
+        return self.Keys[0] * self.Resolution if len(self.Keys) else np.nan
+
+    ## \fn Max Largest value (rounded to Resolution)
+    @property
+    def Max(self):
+        self._Compact()
+        return self.Keys[-1] * self.Resolution if len(self.Keys) else np.nan
+
+    ## \fn Quantile Value(s) at quantile(s) q (0-1), linearly interpolated as numpy.quantile
+    def Quantile(self, q):
+        Cum = self._Cumulative()
+        q = np.asarray(q, dtype=np.float64)
+        if Cum[-1] == 0:
+            return np.full(q.shape, np.nan)[()]
+        h = (Cum[-1] - 1) * q
+        Lo = np.floor(h)
+        Ranks = np.stack((Lo, np.minimum(Lo + 1, Cum[-1] - 1)))
+        Values = self.Keys[np.searchsorted(Cum, Ranks, side="right") - 1] * self.Resolution
+        return (Values[0] + (h - Lo) * (Values[1] - Values[0]))[()]
+
+    ## \fn PercentileOf Percentile rank (0-100) of value(s) x
+    ## \param Kind "weak" (share <= x), "strict" (share < x) or "mean" (their average),
+    ## as scipy.stats.percentileofscore
+    def PercentileOf(self, x, Kind="weak"):
+        Cum = self._Cumulative()
+        k = np.rint(np.asarray(x, dtype=np.float64) / self.Resolution)
+        if Cum[-1] == 0:
+            return np.full(k.shape, np.nan)[()]
+        Weak = Cum[np.searchsorted(self.Keys, k, side="right")]
+        Strict = Cum[np.searchsorted(self.Keys, k, side="left")]
+        Below = {"weak": Weak, "strict": Strict, "mean": (Weak + Strict) / 2.0}[Kind]
+        return (100.0 * Below / Cum[-1])[()]
+
+    ## \fn Merge Add another sketch's values to this one
+    ## \return self
+    def Merge(self, Other):
+        if Other.Resolution != self.Resolution:
+            raise ValueError("Sketches with different resolutions cannot be merged")
+        Other._Compact()
+        self._Compact()
+        Keys, Inverse = np.unique(np.concatenate((self.Keys, Other.Keys)), return_inverse=True)
+        self.Counts = np.bincount(Inverse, weights=np.concatenate((self.Counts, Other.Counts)),
+                                  minlength=len(Keys)).astype(np.int64)
+        self.Keys = Keys
+        self.Sum += Other.Sum
+        self._Cum = None
+        return self
+
+    ## \fn Combine New sketch holding the values of several sketches
+    @classmethod
+    def Combine(cls, Sketches):
+        Sketches = list(Sketches)
+        Out = cls(Sketches[0].Resolution if Sketches else DefaultResolution)
+        for Sketch in Sketches:
+            Out.Merge(Sketch)
+        return Out
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        self._Compact()
+        return {"Resolution": self.Resolution, "Sum": self.Sum, "Keys": self.Keys.tolist(),
+                "Counts": self.Counts.tolist()}
+
+    ## \fn FromState Rebuild a sketch from State()
+    @classmethod
+    def FromState(cls, State):
+        Sketch = cls(State["Resolution"])
+        Sketch.Sum = State["Sum"]
+        Sketch.Keys = np.asarray(State["Keys"], dtype=np.int64)
+        Sketch.Counts = np.asarray(State["Counts"], dtype=np.int64)
+        return Sketch
+
+
+## \var _NoKey Key of an unused slot of a CellSketches table (sorts after every value)
+_NoKey = np.iinfo(np.int64).max
+
+## \var _CellCompactRows Buffered rows that trigger merging them into a CellSketches table
+_CellCompactRows = 64
+
+
+## \class CellSketches
+## \brief A QuantileSketch per cell, as (distinct values x cells) key and count arrays
+##
+## Column c of Keys holds cell c's distinct values (in Resolution units) in ascending
+## order, padded with _NoKey, and Counts how often each was added.  The table has as many
+## rows as the cell with the most distinct values, so memory is bounded as for
+## QuantileSketch.  Quantiles equal QuantileSketch.Quantile of each cell's values.
+class CellSketches:
+
+    ## \fn __init__
+    ## \param Cells Number of cells
+    ## \param Resolution Values are binned to multiples of Resolution
+    def __init__(self, Cells, Resolution=DefaultResolution):
+        self.Cells = int(Cells)
+        self.Resolution = float(Resolution)
+        self.Keys = np.empty((0, self.Cells), dtype=np.int64)
+        self.Counts = np.empty((0, self.Cells), dtype=np.int64)
+        self._Pending = []
+
+    ## \fn Add Add one value per cell (NaN cells are skipped)
+    def Add(self, Values):
+        v = np.asarray(Values, dtype=np.float64).reshape(self.Cells)
+        Missing = np.isnan(v)
+        self._Pending.append(np.where(Missing, _NoKey, np.rint(np.where(Missing, 0.0, v) / self.Resolution)
+                                      .astype(np.int64)))
+        if len(self._Pending) >= _CellCompactRows:
+            self._Compact()
+
+    ## \fn _Compact Merge the buffered rows into the table
+    def _Compact(self):
+        if not self._Pending:
+            return
+        New = np.stack(self._Pending)
+        self._Pending = []
+        self._Fold(New, (New != _NoKey).astype(np.int64))
+
+    ## \fn _Fold Merge rows of (key, count) pairs into the table
+    def _Fold(self, Keys, Counts):
+        Keys = np.concatenate((self.Keys, Keys))
+        Counts = np.concatenate((self.Counts, Counts))
+        Order = np.argsort(Keys, axis=0, kind="stable")
+        Keys = np.take_along_axis(Keys, Order, axis=0)
+        Counts = np.take_along_axis(Counts, Order, axis=0)
+        # Runs of one key within a cell become one row; unused slots sort last and are dropped
+        Used = Keys != _NoKey
+        Start = Used & np.concatenate((np.ones((1, self.Cells), dtype=bool), Keys[1:] != Keys[:-1]))
+        Row = np.cumsum(Start, axis=0) - 1
+        Rows = int(Row[-1].max()) + 1 if len(Row) else 0
+        Cell = np.broadcast_to(np.arange(self.Cells), Keys.shape)
+        self.Keys = np.full((Rows, self.Cells), _NoKey, dtype=np.int64)
+        self.Keys[Row[Start], Cell[Start]] = Keys[Start]
+        self.Counts = np.bincount((Row * self.Cells + Cell)[Used], weights=Counts[Used],
+                                  minlength=Rows * self.Cells).astype(np.int64).reshape(Rows, self.Cells)
+
+    ## \fn Count Number of values added to each cell
+    def Count(self):
+        self._Compact()
+        return self.Counts.sum(axis=0)
+
+    ## \fn Quantile Values at quantiles q (0-1) of every cell, linearly interpolated as numpy.quantile
+    ## \return array shaped (len(q), Cells), NaN for cells without values
+    def Quantile(self, q):
+        self._Compact()
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        Rows = len(self.Keys)
+        if Rows == 0:
+            return np.full((len(q), self.Cells), np.nan)
+        Cum = np.cumsum(self.Counts, axis=0)
+        n = Cum[-1]
+        h = (n - 1) * q[:, None]
+        Lo = np.floor(h)
+        # Each cell's cumulative counts, shifted into its own range, form one ascending array
+        Offset = np.arange(self.Cells) * (int(n.max()) + 1)
+        Flat = (Cum + Offset).T.ravel()
+        Out = []
+        for Rank in (Lo, np.minimum(Lo + 1, n - 1)):
+            Idx = np.searchsorted(Flat, Rank + Offset, side="right") - np.arange(self.Cells) * Rows
+            Idx = np.clip(Idx, 0, Rows - 1)
+            Out.append(np.take_along_axis(self.Keys, Idx, axis=0) * self.Resolution)
+        return np.where(n > 0, Out[0] + (h - Lo) * (Out[1] - Out[0]), np.nan)
+
+    ## \fn Merge Add another CellSketches' values to this one
+    ## \return self
+    def Merge(self, Other):
+        if (Other.Cells, Other.Resolution) != (self.Cells, self.Resolution):
+            raise ValueError("Only cell sketches with the same cells and resolution can be merged")
+        Other._Compact()
+        self._Compact()
+        self._Fold(Other.Keys, Other.Counts)
+        return self
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        self._Compact()
+        return {"Cells": self.Cells, "Resolution": self.Resolution, "Keys": self.Keys.tolist(),
+                "Counts": self.Counts.tolist()}
+
+    ## \fn FromState Rebuild from State()
+    @classmethod
+    def FromState(cls, State):
+        Sketches = cls(State["Cells"], State["Resolution"])
+        Sketches.Keys = np.array(State["Keys"], dtype=np.int64).reshape(-1, Sketches.Cells)
+        Sketches.Counts = np.array(State["Counts"], dtype=np.int64).reshape(-1, Sketches.Cells)
+        return Sketches
+
+
+## \fn DayOfYear Day of year (1-366) of dates
+def DayOfYear(Dates):
+    Dates = np.asarray(Dates, dtype="datetime64[D]")
+    return (Dates - Dates.astype("datetime64[Y]")).astype(int) + 1
+
+
+## \class DayOfYearStats
+## \brief Running count, sum, min and max of a value for each day of the year
+class DayOfYearStats:
+
+    def __init__(self):
+        self.Count = np.zeros(366, dtype=np.int64)
+        self.Sum = np.zeros(366)
+        self.Min = np.full(366, np.inf)
+        self.Max = np.full(366, -np.inf)
+
+    ## \fn Add Add values with their days of year (NaN ignored)
+    def Add(self, JDay, Values):
+        Values = np.asarray(Values, dtype=np.float64).ravel()
+        i = np.broadcast_to(np.asarray(JDay, dtype=np.intp).ravel() - 1, Values.shape)
+        Ok = ~np.isnan(Values)
+        i, Values = i[Ok], Values[Ok]
+        np.add.at(self.Count, i, 1)
+        np.add.at(self.Sum, i, Values)
+        np.minimum.at(self.Min, i, Values)
+        np.maximum.at(self.Max, i, Values)
+
+    ## \fn Merge Add another DayOfYearStats to this one
+    def Merge(self, Other):
+        self.Count += Other.Count
+        self.Sum += Other.Sum
+        np.minimum(self.Min, Other.Min, out=self.Min)
+        np.maximum(self.Max, Other.Max, out=self.Max)
+        return self
+
+    ## \fn Summary dict of 366-day arrays: Count, Mean, Min, Max (NaN where no values)
+    def Summary(self):
+        Seen = self.Count > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            Mean = self.Sum / self.Count
+        return {"Count": self.Count.copy(), "Mean": np.where(Seen, Mean, np.nan),
+                "Min": np.where(Seen, self.Min, np.nan), "Max": np.where(Seen, self.Max, np.nan)}
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        return {Name: getattr(self, Name).tolist() for Name in ("Count", "Sum", "Min", "Max")}
+
+    ## \fn FromState Rebuild from State()
+    @classmethod
+    def FromState(cls, State):
+        Stats = cls()
+        for Name in ("Count", "Sum", "Min", "Max"):
+            setattr(Stats, Name, np.asarray(State[Name], dtype=getattr(Stats, Name).dtype))
+        return Stats
+
+
+## \class Climatology
+## \brief Percentile sketches and day-of-year statistics by station, fuel model and index
+class Climatology:
+
+    ## \fn __init__
+    ## \param Columns Indexes to summarize
+    ## \param Resolution Sketch resolution
+    def __init__(self, Columns=ClimatologyColumns, Resolution=DefaultResolution):
+        self.Columns = tuple(Columns)
+        self.Resolution = Resolution
+        self._Sketches = {}
+        self._DayStats = {}
+
+    ## \fn _Entry Sketch and day-of-year statistics of a station, fuel model and column
+    def _Entry(self, StationID, FMCode, Column, Create=False):
+        Key = (str(StationID), FMCode, Column)
+        if Key not in self._Sketches:
+            if not Create:
+                raise KeyError("No climatology for %s/%s %s" % Key)
+            self._Sketches[Key] = QuantileSketch(self.Resolution)
+            self._DayStats[Key] = DayOfYearStats()
+        return self._Sketches[Key], self._DayStats[Key]
+
+    ## \fn Add Add results for one or more days
+    ## \param StationID Station identifier
+    ## \param FMCode Fuel model code
+    ## \param Dates Date (or dates) of the values
+    ## \param Values Column name -> value(s), e.g. ERC=..., BI=...; other names are ignored
+    def Add(self, StationID, FMCode, Dates, **Values):
+        JDay = DayOfYear(Dates)
+        for Column in self.Columns:
+            if Column in Values:
+                Sketch, Days = self._Entry(StationID, FMCode, Column, True)
+                Sketch.Add(Values[Column])
+                Days.Add(JDay, Values[Column])
+
+    ## \fn AddResult Add a NFDRSV4Runner StationResult whose first value is for Start
+    def AddResult(self, Result, Start):
+        Dates = np.datetime64(Start, "D") + np.arange(np.size(Result.ERC))
+        self.Add(Result.StationID, Result.FMCode, Dates,
+                 **{Column: getattr(Result, Column) for Column in self.Columns})
+
+    ## \fn FromStore Build a climatology from a ResultStore in one pass
+    ## \param Store NFDRSV4Store.ResultStore
+    ## \param Start, End Optional date range [Start, End)
+    @classmethod
+    def FromStore(cls, Store, Columns=ClimatologyColumns, Resolution=DefaultResolution, Start=None, End=None):
+        Clim = cls(Columns, Resolution)
+        for StationID, FMCode in Store.Keys():
+            Data = Store.Read(StationID, FMCode, Clim.Columns, Start, End)
+            Clim.Add(StationID, FMCode, Data["Date"], **{c: Data[c] for c in Clim.Columns})
+        return Clim
+
+    ## \fn Keys (StationID, FMCode, Column) entries
+    def Keys(self):
+        return sorted(self._Sketches)
+
+    ## \fn Sketch QuantileSketch of a station, fuel model and column
+    def Sketch(self, StationID, FMCode, Column="ERC"):
+        return self._Entry(StationID, FMCode, Column)[0]
+
+    ## \fn Percentile Percentile rank (0-100) of value(s) in a station's climatology
+    def Percentile(self, StationID, FMCode, Value, Column="ERC", Kind="weak"):
+        return self.Sketch(StationID, FMCode, Column).PercentileOf(Value, Kind)
+
+    ## \fn Quantile Value(s) at quantile(s) q (0-1), e.g. 0.9 and 0.97
+    def Quantile(self, StationID, FMCode, q, Column="ERC"):
+        return self.Sketch(StationID, FMCode, Column).Quantile(q)
+
+    ## \fn DayOfYear Day-of-year Count, Mean, Min and Max (index 0 is January 1)
+    def DayOfYear(self, StationID, FMCode, Column="ERC"):
+        return self._Entry(StationID, FMCode, Column)[1].Summary()
+
+    ## \fn Combined Sketch pooling several stations (and / or fuel models)
+    ## \param Keys Iterable of (StationID, FMCode)
+    def Combined(self, Keys, Column="ERC"):
+        return QuantileSketch.Combine(self.Sketch(s, f, Column) for s, f in Keys)
+
+    ## \fn Merge Add another climatology (e.g. other years, or another worker's stations)
+    ## \return self
+    def Merge(self, Other):
+        for Key, Sketch in Other._Sketches.items():
+            Mine, Days = self._Entry(*Key, Create=True)
+            Mine.Merge(Sketch)
+            Days.Merge(Other._DayStats[Key])
+        return self
+
+    ## \fn Dumps State as a JSON string
+    def Dumps(self):
+        return json.dumps({"Columns": self.Columns, "Resolution": self.Resolution,
+                           "Entries": [[list(Key), self._Sketches[Key].State(), self._DayStats[Key].State()]
+                                       for Key in self.Keys()]})
+
+    ## \fn Loads Rebuild a climatology from Dumps()
+    @classmethod
+    def Loads(cls, s):
+        State = json.loads(s)
+        Clim = cls(State["Columns"], State["Resolution"])
+        for Key, Sketch, Days in State["Entries"]:
+            Clim._Sketches[tuple(Key)] = QuantileSketch.FromState(Sketch)
+            Clim._DayStats[tuple(Key)] = DayOfYearStats.FromState(Days)
+        return Clim
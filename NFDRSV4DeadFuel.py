@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming Nelson dead fuel moisture stage.
+
+Nelson's (2000) dead fuel moisture stick model with the stick parameters
+derived from the radius by Bevins (2005), configured as NFDRS V4 runs it: 1, 10,
+100 and 1000 hour sticks of 0.20, 0.64, 2.0 and 3.81 cm radius, the NFDRS V4
+adsorption rates, a 0.35 g/g maximum local moisture and a 20 % start.  Each
+stick is a radial column of moisture, fiber saturation and temperature nodes;
+every hour the surface node is driven by the interpolated air temperature,
+humidity, solar radiation and rain (with Nelson's runoff factor), and the
+interior nodes follow by finite-difference diffusion in several sub-steps.  The
+daily MC1..MC1000 are the median radial moisture of each stick and the fuel
+temperature is the 1 hour stick's surface temperature, at the observation hour,
+as NFDRS V4 passes them to iCalcIndexes.
+
+Every node array is shaped (nodes, stations), so many stations advance in
+lockstep and memory does not grow with the record:
+
+    DFM = DeadFuelMoisture(len(Stations))
+    for Batch in HourlyBatches:                       # arrays shaped (hours, stations)
+        Daily = DFM.Advance(Batch["DateTime"], Batch["Temp"], Batch["RH"],
+                            Batch["Solar"], Batch["Rain"])
+
+tests/data/nelson_reference.csv holds hourly output of the NFDRS V4 C++
+DeadFuelMoisture class for a few synthetic stations; tests/test_deadfuel.py
+checks this module against it.
+
+"""
+
+import json
+
+import numpy as np
+
+## \var DeadFuelClasses Moisture classes produced, in stick order
+DeadFuelClasses = ("MC1", "MC10", "MC100", "MC1000")
+
+## \var DeadFuelOutputs Names of the emitted values (fuel temperature in deg C, as the ignition
+## component's TMPPRM)
+DeadFuelOutputs = DeadFuelClasses + ("FuelTemperature",)
+
+## \var StickRadii Radius (cm) of the stick of each class (NFDRS V4)
+StickRadii = (0.20, 0.64, 2.00, 3.81)
+
+## \var AdsorptionRates Adsorption surface mass transfer rate ((cm3/cm2)/h) of each class (NFDRS V4)
+AdsorptionRates = (0.462252733, 0.079548303, 0.06, 0.06)
+
+## \var DesorptionRate Desorption surface mass transfer rate ((cm3/cm2)/h)
+DesorptionRate = 0.06
+
+## \var MaxLocalMoisture Maximum local moisture content due to rain (g/g)
+MaxLocalMoisture = 0.35
+
+## \var StickDensity Stick density (g/cm3)
+StickDensity = 0.400
+
+## \var StickLength Stick length (cm)
+StickLength = 41.0
+
+## \var InitialMoisture Starting moisture of every stick node (%)
+InitialMoisture = 20.0
+
+## \var BarometricPressure Barometric pressure (cal/cm3)
+BarometricPressure = 0.0218
+
+## \var FW21Columns fw21 column names of the hourly inputs
+FW21Columns = {"Temp": "Temperature(F)", "RH": "RelativeHumidity(%)", "Solar": "SolarRadiation(W/m2)",
+               "Rain": "Precipitation(in)"}
+
+# Nelson (2000) model constants
+Aks = 2.0e-13       # permeability of a water saturated stick (cm2)
+Ap = 0.000772       # psychrometric constant (1/K)
+Aw = 0.8            # ratio of cell cavity to cell radius
+Hfs = 0.99          # saturation value of the fuel surface humidity (g/g)
+Kelvin = 273.2      # deg C to K
+Pi = 3.141592654
+Pr = 0.7            # Prandtl number
+Sc = 0.58           # Schmidt number
+Smv = 94.743        # W/m2 to pyranometer millivolts
+St = 72.8           # surface tension (erg/cm2)
+Tcd = 6.0           # day sky temperature (deg C)
+Tcn = 3.0           # night sky temperature (deg C)
+Thdiff = 8.0        # thermal diffusivity (cm2/h)
+Wl = 0.0023         # cell cavity diameter (cm)
+Srf = 14.82052      # solar radiation factor (cal/cm2-h per millivolt)
+Wsf = 4.60517       # -ln(1 - 0.99), fiber saturation humidity term
+Hrd = 0.116171      # day longwave radiative heat transfer coefficient (cal/cm2-h-C)
+Hrn = 0.112467      # night longwave radiative heat transfer coefficient (cal/cm2-h-C)
+Sir = 0.0714285     # irreducible saturation
+Scr = 0.285714      # critical saturation
+
+
+## \fn StickNodes Number of radial nodes of a stick (odd) (Bevins 2005)
+def StickNodes(Radius):
+    Nodes = int(10.727 + 0.1746 / Radius)
+    return Nodes + 1 if Nodes % 2 == 0 else Nodes
+
+
+## \fn MoistureSteps Moisture computation steps per observation (Bevins 2005)
+def MoistureSteps(Radius):
+    return int(9.8202 + 26.865 / Radius ** 1.4)
+
+
+## \fn DiffusivitySteps Diffusivity computation steps per observation (Bevins 2005)
+def DiffusivitySteps(Radius):
+    return int(4.777 + 2.496 / Radius ** 1.3)
+
+
+## \fn PlanarHeatTransferRate Planar heat transfer rate (cal/cm2-h-C) (Bevins 2005)
+def PlanarHeatTransferRate(Radius):
+    return 0.2195 + 0.05260 / Radius ** 2.5
+
+
+## \fn RainfallRunoffFactor First hour rainfall runoff factor (Bevins 2005)
+def RainfallRunoffFactor(Radius):
+    return 0.02822 + 0.1056 / Radius ** 2.2
+
+
+## \fn _TimeSteps Moisture step times (h) within an observation interval and whether the
+## diffusivity is recomputed after each (the reference runs the first step twice)
+def _TimeSteps(et, mSteps, dSteps):
+    mdt = et / mSteps
+    ddt = et / dSteps
+    Times = [mdt]
+    nstep = 1
+    while True:
+        tt = nstep * mdt
+        nstep += 1
+        if tt > et:
+            break
+        Times.append(tt)
+    Diffuse = []
+    ddtNext = ddt
+    for tt in Times:
+        Diffuse.append((ddtNext - tt) < 0.5 * mdt)
+        if Diffuse[-1]:
+            ddtNext += ddt
+    return Times, Diffuse
+
+
+## \class NelsonStick
+## \brief One size class of dead fuel stick at many stations
+##
+## T, W and S are the nodal temperature (deg C), moisture (g/g) and free water saturation,
+## D the nodal bound water diffusivity, each shaped (nodes, stations), node 0 at the
+## surface; HF and WSA are the surface humidity and fiber saturation of each station.
+class NelsonStick:
+
+    ## \fn __init__
+    ## \param Radius Stick radius (cm)
+    ## \param AdsorptionRate Adsorption surface mass transfer rate ((cm3/cm2)/h)
+    ## \param Stations Number of stations
+    ## \param Moisture Starting moisture (%), a scalar or one value per station
+    def __init__(self, Radius, AdsorptionRate, Stations, Moisture=InitialMoisture):
+        self.Radius = float(Radius)
+        self.Nodes = StickNodes(Radius)
+        self.MoistureSteps = MoistureSteps(Radius)
+        self.DiffusivitySteps = DiffusivitySteps(Radius)
+        self.HC = PlanarHeatTransferRate(Radius)
+        self.Rai0 = RainfallRunoffFactor(Radius)
+        self.STCA = float(AdsorptionRate)
+        self.DX = self.Radius / (self.Nodes - 1)
+        self.WMax = (1.0 / StickDensity) - (1.0 / 1.53)
+        self.X = np.append(self.Radius - self.DX * np.arange(self.Nodes - 1), 0.0)[:, None]
+        self.HWF = 0.622 * self.HC * (Pr / Sc) ** 0.667
+        self.AMLF = self.HWF / (0.24 * StickDensity * self.Radius)
+        rcav = 0.5 * Aw * Wl
+        self.CAPF = 3600.0 * Pi * St * rcav * rcav / (16.0 * self.Radius * self.Radius * StickLength * StickDensity)
+        self.VF = St / (StickDensity * Wl * Scr)
+        Shape = (self.Nodes, int(Stations))
+        # The stick starts as the reference builds it: at 20 deg C and half Bevins' default 0.6 g/g
+        # maximum local moisture, with the diffusivity of that state, before its moisture is set
+        self.T = np.full(Shape, 20.0)
+        self.W = np.full(Shape, 0.3)
+        self.S = np.zeros(Shape)
+        self.HF = np.full(Shape[1], 0.2)
+        self.WSA = np.full(Shape[1], 0.3 + 0.1)
+        self.D = self._Diffusivity(BarometricPressure)
+        self.W[...] = np.asarray(Moisture, dtype=np.float64) / 100.0
+
+    ## \fn _Diffusivity Bound water diffusivity (cm2/h) of each node at pressure bp
+    def _Diffusivity(self, bp):
+        T = self.T
+        tk = T + 273.2
+        qv = 13550.0 - 10.22 * tk
+        cpv = 7.22 + 0.002374 * tk + 2.67e-07 * tk * tk
+        dv = 0.22 * 3600.0 * (0.0242 / bp) * (tk / 273.2) ** 1.75
+        ps1 = 0.0000239 * np.exp(20.58 - (5205.0 / tk))
+        c1 = 0.1617 - 0.001419 * T
+        c2 = 0.4657 + 0.003578 * T
+        Below = self.W < self.WSA
+        wc = np.where(Below, self.W, self.WSA)
+        HF = np.where(Below, self.HF, Hfs)
+        Log = np.where(Below, -np.log(1.0 - self.HF), Wsf)
+        dhdm = np.where((c2 != 1.0) & (c1 != 0.0) & (c2 != 0.0), (1.0 - HF) * Log ** (1.0 - c2) / (c1 * c2), 0.0)
+        daw = 1.3 - 0.64 * wc
+        svaw = 1.0 / daw
+        vfaw = svaw * wc / (0.685 + svaw * wc)
+        vfcw = (0.685 + svaw * wc) / ((1.0 / StickDensity) + svaw * wc)
+        rfcw = 1.0 - np.sqrt(1.0 - vfcw)
+        fac = 1.0 / (rfcw * vfcw)
+        con = 1.0 / (2.0 - vfaw)
+        qw = 5040.0 * np.exp(-14.0 * wc)
+        e = (qv + qw - cpv * tk) / 1.2
+        dvpr = 18.0 * 0.016 * (1.0 - vfcw) * dv * ps1 * dhdm / (StickDensity * 1.987 * tk)
+        return dvpr + 3600.0 * 0.0985 * con * fac * np.exp(-e / (1.987 * tk))
+
+    ## \fn Update Advance over one observation interval
+    ## \param et Elapsed time since the previous observation (h)
+    ## \param Prev, Cur (air temperature deg C, RH g/g, pyranometer mV, pressure cal/cm3) of the
+    ## previous and current observation, arrays over the stations
+    ## \param Rain Rainfall over the interval (cm)
+    def Update(self, et, Prev, Cur, Rain):
+        mdt = et / self.MoistureSteps
+        Times, Diffuse = _TimeSteps(et, self.MoistureSteps, self.DiffusivitySteps)
+        hc, dx, wmx = self.HC, self.DX, MaxLocalMoisture
+
+        # Terms that depend only on the weather, for every time step at once (steps, stations)
+        tfract = (np.array(Times) / et)[:, None]
+        ta, ha, sv, bp = (p + (c - p) * tfract for p, c in zip(Prev, Cur))
+        fsc = sv / Srf
+        tka = ta + Kelvin
+        tdw = 5205.0 / ((5205.0 / tka) - np.log(ha))
+        Night = fsc < 0.000001
+        tsk = np.where(Night, Tcn + Kelvin, Tcd + Kelvin)
+        hr = np.where(Night, Hrn, Hrd)
+        sr = np.where(Night, 0.0, Srf * fsc)
+        pa = ha * (0.0000239 * np.exp(20.58 - (5205.0 / tka)))
+        psd = 0.0000239 * np.exp(20.58 - (5205.0 / tdw))
+        # Stick surface temperature
+        tfd = ta + (sr - hr * (ta - tsk + Kelvin)) / (hr + hc)
+        qv = 13550.0 - 10.22 * (tfd + Kelvin)
+        hw = (self.HWF * Ap / 0.24) * qv / 18.0
+        t0 = tfd - (hw * (tfd - ta) / (hr + hc + hw))
+        tkf = t0 + Kelvin
+        gnu = 0.00439 + 0.00000177 * (338.76 - tkf) ** 2.1237
+        c1 = 0.1617 - 0.001419 * t0
+        c2 = 0.4657 + 0.003578 * t0
+        WSA = c1 * Wsf ** c2
+        WDiff = np.maximum(self.WMax - WSA, 0.000001)
+        ps1 = 0.0000239 * np.exp(20.58 - (5205.0 / tkf))
+        ApBp = Ap * bp
+        dTK = tka - tkf
+        Cold = t0 <= (tdw - Kelvin)
+        # Above fiber saturation: evaporation (less capillary flow) or condensation
+        aml = np.where(Cold & (ps1 > psd), 0.0, self.AMLF * (ps1 - psd) / bp)
+        Evaporation = aml * (mdt * 2.0)
+        Evaporation = np.where(aml > 0.0, Evaporation + mdt * self.CAPF / gnu, Evaporation)
+        AnyCold = Cold.any(axis=1)
+        # Rain on the surface node, with the first hour runoff factor
+        Raining = Rain > 0.0
+        AnyRain = Raining.any()
+        if AnyRain:
+            rai0 = mdt * self.Rai0 * (1.0 - np.exp(-100.0 * (Rain / et / Pi)))
+            rai0 = np.where(Cur[1] < Prev[1], rai0 * 0.15, rai0)
+            t0 = np.where(Raining, tfd, t0)
+
+        # Interior node coefficients: ar of every node, ae / aw of the temperature diffusion
+        x = self.X
+        ar = x[1:-1] * dx / mdt
+        Tv = Thdiff * x
+        aeT, awT = Tv[2:] / dx, Tv[:-2] / dx
+        apT = aeT + awT + ar
+        aeW, awW, apW = self._MoistureCoefficients(ar)
+        T, W, S = self.T, self.W, self.S
+        for k in range(len(Times)):
+            wsa, wdiff = WSA[k], WDiff[k]
+            w_old = W[0]
+            qw = 5040.0 * np.exp(-14.0 * w_old)
+            p1 = np.maximum(pa[k] + ApBp[k] * (qv[k] / (qv[k] + qw)) * dTK[k], 0.000001)
+            hf = np.minimum(p1 / ps1[k], Hfs)
+            sem = c1[k] * (-np.log(1.0 - hf)) ** c2[k]
+
+            # Stick surface moisture: sorption toward the equilibrium moisture, free water above
+            # fiber saturation, condensation below the dew point, or rain
+            bi = np.where(w_old >= sem, DesorptionRate, self.STCA) * dx / self.D[0]
+            w_new = (W[1] + bi * sem) / (1.0 + bi)
+            Sorbing = None
+            if AnyCold[k]:
+                aml = np.where(p1 > psd[k], 0.0, self.AMLF * (p1 - psd[k]) / bp[k])
+                Sorbing = ~Cold[k]
+                w_new = np.where(Cold[k], w_old - aml * (mdt * 2.0), w_new)
+            Wet = w_old > wsa
+            Stagnant = False
+            if Wet.any():
+                w_wet = np.minimum(w_old - Evaporation[k], wmx)
+                w_new = np.where(Wet, w_wet, w_new)
+                Sorbing = ~Wet if Sorbing is None else Sorbing & ~Wet
+                Stagnant = Wet & (w_wet == w_old)
+                hf = np.where(Wet, Hfs, hf)
+            if AnyRain:
+                w_new = np.where(Raining, w_old + rai0, w_new)
+                Sorbing = ~Raining if Sorbing is None else Sorbing & ~Raining
+                Stagnant = Stagnant & ~Raining
+                hf = np.where(Raining, Hfs, hf)
+            s_new = 0.0 if Sorbing is None else np.where(Sorbing, 0.0, (w_new - wsa) / wdiff)
+            W[0] = np.minimum(w_new, wmx)
+            S[0] = np.maximum(s_new, 0.0)
+            T[0] = t0[k]
+            self.HF = hf
+            self.WSA = wsa
+
+            # Interior nodes: free water (saturation) transport, then bound water diffusion or a
+            # continuous liquid column, then heat conduction
+            Stagnant = np.any(Stagnant)
+            if Stagnant:
+                Wold, Sold = W.copy(), S.copy()
+            svp = (W - wsa) / wdiff
+            Free = (svp >= Sir) & (svp <= Scr)
+            if Free.any() or S[1:-1].any():
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    ak = Aks * (2.0 * np.sqrt(svp / Scr) - 1.0)
+                    g = np.where(Free, (ak / (gnu[k] * wdiff)) * x * self.VF * (Scr / svp) ** 1.5, 0.0)
+                ae, aw = g[2:] / dx, g[:-2] / dx
+                ap = ae + aw + ar
+                S[1:-1] = np.maximum(np.minimum((ae * S[2:] + aw * S[:-2] + ar * S[1:-1]) / ap, Sir), 0.0)
+                S[-1] = S[-2]
+                Column = (S[1:-1] >= Sir).all(axis=0)
+            else:
+                Column = None
+            Interior = (aeW * W[2:] + awW * W[:-2] + ar * W[1:-1]) / apW
+            if Column is not None and Column.any():
+                Interior = np.where(Column, wsa + S[1:-1] * wdiff, Interior)
+            W[1:-1] = np.maximum(np.minimum(Interior, wmx), 0.0)
+            W[-1] = W[-2]
+            if Stagnant:
+                Stagnant = Wet & (w_wet == w_old) & ~Raining if AnyRain else Wet & (w_wet == w_old)
+                W[1:] = np.where(Stagnant, Wold[1:], W[1:])
+                S[1:] = np.where(Stagnant, Sold[1:], S[1:])
+            T[1:-1] = np.minimum((aeT * T[2:] + awT * T[:-2] + ar * T[1:-1]) / apT, 71.0)
+            T[-1] = T[-2]
+            if Diffuse[k]:
+                self.D = self._Diffusivity(bp[k])
+                aeW, awW, apW = self._MoistureCoefficients(ar)
+
+    ## \fn _MoistureCoefficients ae, aw and ap of the bound water diffusion of the interior nodes
+    def _MoistureCoefficients(self, ar):
+        To = self.D * self.X
+        ae, aw = To[2:] / self.DX, To[:-2] / self.DX
+        return ae, aw, ae + aw + ar
+
+    ## \fn Moisture Median radial moisture (%) of each station
+    def Moisture(self):
+        return np.partition(self.W, self.Nodes // 2, axis=0)[self.Nodes // 2] * 100.0
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        return {Name: getattr(self, Name).tolist() for Name in ("T", "W", "S", "D", "HF", "WSA")}
+
+    ## \fn SetState Restore State()
+    def SetState(self, State):
+        for Name in ("T", "W", "S", "D", "HF", "WSA"):
+            getattr(self, Name)[...] = np.array(State[Name], dtype=np.float64)
+
+
+## \class DeadFuelMoisture
+## \brief Hour-by-hour Nelson 1, 10, 100 and 1000 hour fuel moisture of many stations in lockstep
+##
+## The state is the node values of the four sticks at each station, the previous hour's
+## weather and the time of the last hour; memory does not grow with the record.  An hour
+## whose values are missing (NaN) or out of range at a station (air temperature outside
+## -60..60 deg C, RH outside 0.1..100 %, solar radiation above 2000 W/m2) leaves that
+## station's sticks unchanged, as the reference model rejects such an observation; the
+## next good hour is bridged from the last good one.
+class DeadFuelMoisture:
+
+    ## \fn __init__
+    ## \param Stations Number of stations
+    ## \param ObsHour Local hour whose values Advance emits as the day's values
+    ## \param Initial Optional starting moisture (%): a mapping of DeadFuelClasses, or None for
+    ## InitialMoisture in every class
+    def __init__(self, Stations, ObsHour=13, Initial=None):
+        self.Stations = int(Stations)
+        self.ObsHour = int(ObsHour)
+        self.Sticks = [NelsonStick(Radius, Rate, self.Stations,
+                                   InitialMoisture if Initial is None else Initial[Name])
+                       for Name, Radius, Rate in zip(DeadFuelClasses, StickRadii, AdsorptionRates)]
+        # Previous observation (air temperature deg C, RH g/g, pyranometer mV, pressure cal/cm3)
+        self.Weather = [np.full(self.Stations, v) for v in (20.0, 0.20, 0.0, BarometricPressure)]
+        self.LastTime = None
+
+    ## \fn Update Advance one hour
+    ## \param Temp Air temperature (deg F), one value per station (or a scalar)
+    ## \param RH Relative humidity (%)
+    ## \param Solar Solar radiation (W/m2)
+    ## \param Rain Precipitation over the hour (in)
+    ## \param Hours Time since the previous hour
+    ## \return dict of DeadFuelOutputs arrays for the hour (moisture in %, temperature in deg C)
+    def Update(self, Temp, RH, Solar, Rain, Hours=1.0):
+        Shape = (self.Stations,)
+        # NFDRS V4 rounds the air temperature to 0.01 deg C
+        ta = np.floor((np.asarray(Temp, dtype=np.float64) - 32.0) * 5.0 / 9.0 * 100 + 0.5) / 100
+        ha = np.asarray(RH, dtype=np.float64) / 100.0
+        sv = np.maximum(np.asarray(Solar, dtype=np.float64), 0.0)
+        Rain = np.broadcast_to(np.asarray(Rain, dtype=np.float64) * 2.54, Shape)
+        Valid = (ta >= -60.0) & (ta <= 60.0) & (ha >= 0.001) & (ha <= 1.0) & (sv <= 2000.0) & np.isfinite(Rain)
+        Valid = np.broadcast_to(Valid, Shape)
+        Cur = [np.broadcast_to(v, Shape).astype(np.float64) for v in (ta, ha, sv / Smv, BarometricPressure)]
+        if not Valid.all():
+            # Rejected hours repeat the previous observation so they run without warnings,
+            # then the stick state of those stations is put back
+            for c, p in zip(Cur, self.Weather):
+                c[~Valid] = p[~Valid]
+            Rain = np.where(Valid, Rain, 0.0)
+            Saved = [(s.T.copy(), s.W.copy(), s.S.copy(), s.D.copy(), s.HF.copy(), s.WSA.copy()) for s in self.Sticks]
+        for Stick in self.Sticks:
+            Stick.Update(float(Hours), self.Weather, Cur, Rain)
+        if not Valid.all():
+            for Stick, Old in zip(self.Sticks, Saved):
+                for Name, Value in zip(("T", "W", "S", "D", "HF", "WSA"), Old):
+                    setattr(Stick, Name, np.where(Valid, getattr(Stick, Name), Value))
+        self.Weather = Cur
+        Out = {Name: Stick.Moisture() for Name, Stick in zip(DeadFuelClasses, self.Sticks)}
+        Out["FuelTemperature"] = self.Sticks[0].T[0].copy()
+        return Out
+
+    ## \fn Advance Run a chunk of hours and collect the observation hour values
+    ## \param Times Hour timestamps (datetime64 or ISO strings, local time), strictly increasing
+    ## and after the last hour already added
+    ## \param Temp, RH, Solar, Rain Arrays shaped (hours,) or (hours, stations), units as Update
+    ## \return dict with "Date" (datetime64[D] of each observation hour in the chunk) and a
+    ## (days, stations) array for each of DeadFuelOutputs
+    def Advance(self, Times, Temp, RH, Solar, Rain):
+        Times = np.asarray(Times, dtype="datetime64[s]")
+        Inputs = [np.asarray(x, dtype=np.float64) for x in (Temp, RH, Solar, Rain)]
+        Dates = []
+        Daily = {Name: [] for Name in DeadFuelOutputs}
+        for h, Time in enumerate(Times):
+            if self.LastTime is None:
+                Hours = 1.0
+            else:
+                Hours = (Time - self.LastTime) / np.timedelta64(1, "h")
+                if Hours <= 0:
+                    raise ValueError("Hour %s is not after the last hour added (%s)" % (Time, self.LastTime))
+            Out = self.Update(*[x[h] for x in Inputs], Hours=Hours)
+            self.LastTime = Time
+            if (Time.astype("datetime64[h]") - Time.astype("datetime64[D]")) == np.timedelta64(self.ObsHour, "h"):
+                Dates.append(Time.astype("datetime64[D]"))
+                for Name in DeadFuelOutputs:
+                    Daily[Name].append(Out[Name])
+        Result = {"Date": np.array(Dates, dtype="datetime64[D]")}
+        for Name in DeadFuelOutputs:
+            Result[Name] = np.array(Daily[Name]).reshape(len(Dates), self.Stations)
+        return Result
+
+    ## \fn AdvanceFW21 Run a ReadWeatherBatches batch of one station's fw21 file
+    ## \return As Advance
+    def AdvanceFW21(self, Batch):
+        return self.Advance(Batch["DateTime"], *[Batch[FW21Columns[k]] for k in ("Temp", "RH", "Solar", "Rain")])
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        return {"Stations": self.Stations, "ObsHour": self.ObsHour,
+                "Sticks": {Name: Stick.State() for Name, Stick in zip(DeadFuelClasses, self.Sticks)},
+                "Weather": [v.tolist() for v in self.Weather],
+                "LastTime": None if self.LastTime is None else str(self.LastTime)}
+
+    ## \fn FromState Rebuild from State()
+    @classmethod
+    def FromState(cls, State):
+        DFM = cls(State["Stations"], State["ObsHour"])
+        for Name, Stick in zip(DeadFuelClasses, DFM.Sticks):
+            Stick.SetState(State["Sticks"][Name])
+        DFM.Weather = [np.array(v, dtype=np.float64) for v in State["Weather"]]
+        DFM.LastTime = None if State["LastTime"] is None else np.datetime64(State["LastTime"], "s")
+        return DFM
+
+    ## \fn Dumps State as a JSON string
+    def Dumps(self):
+        return json.dumps(self.State())
+
+    ## \fn Loads Rebuild from Dumps()
+    @classmethod
+    def Loads(cls, s):
+        return cls.FromState(json.loads(s))
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Ensemble forecast summaries of the NFDRS V4 indexes.
+
+Members are computed one at a time and folded into an EnsembleSummary, so the
+raw member values are never kept: per cell (typically lead day, or lead day
+and station) it holds the member count, mean and sum of squared deviations
+(Welford), exceedance counts for configured thresholds and, for quantiles, a
+table of the distinct values seen and their counts (exact at the 0.01 rounding
+of iCalcIndexes; see NFDRSV4Climatology.CellSketches), kept as whole arrays
+over the cells.  Summaries of disjoint member sets merge, so members can be
+split across worker processes.
+
+    Summary = EnsembleSummary((10,), Thresholds={"ERC": (60, 80), "BI": (80,)})
+    iCalcIndexesEnsemble("Y", zip(MC, WS, KBDI, FuelTemperature), Summary=Summary)
+    Summary.Summary()["ERC"]["Exceedance"]
+
+"""
+
+import json
+
+import numpy as np
+
+from NFDRSV4Batch import iCalcIndexesBatch
+from NFDRSV4Climatology import CellSketches, DefaultResolution
+
+## \var EnsembleColumns Indexes summarized by default
+EnsembleColumns = ("ERC", "SC", "BI", "IC")
+
+## \var DefaultQuantiles Quantiles kept by default
+DefaultQuantiles = (0.1, 0.5, 0.9)
+
+
+## \class EnsembleSummary
+## \brief Mergeable, bounded-memory per-cell statistics over ensemble members
+class EnsembleSummary:
+
+    ## \fn __init__
+    ## \param Shape Shape of one member's index arrays, e.g. (days,) or (days, stations)
+    ## \param Columns Indexes to summarize
+    ## \param Quantiles Quantiles (0-1) to report; empty to keep no sketches
+    ## \param Thresholds Index name -> thresholds whose exceedance probability (value >= threshold)
+    ## is reported
+    ## \param Resolution Value resolution of the quantile sketches
+    def __init__(self, Shape, Columns=EnsembleColumns, Quantiles=DefaultQuantiles, Thresholds=None,
+                 Resolution=DefaultResolution):
+        self.Shape = tuple(Shape)
+        self.Columns = tuple(Columns)
+        self.Quantiles = tuple(float(q) for q in Quantiles)
+        self.Thresholds = {Name: tuple(float(t) for t in T) for Name, T in (Thresholds or {}).items()}
+        Unknown = set(self.Thresholds) - set(self.Columns)
+        if Unknown:
+            raise ValueError("Thresholds given for indexes that are not summarized: %s" % sorted(Unknown))
+        self.Resolution = float(Resolution)
+        self.Count = {Name: np.zeros(self.Shape, dtype=np.int64) for Name in self.Columns}
+        self.Mean = {Name: np.zeros(self.Shape) for Name in self.Columns}
+        self.M2 = {Name: np.zeros(self.Shape) for Name in self.Columns}
+        self.Exceed = {Name: np.zeros((len(T),) + self.Shape, dtype=np.int64) for Name, T in self.Thresholds.items()}
+        self.Sketches = {}
+        if self.Quantiles:
+            for Name in self.Columns:
+                self.Sketches[Name] = CellSketches(int(np.prod(self.Shape)), self.Resolution)
+
+    ## \fn Members Number of members added (of the first column; NaN cells are not counted)
+    @property
+    def Members(self):
+        return int(self.Count[self.Columns[0]].max()) if self.Columns else 0
+
+    ## \fn AddMember Fold one member into the summary
+    ## \param Values Index name -> array of Shape (every summarized column; others are ignored)
+    def AddMember(self, **Values):
+        for Name in self.Columns:
+            x = np.broadcast_to(np.asarray(Values[Name], dtype=np.float64), self.Shape)
+            Ok = ~np.isnan(x)
+            n = self.Count[Name] + Ok
+            Delta = np.where(Ok, x - self.Mean[Name], 0.0)
+            self.Mean[Name] += np.divide(Delta, n, out=np.zeros(self.Shape), where=n > 0)
+            self.M2[Name] += Delta * np.where(Ok, x - self.Mean[Name], 0.0)
+            self.Count[Name] = n
+            for i, t in enumerate(self.Thresholds.get(Name, ())):
+                self.Exceed[Name][i] += Ok & (x >= t)
+            if self.Quantiles:
+                self.Sketches[Name].Add(x.ravel())
+
+    ## \fn Merge Add the statistics of another summary (of other members) to this one
+    ## \return self
+    def Merge(self, Other):
+        if (Other.Shape, Other.Columns, Other.Quantiles, Other.Thresholds, Other.Resolution) != (
+                self.Shape, self.Columns, self.Quantiles, self.Thresholds, self.Resolution):
+            raise ValueError("Only summaries with the same configuration can be merged")
+        for Name in self.Columns:
+            na, nb = self.Count[Name], Other.Count[Name]
+            n = na + nb
+            Delta = Other.Mean[Name] - self.Mean[Name]
+            Share = np.divide(nb, n, out=np.zeros(self.Shape), where=n > 0)
+            self.M2[Name] += Other.M2[Name] + Delta ** 2 * na * Share
+            self.Mean[Name] += Delta * Share
+            self.Count[Name] = n
+            if Name in self.Exceed:
+                self.Exceed[Name] += Other.Exceed[Name]
+            if self.Quantiles:
+                self.Sketches[Name].Merge(Other.Sketches[Name])
+        return self
+
+    ## \fn Spread Member standard deviation (ddof=1) of an index, NaN with fewer than two members
+    def Spread(self, Name):
+        n = self.Count[Name]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(n > 1, np.sqrt(self.M2[Name] / (n - 1)), np.nan)
+
+    ## \fn Quantile Member quantiles of an index
+    ## \return array shaped (len(Quantiles),) + Shape
+    def Quantile(self, Name, Quantiles=None):
+        q = self.Quantiles if Quantiles is None else tuple(Quantiles)
+        if not self.Quantiles:
+            raise ValueError("This summary keeps no quantile sketches")
+        return self.Sketches[Name].Quantile(q).reshape((len(q),) + self.Shape)
+
+    ## \fn Exceedance Share of members at or above each of an index's thresholds
+    ## \return array shaped (len(Thresholds[Name]),) + Shape
+    def Exceedance(self, Name):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.Count[Name] > 0, self.Exceed[Name] / self.Count[Name], np.nan)
+
+    ## \fn Summary All statistics
+    ## \return dict index name -> dict with Count, Mean, Spread and, when configured,
+    ## Quantiles and Exceedance
+    def Summary(self):
+        Out = {}
+        for Name in self.Columns:
+            Stats = {"Count": self.Count[Name].copy(),
+                     "Mean": np.where(self.Count[Name] > 0, self.Mean[Name], np.nan),
+                     "Spread": self.Spread(Name)}
+            if self.Quantiles:
+                Stats["Quantiles"] = self.Quantile(Name)
+            if Name in self.Thresholds:
+                Stats["Exceedance"] = self.Exceedance(Name)
+            Out[Name] = Stats
+        return Out
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        return {"Shape": list(self.Shape), "Columns": list(self.Columns), "Quantiles": list(self.Quantiles),
+                "Thresholds": {Name: list(T) for Name, T in self.Thresholds.items()},
+                "Resolution": self.Resolution,
+                "Count": {Name: x.tolist() for Name, x in self.Count.items()},
+                "Mean": {Name: x.tolist() for Name, x in self.Mean.items()},
+                "M2": {Name: x.tolist() for Name, x in self.M2.items()},
+                "Exceed": {Name: x.tolist() for Name, x in self.Exceed.items()},
+                "Sketches": {Name: Sketches.State() for Name, Sketches in self.Sketches.items()}}
+
+    ## \fn FromState Rebuild from State()
+    @classmethod
+    def FromState(cls, State):
+        Summary = cls(State["Shape"], State["Columns"], (), State["Thresholds"], State["Resolution"])
+        Summary.Quantiles = tuple(State["Quantiles"])
+        for Name in Summary.Columns:
+            Summary.Count[Name] = np.array(State["Count"][Name], dtype=np.int64).reshape(Summary.Shape)
+            Summary.Mean[Name] = np.array(State["Mean"][Name], dtype=np.float64).reshape(Summary.Shape)
+            Summary.M2[Name] = np.array(State["M2"][Name], dtype=np.float64).reshape(Summary.Shape)
+        for Name in Summary.Exceed:
+            Summary.Exceed[Name] = np.array(State["Exceed"][Name], dtype=np.int64).reshape(Summary.Exceed[Name].shape)
+        for Name, Sketches in State["Sketches"].items():
+            Summary.Sketches[Name] = CellSketches.FromState(Sketches)
+        return Summary
+
+    ## \fn Dumps State as a JSON string
+    def Dumps(self):
+        return json.dumps(self.State())
+
+    ## \fn Loads Rebuild from Dumps()
+    @classmethod
+    def Loads(cls, s):
+        return cls.FromState(json.loads(s))
+
+
+## \fn iCalcIndexesEnsemble Compute the indexes member by member into an EnsembleSummary
+## \param FM USNFDRSFuelModel, FMCode, or an array of FMCodes (see iCalcIndexesBatch)
+## \param Members Iterable of (MC, iWS, KBDI, FuelTemperature) per member, e.g.
+## zip(MC, WS, KBDI, FuelTemperature) over arrays with a leading member axis
+## \param iSlopeCls Slope class (1-5)
+## \param Summary EnsembleSummary to add to; None creates one (with Options) shaped like
+## the first member's result
+## \param Round Decimal places to round to, None for full precision
+## \param Options EnsembleSummary keyword arguments (Columns, Quantiles, Thresholds, Resolution)
+## \return the EnsembleSummary
+def iCalcIndexesEnsemble(FM, Members, iSlopeCls=1, Summary=None, Round=2, **Options):
+    for MC, iWS, KBDI, FuelTemperature in Members:
+        ERC, SC, BI, IC = iCalcIndexesBatch(FM, MC, iWS, iSlopeCls, KBDI, FuelTemperature, Round=Round)
+        if Summary is None:
+            Summary = EnsembleSummary(np.shape(ERC), **Options)
+        Summary.AddMember(ERC=ERC, SC=SC, BI=BI, IC=IC)
+    return Summary
@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized Growing Season Index (GSI) live fuel moisture model.
+
+Array versions of the GSI functions from the S591 GSI live fuel moisture
+notebook (Ind, CalcDayl, CalcVPD, CalcLFMFromGSI and CalcGSI).  Every function
+accepts scalars or NumPy arrays; rolling sums and means are O(n).  Daylength
+only depends on latitude and day of year, so it is served from lookup tables.
+GSIAccumulator carries the rolling windows from day to day for nightly runs.
+
+"""
+
+from functools import lru_cache
+import json
+import math
+import os
+
+import numpy as np
+
+## \var DaylLatDigits Decimal places latitude is rounded to when keying daylength tables
+DaylLatDigits = 2
+## \var DaylCacheSize Number of per-latitude daylength tables kept in the LRU cache (read at import)
+DaylCacheSize = 256
+
+
+## \class GSILimits
+## \brief Parameters used to derive GSI
+class GSILimits:
+    TminLow = -2       # Lower limit for minimum temperature (C)
+    TminUp = 5         # Upper limit for minimum temperature (C)
+    DaylLow = 36000    # Lower limit for daylength (seconds)
+    DaylUp = 39600     # Upper limit for daylength (seconds)
+    VPDLow = 900       # Lower limit for VPD (pascals)
+    VPDUp = 4100       # Upper limit for VPD (pascals)
+    PrcpRTLow = 0.5    # Lower limit for running total precip (inches)
+    PrcpRTUp = 1.5     # Upper limit for running total precip (inches)
+    PrcpRTPeriod = 21  # Running total period for precipitaiton (days)
+    GSIPeriod = 21     # Running average period for final GSI (days)
+    GUThresh = 0.25    # Green-up threshold (dim)
+    LFMMax = 200       # Maximum fuel moisture (% dry wt)
+    LFMMin = 60        # Minimum fuel moisture (% dry wt)
+    Lat = 45           # Station latitude (degrees)
+
+
+## \fn SetGSILimits Set the GSILimits values from an 11 element list of calibrated parameters
+## \param gsilim GSILimits instance (or the class itself)
+## \param gsiparams [TminLow, TminUp, VPDLow, VPDUp, DaylLow, DaylUp, PrcpRTLow, PrcpRTUp,
+## GSIPeriod, GUThresh, PrcpRTPeriod]
+## \param LFMMin minimum live fuel moisture limit for model
+## \param LFMMax maximum live fuel moisture limit for model
+## \param Lat Latitude of the estimation location (used in photoperiod calculations)
+def SetGSILimits(gsilim, gsiparams, LFMMin, LFMMax, Lat):
+    gsilim.TminLow = gsiparams[0]
+    gsilim.TminUp = gsiparams[1]
+    gsilim.VPDLow = gsiparams[2]
+    gsilim.VPDUp = gsiparams[3]
+    gsilim.DaylLow = gsiparams[4]
+    gsilim.DaylUp = gsiparams[5]
+    gsilim.PrcpRTLow = gsiparams[6]
+    gsilim.PrcpRTUp = gsiparams[7]
+    gsilim.GSIPeriod = gsiparams[8]
+    gsilim.GUThresh = gsiparams[9]
+    gsilim.PrcpRTPeriod = gsiparams[10]
+    gsilim.LFMMin = LFMMin
+    gsilim.LFMMax = LFMMax
+    gsilim.Lat = Lat
+    return gsilim
+
+
+## \fn Ind GSI indicator/ramp function
+## \param Var Variable value(s)
+## \param Low Lower limit, Var below it gives 0
+## \param Up Upper limit, Var above it gives 1
+## \return Proportion between the limits (0 everywhere when Up == Low)
+def Ind(Var, Low, Up):
+    Var = np.asarray(Var, dtype=np.float64)
+    Low = float(Low)
+    Up = float(Up)
+    if (Up == Low):
+        return np.zeros_like(Var)
+    with np.errstate(invalid="ignore"):
+        return np.where(Var < Low, 0.0, np.where(Var > Up, 1.0, (Var - Low) / (Up - Low)))
+
+
+## \fn CalcDayl Daylength function from MT-CLIM
+## \param lat Latitude (degrees)
+## \param yday Day of year
+## \return Daylength (seconds)
+def CalcDayl(lat, yday):
+    RADPERDAY = 0.017214
+    RADPERDEG = 0.01745329
+    MINDECL = -0.4092797
+    SECPERRAD = 13750.9871
+    DAYSOFF = 10.25
+    lat = np.clip(np.asarray(lat, dtype=np.float64) * RADPERDEG, -1.5707, 1.5707)
+    coslat = np.cos(lat)
+    sinlat = np.sin(lat)
+
+    # calculate cos and sin of declination
+    decl = MINDECL * np.cos((np.asarray(yday, dtype=np.float64) + DAYSOFF) * RADPERDAY)
+    cosdecl = np.cos(decl)
+    sindecl = np.sin(decl)
+    cosegeom = coslat * cosdecl
+    sinegeom = sinlat * sindecl
+    coshss = np.clip(-(sinegeom) / cosegeom, -1.0, 1.0)  # -1 is 24-hr daylight, 1 is 0-hr daylight
+    hss = np.arccos(coshss)                               # hour angle at sunset (radians)
+    # daylength (seconds)
+    return 2.0 * hss * SECPERRAD
+
+
+## \fn CalcDaylightHours Daylight hours as a function of Latitude and Julian Date
+## \param Lat Latitude (degrees)
+## \param Julian Julian Year Day (1-366)
+def CalcDaylightHours(Lat, Julian):
+    phi = np.tan(np.asarray(Lat, dtype=np.float64) * 0.01745) * -1.0
+    xfact = (np.asarray(Julian, dtype=np.float64) - 80) * 0.01745
+    decl = 23.5 * np.sin(xfact)
+    decl = decl * 0.01745
+    tla = phi * np.sin(decl)
+    tla = np.where(np.fabs(tla) < .01, 0.01,
+                   np.where(tla >= 1.0, 0.99999999, np.where(tla <= -1.0, -.9999999, tla)))
+    tla = np.arctan(np.sqrt((1.0 - tla * tla)) / tla)
+    tla = np.where(tla < 0.0, tla + 3.141593, tla)
+    return tla * 7.64
+
+
+## \var _DaylFunctions Daylength functions available to the lookup tables
+_DaylFunctions = {"Dayl": CalcDayl, "DaylightHours": CalcDaylightHours}
+
+
+@lru_cache(maxsize=DaylCacheSize)
+def _DaylTable(Lat, Kind):
+    Table = _DaylFunctions[Kind](Lat, np.arange(1, 367))
+    Table.flags.writeable = False
+    return Table
+
+
+## \fn _LatKey Latitude key for the daylength tables
+def _LatKey(Lat, LatDigits):
+    Lat = float(Lat)
+    return Lat if LatDigits is None else round(Lat, LatDigits)
+
+
+## \fn DaylTable Read-only 366-entry daylength table for a latitude (index = day of year - 1)
+## \param Lat Latitude (degrees)
+## \param Kind "Dayl" (MT-CLIM, seconds) or "DaylightHours" (CalcDaylightHours, hours)
+## \param LatDigits Decimal places the latitude is rounded to (None for the exact latitude)
+##
+## Tables are memoized in an LRU of DaylCacheSize latitudes.
+def DaylTable(Lat, Kind="Dayl", LatDigits=DaylLatDigits):
+    return _DaylTable(_LatKey(Lat, LatDigits), Kind)
+
+
+## \fn LookupDayl Daylength for an array of days of year at one latitude
+## \param Lat Latitude (degrees)
+## \param yday Day of year (1-366), scalar or integer array
+## \return array shaped like yday
+def LookupDayl(Lat, yday, Kind="Dayl", LatDigits=DaylLatDigits):
+    return DaylTable(Lat, Kind, LatDigits)[np.asarray(yday, dtype=np.intp) - 1]
+
+
+## \fn DaylGrid Latitude x day-of-year daylength table (shape (len(Lats), 366))
+## \param Lats Latitudes (degrees) of the grid rows
+## \param Kind "Dayl" or "DaylightHours"
+## \param Path Optional .npy file; the table is written there once and returned as a read-only
+## memory map, so worker processes that open the same Path share the pages.  The latitudes and
+## kind are kept in a Path + ".json" sidecar and the file is rebuilt when they do not match.
+## \return read-only 2-D array
+def DaylGrid(Lats, Kind="Dayl", Path=None):
+    Lats = np.asarray(Lats, dtype=np.float64).reshape(-1, 1)
+    Meta = {"Kind": Kind, "Lats": Lats.ravel().tolist()}
+    if Path is not None and os.path.exists(Path) and _ReadJSON(Path + ".json") == Meta:
+        return np.load(Path, mmap_mode="r")
+    Grid = _DaylFunctions[Kind](Lats, np.arange(1, 367).reshape(1, -1))
+    if Path is None:
+        Grid.flags.writeable = False
+        return Grid
+    Tmp = "%s.%d.tmp" % (Path[:-4] if Path.endswith(".npy") else Path, os.getpid())
+    np.save(Tmp + ".npy", Grid)
+    with open(Tmp + ".json", "w") as f:
+        json.dump(Meta, f)
+    # Table first: a reader between the two replaces sees a stale sidecar and rebuilds
+    os.replace(Tmp + ".npy", Path)
+    os.replace(Tmp + ".json", Path + ".json")
+    return np.load(Path, mmap_mode="r")
+
+
+## \fn _ReadJSON Contents of a JSON file, None if it is missing or unreadable
+def _ReadJSON(Path):
+    try:
+        with open(Path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+## \fn LookupDaylGrid Gather daylengths from a DaylGrid
+## \param Grid Output of DaylGrid
+## \param LatIndex Row of Grid for each value
+## \param yday Day of year (1-366) for each value
+def LookupDaylGrid(Grid, LatIndex, yday):
+    return Grid[np.asarray(LatIndex, dtype=np.intp), np.asarray(yday, dtype=np.intp) - 1]
+
+
+## \fn CalcVP Saturation vapor pressure (Pa) for a temperature in deg F
+def CalcVP(tempF):
+    tmpC = (np.asarray(tempF, dtype=np.float64) - 32.0) / 1.8
+    return 610.7 * np.exp((17.38 * tmpC) / (239 + tmpC))
+
+
+## \fn CalcVPD Vapor pressure deficit (Pa) from RH (%) and temperature (deg F), floored at 0
+def CalcVPD(RH, TempF):
+    vp = CalcVP(TempF)
+    vpd = vp - (np.asarray(RH, dtype=np.float64) / 100) * vp
+    with np.errstate(invalid="ignore"):
+        return np.where(vpd < 0.0, 0.0, vpd)
+
+
+## \fn CalcLFMFromGSI Scale GSI to live fuel moisture
+## \param gsi Rescaled GSI (0-1)
+## \param GUThresh Green-up threshold; below it (or for missing GSI) LFM is LFMMin
+## \param LFMMin Minimum live fuel moisture
+## \param LFMMax Maximum live fuel moisture
+def CalcLFMFromGSI(gsi, GUThresh, LFMMin, LFMMax):
+    m = (LFMMax - LFMMin) / (1 - GUThresh)
+    b = LFMMax - m
+    gsi = np.asarray(gsi, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        return np.where(gsi >= GUThresh, m * gsi + b, LFMMin)
+
+
+## \fn RollingSum Trailing n-value sum, NaN for the first n-1 values or any window with a NaN
+## \param x 1-D array
+## \param n Window length
+## \return array like x (matches pandas Series.rolling(n).sum())
+def RollingSum(x, n):
+    x = np.asarray(x, dtype=np.float64)
+    n = int(n)
+    Out = np.full(x.shape, np.nan)
+    if n < 1 or len(x) < n:
+        return Out
+    Missing = np.isnan(x)
+    c = np.concatenate(([0.0], np.cumsum(np.where(Missing, 0.0, x))))
+    m = np.concatenate(([0], np.cumsum(Missing)))
+    Out[n - 1:] = np.where(m[n:] - m[:-n] > 0, np.nan, c[n:] - c[:-n])
+    return Out
+
+
+## \fn RollingMean Trailing n-value mean (see RollingSum)
+def RollingMean(x, n):
+    return RollingSum(x, n) / int(n)
+
+
+## \fn Rescale Divide by the largest (non-missing) value, as quantile(1) does
+def Rescale(x):
+    x = np.asarray(x, dtype=np.float64)
+    if np.all(np.isnan(x)):
+        return x.copy()
+    return x / np.nanmax(x)
+
+
+## \fn CalcGSIArrays GSI, rescaled GSI and live fuel moisture from daily arrays
+## \param Tmin Daily minimum temperature (deg F)
+## \param VPDMax Daily maximum VPD (Pa)
+## \param Prcp 24 hour total precipitation (in)
+## \param JDay Day of year
+## \param gsilim GSILimits
+## \return dict of arrays: TminC, TminInd, VPDInd, Dayl, DaylInd, Prcp_RT, PrcpInd, iGSI, GSI,
+## GSI_RS, iGSI_PE, GSI_PE, GSI_PE_RS, LFMWood, LFMWoodP
+def CalcGSIArrays(Tmin, VPDMax, Prcp, JDay, gsilim):
+    Out = {}
+    Out["TminC"] = (np.asarray(Tmin, dtype=np.float64) - 32.0) * 5.0 / 9.0
+    Out["TminInd"] = Ind(Out["TminC"], gsilim.TminLow, gsilim.TminUp)
+    Out["VPDInd"] = 1 - Ind(VPDMax, gsilim.VPDLow, gsilim.VPDUp)
+    Out["Dayl"] = LookupDayl(gsilim.Lat, JDay, LatDigits=None)
+    Out["DaylInd"] = Ind(Out["Dayl"], gsilim.DaylLow, gsilim.DaylUp)
+    Out["Prcp_RT"] = RollingSum(Prcp, gsilim.PrcpRTPeriod)
+    Out["PrcpInd"] = Ind(Out["Prcp_RT"], gsilim.PrcpRTLow, gsilim.PrcpRTUp)
+    # Daily GSI for three indicator model
+    Out["iGSI"] = Out["TminInd"] * Out["VPDInd"] * Out["DaylInd"]
+    Out["GSI"] = RollingMean(Out["iGSI"], gsilim.GSIPeriod)
+    Out["GSI_RS"] = Rescale(Out["GSI"])
+    # Daily GSI for four indicator (precip-enhanced) model
+    Out["iGSI_PE"] = Out["iGSI"] * Out["PrcpInd"]
+    Out["GSI_PE"] = RollingMean(Out["iGSI_PE"], gsilim.GSIPeriod)
+    Out["GSI_PE_RS"] = Rescale(Out["GSI_PE"])
+    Out["LFMWood"] = CalcLFMFromGSI(Out["GSI_RS"], gsilim.GUThresh, gsilim.LFMMin, gsilim.LFMMax)
+    Out["LFMWoodP"] = CalcLFMFromGSI(Out["GSI_PE_RS"], gsilim.GUThresh, gsilim.LFMMin, gsilim.LFMMax)
+    return Out
+
+
+## \fn CalcGSI Calculate GSI, Scaled GSI and Live Fuel Moisture on a DataFrame
+## \param df Pandas DataFrame of daily weather with DateTime, Tmin (deg F), VPDMax (Pa) and Prcp columns
+## \param gsilim GSILimits
+## \param PLowLim Records after this date are used
+## \param PUpperLim Records up to and including this date are used
+## \return Filtered copy of df with the GSI columns added
+def CalcGSI(df, gsilim, PLowLim='2014-01-01', PUpperLim='2020-12-31'):
+    df = df[(df['DateTime'] > PLowLim) & (df['DateTime'] <= PUpperLim)].copy()
+    df['JDay'] = df.DateTime.dt.dayofyear
+    Out = CalcGSIArrays(df['Tmin'].to_numpy(), df['VPDMax'].to_numpy(), df['Prcp'].to_numpy(),
+                        df['JDay'].to_numpy(), gsilim)
+    for Name, Values in Out.items():
+        df[Name] = Values
+    return df
+
+
+## \var GSILimitNames GSILimits attributes saved with a GSIAccumulator state
+GSILimitNames = ("TminLow", "TminUp", "DaylLow", "DaylUp", "VPDLow", "VPDUp", "PrcpRTLow", "PrcpRTUp",
+                 "PrcpRTPeriod", "GSIPeriod", "GUThresh", "LFMMax", "LFMMin", "Lat")
+
+## \var GSIColumns Names of the values computed by CalcGSIArrays and GSIAccumulator
+GSIColumns = ("TminC", "TminInd", "VPDInd", "Dayl", "DaylInd", "Prcp_RT", "PrcpInd", "iGSI", "GSI", "GSI_RS",
+              "iGSI_PE", "GSI_PE", "GSI_PE_RS", "LFMWood", "LFMWoodP")
+
+## \var RescaleModes GSIAccumulator rescale modes
+RescaleModes = ("running", "frozen")
+
+
+## \fn _Ind1 Scalar Ind (same results as Ind for one value)
+def _Ind1(Var, Low, Up):
+    if Up == Low:
+        return 0.0
+    if Var < Low:
+        return 0.0
+    if Var > Up:
+        return 1.0
+    return (Var - Low) / (Up - Low)
+
+
+## \fn _Div Divide by a rescale maximum, NaN when there is none (as Rescale)
+def _Div(x, Max):
+    if Max is None or (Max == 0 and x == 0):
+        return math.nan
+    return x / Max
+
+
+## \class _RingSum
+## \brief Trailing n-value sum over a ring buffer (RollingSum one value at a time)
+##
+## The sum is updated in O(1) per value and re-summed from the buffer each time
+## the ring wraps, so rounding error does not build up over years of updates.
+class _RingSum:
+    __slots__ = ("Values", "Pos", "Count", "Sum", "Missing")
+
+    def __init__(self, n):
+        n = int(n)
+        if n < 1:
+            raise ValueError("Window length must be at least 1")
+        self.Values = [0.0] * n
+        self.Pos = 0
+        self.Count = 0
+        self.Sum = 0.0
+        self.Missing = 0
+
+    ## \fn Push Add a value and return the window sum (NaN until n values, or with a NaN in the window)
+    def Push(self, x):
+        x = float(x)
+        Values = self.Values
+        n = len(Values)
+        if self.Count == n:
+            Old = Values[self.Pos]
+            if Old != Old:
+                self.Missing -= 1
+            else:
+                self.Sum -= Old
+        else:
+            self.Count += 1
+        Values[self.Pos] = x
+        if x != x:
+            self.Missing += 1
+        else:
+            self.Sum += x
+        self.Pos = (self.Pos + 1) % n
+        if self.Pos == 0:
+            self.Sum = math.fsum(v for v in Values if v == v)
+        if self.Count < n or self.Missing:
+            return math.nan
+        return self.Sum
+
+    ## \fn State Buffer contents, oldest first
+    def State(self):
+        if self.Count < len(self.Values):
+            return self.Values[:self.Count]
+        return self.Values[self.Pos:] + self.Values[:self.Pos]
+
+    ## \fn FromValues Ring of length n holding Values (oldest first; only the last n are kept)
+    @classmethod
+    def FromValues(cls, n, Values):
+        Ring = cls(n)
+        for v in list(Values)[-len(Ring):]:
+            Ring.Push(v)
+        return Ring
+
+    def __len__(self):
+        return len(self.Values)
+
+
+## \class GSIAccumulator
+## \brief Day-by-day GSI and live fuel moisture for one station
+##
+## Gives the same values as CalcGSIArrays over the same days, one day at a time:
+## the precipitation running total and the GSI means come from ring buffers and
+## the rescale maximum is carried as a single value, so appending a day is O(1)
+## and the state is a few dozen numbers whatever the length of the history.
+##
+## Rescale mode "running" divides by the largest GSI seen so far (including the
+## day being added); it equals CalcGSIArrays' rescaling once the whole record has
+## been seen.  Mode "frozen" divides by fixed maxima (typically those of the
+## calibration period, see FromHistory) that new days do not change.
+class GSIAccumulator:
+
+    ## \fn __init__
+    ## \param gsilim GSILimits
+    ## \param Rescale "running" or "frozen"
+    ## \param MaxGSI, MaxGSI_PE Rescale maxima of GSI and GSI_PE (required for "frozen";
+    ## starting values for "running", None if no GSI has been seen)
+    def __init__(self, gsilim, Rescale="running", MaxGSI=None, MaxGSI_PE=None):
+        if Rescale not in RescaleModes:
+            raise ValueError("Rescale must be one of %s" % (RescaleModes,))
+        if Rescale == "frozen" and (MaxGSI is None or MaxGSI_PE is None):
+            raise ValueError("Frozen rescaling needs MaxGSI and MaxGSI_PE")
+        self.Limits = {Name: getattr(gsilim, Name) for Name in GSILimitNames}
+        self.Rescale = Rescale
+        self.MaxGSI = MaxGSI
+        self.MaxGSI_PE = MaxGSI_PE
+        self.LastDate = None
+        self._Prcp = _RingSum(self.Limits["PrcpRTPeriod"])
+        self._iGSI = _RingSum(self.Limits["GSIPeriod"])
+        self._iGSI_PE = _RingSum(self.Limits["GSIPeriod"])
+        self._Dayl = DaylTable(self.Limits["Lat"], LatDigits=None)
+
+    ## \fn FromHistory Start from a weather history computed in one vectorized pass
+    ## \param Tmin, VPDMax, Prcp, JDay Daily arrays as for CalcGSIArrays
+    ## \param gsilim GSILimits
+    ## \param Rescale "running" or "frozen" (frozen at the maxima of this history)
+    ## \param LastDate Date of the last history record (see Update)
+    ## \return GSIAccumulator ready to take the following day
+    @classmethod
+    def FromHistory(cls, Tmin, VPDMax, Prcp, JDay, gsilim, Rescale="running", LastDate=None):
+        Out = CalcGSIArrays(Tmin, VPDMax, Prcp, JDay, gsilim)
+        Max = [None if np.all(np.isnan(Out[k])) else float(np.nanmax(Out[k])) for k in ("GSI", "GSI_PE")]
+        Acc = cls(gsilim, Rescale, *Max)
+        Acc._Prcp = _RingSum.FromValues(gsilim.PrcpRTPeriod, np.asarray(Prcp, dtype=np.float64).tolist())
+        Acc._iGSI = _RingSum.FromValues(gsilim.GSIPeriod, Out["iGSI"].tolist())
+        Acc._iGSI_PE = _RingSum.FromValues(gsilim.GSIPeriod, Out["iGSI_PE"].tolist())
+        Acc.LastDate = None if LastDate is None else str(np.datetime64(LastDate, "D"))
+        return Acc
+
+    ## \fn Update Add one day
+    ## \param Tmin Minimum temperature (deg F)
+    ## \param VPDMax Maximum VPD (Pa)
+    ## \param Prcp 24 hour precipitation (in)
+    ## \param JDay Day of year
+    ## \param Date Optional date of the day; if given it must be after the last dated day,
+    ## which stops a nightly job from appending the same day twice
+    ## \return dict with the CalcGSIArrays values for the day (floats)
+    def Update(self, Tmin, VPDMax, Prcp, JDay, Date=None):
+        if Date is not None:
+            Date = str(np.datetime64(Date, "D"))
+            if self.LastDate is not None and Date <= self.LastDate:
+                raise ValueError("Day %s is not after the last day added (%s)" % (Date, self.LastDate))
+        Lim = self.Limits
+        Out = {}
+        Out["TminC"] = TminC = (float(Tmin) - 32.0) * 5.0 / 9.0
+        Out["TminInd"] = _Ind1(TminC, Lim["TminLow"], Lim["TminUp"])
+        Out["VPDInd"] = 1 - _Ind1(float(VPDMax), Lim["VPDLow"], Lim["VPDUp"])
+        Out["Dayl"] = float(self._Dayl[int(JDay) - 1])
+        Out["DaylInd"] = _Ind1(Out["Dayl"], Lim["DaylLow"], Lim["DaylUp"])
+        Out["Prcp_RT"] = self._Prcp.Push(Prcp)
+        Out["PrcpInd"] = _Ind1(Out["Prcp_RT"], Lim["PrcpRTLow"], Lim["PrcpRTUp"])
+        Out["iGSI"] = Out["TminInd"] * Out["VPDInd"] * Out["DaylInd"]
+        Out["GSI"] = self._iGSI.Push(Out["iGSI"]) / int(Lim["GSIPeriod"])
+        Out["iGSI_PE"] = Out["iGSI"] * Out["PrcpInd"]
+        Out["GSI_PE"] = self._iGSI_PE.Push(Out["iGSI_PE"]) / int(Lim["GSIPeriod"])
+        if self.Rescale == "running":
+            if Out["GSI"] == Out["GSI"] and (self.MaxGSI is None or Out["GSI"] > self.MaxGSI):
+                self.MaxGSI = Out["GSI"]
+            if Out["GSI_PE"] == Out["GSI_PE"] and (self.MaxGSI_PE is None or Out["GSI_PE"] > self.MaxGSI_PE):
+                self.MaxGSI_PE = Out["GSI_PE"]
+        Out["GSI_RS"] = _Div(Out["GSI"], self.MaxGSI)
+        Out["GSI_PE_RS"] = _Div(Out["GSI_PE"], self.MaxGSI_PE)
+        m = (Lim["LFMMax"] - Lim["LFMMin"]) / (1 - Lim["GUThresh"])
+        b = Lim["LFMMax"] - m
+        for Name, Value in (("LFMWood", Out["GSI_RS"]), ("LFMWoodP", Out["GSI_PE_RS"])):
+            Out[Name] = m * Value + b if Value >= Lim["GUThresh"] else float(Lim["LFMMin"])
+        if Date is not None:
+            self.LastDate = Date
+        return Out
+
+    ## \fn Extend Add several days (e.g. to catch up after missed nights)
+    ## \param Tmin, VPDMax, Prcp, JDay Daily arrays
+    ## \param Dates Optional dates of the days
+    ## \return dict of arrays, as CalcGSIArrays
+    def Extend(self, Tmin, VPDMax, Prcp, JDay, Dates=None):
+        n = len(Tmin)
+        Days = [self.Update(Tmin[i], VPDMax[i], Prcp[i], JDay[i], None if Dates is None else Dates[i])
+                for i in range(n)]
+        return {Name: np.array([Day[Name] for Day in Days], dtype=np.float64) for Name in GSIColumns}
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        return {"Limits": self.Limits, "Rescale": self.Rescale, "MaxGSI": self.MaxGSI,
+                "MaxGSI_PE": self.MaxGSI_PE, "LastDate": self.LastDate, "Prcp": self._Prcp.State(),
+                "iGSI": self._iGSI.State(), "iGSI_PE": self._iGSI_PE.State()}
+
+    ## \fn FromState Rebuild an accumulator from State()
+    @classmethod
+    def FromState(cls, State):
+        gsilim = GSILimits()
+        for Name, Value in State["Limits"].items():
+            setattr(gsilim, Name, Value)
+        Acc = cls(gsilim, State["Rescale"], State["MaxGSI"], State["MaxGSI_PE"])
+        Acc.LastDate = State["LastDate"]
+        Acc._Prcp = _RingSum.FromValues(gsilim.PrcpRTPeriod, State["Prcp"])
+        Acc._iGSI = _RingSum.FromValues(gsilim.GSIPeriod, State["iGSI"])
+        Acc._iGSI_PE = _RingSum.FromValues(gsilim.GSIPeriod, State["iGSI_PE"])
+        return Acc
+
+    ## \fn Dumps State as a JSON string
+    def Dumps(self):
+        return json.dumps(self.State())
+
+    ## \fn Loads Rebuild an accumulator from Dumps()
+    @classmethod
+    def Loads(cls, s):
+        return cls.FromState(json.loads(s))
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Gridded NFDRS V4 index computation over memory-mapped .npy rasters.
+
+Every input is a 2-D grid (a .npy path, a memory map, an array or a scalar)
+and ERC, SC, BI and IC are written to .npy files opened as memory maps.  The
+grid is processed one tile at a time; inside a tile the cells are grouped by
+fuel model so each group is computed with that model's scalar parameters.
+Tiles can be spread over worker processes, which open the same files
+themselves, so the grid is never copied in full.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+
+import numpy as np
+
+from NFDRSV4Batch import CalcIndexesFromParams, FuelModelIndex, GatherFuelParams, MoistureFields
+
+## \var GridInputs Names of the per-cell inputs
+GridInputs = ("FuelModel",) + MoistureFields + ("WS", "SlopeCls", "KBDI", "FuelTemperature")
+
+## \var GridOutputs Names of the output grids (written as <Name>.npy)
+GridOutputs = ("ERC", "SC", "BI", "IC")
+
+## \var NoFuel Fuel model grid value of cells that are not computed (outputs are NaN)
+NoFuel = -1
+
+## \var DefaultTileShape Rows and columns per tile (64K cells keeps a tile's working set in cache)
+DefaultTileShape = (256, 256)
+
+
+## \fn FuelModelGrid Convert a grid of fuel model codes to FuelModelTable row indexes
+## \param Codes Array of FMCodes (unknown codes map to the Slash model, as USNFDRSFuelModel does)
+## \param NonBurnable Codes written as NoFuel
+## \param Path Optional .npy file to write the index grid to
+## \return int16 index grid (a memory map when Path is given)
+def FuelModelGrid(Codes, NonBurnable=("", "NB"), Path=None):
+    Codes = np.asarray(Codes, dtype=str)
+    Index = FuelModelIndex(Codes).astype(np.int16)
+    Index[np.isin(np.char.strip(np.char.upper(Codes)), [c.upper() for c in NonBurnable])] = NoFuel
+    if Path is None:
+        return Index
+    Out = np.lib.format.open_memmap(Path, mode="w+", dtype=np.int16, shape=Index.shape)
+    Out[...] = Index
+    Out.flush()
+    return np.load(Path, mmap_mode="r")
+
+
+## \fn OpenGrid Open an input: .npy paths are memory mapped read-only, anything else is used as is
+def OpenGrid(x):
+    if isinstance(x, (str, os.PathLike)):
+        return np.load(x, mmap_mode="r")
+    return x
+
+
+## \fn _Spec Picklable form of an input for the worker processes (memory maps become their file)
+def _Spec(Name, x):
+    if isinstance(x, (str, os.PathLike)) or np.ndim(x) == 0:
+        return x
+    # Only a whole-file map (not a view of one) can be reopened from its file name
+    if isinstance(x, np.memmap) and x.filename is not None and isinstance(x.base, mmap.mmap):
+        return x.filename
+    raise ValueError("Grid input %s must be a .npy path, a .npy memory map or a scalar when Workers != 0" % Name)
+
+
+## \fn Tiles Tile windows of a grid
+## \param Shape Grid shape (rows, columns)
+## \param TileShape Tile (rows, columns)
+## \return list of (row slice, column slice) in row-major order
+def Tiles(Shape, TileShape=DefaultTileShape):
+    Rows, Cols = Shape
+    TR, TC = TileShape
+    return [(slice(r, min(r + TR, Rows)), slice(c, min(c + TC, Cols)))
+            for r in range(0, Rows, TR) for c in range(0, Cols, TC)]
+
+
+## \class _GridJob
+## \brief Opened inputs and outputs of a grid run; computes one tile at a time
+class _GridJob:
+
+    def __init__(self, Inputs, Outputs, Round):
+        self.Inputs = {Name: OpenGrid(x) for Name, x in Inputs.items()}
+        self.Outputs = {Name: np.load(Path, mmap_mode="r+") for Name, Path in Outputs.items()}
+        self.Round = Round
+
+    ## \fn Run Compute one tile and write it to the output grids
+    ## \param Tile (row slice, column slice)
+    ## \return number of cells computed
+    def Run(self, Tile):
+        FM = np.asarray(self.Inputs["FuelModel"][Tile])
+        Args = {}
+        for Name in GridInputs[1:]:
+            x = self.Inputs[Name]
+            Args[Name] = x if np.ndim(x) == 0 else np.asarray(x[Tile])
+        Out = {Name: np.full(FM.shape, np.nan) for Name in GridOutputs}
+        Cells = 0
+        for Model in np.unique(FM):
+            if Model < 0:
+                continue
+            Mask = FM == Model
+            Cells += int(np.count_nonzero(Mask))
+            Values = [x if np.ndim(x) == 0 else x[Mask] for x in Args.values()]
+            Result = CalcIndexesFromParams(GatherFuelParams(Model), *Values)
+            for Name, r in zip(GridOutputs, Result):
+                Out[Name][Mask] = r if self.Round is None else np.round(r, self.Round)
+        for Name in GridOutputs:
+            self.Outputs[Name][Tile] = Out[Name]
+        return Cells
+
+    ## \fn Flush Write the output pages back to disk
+    def Flush(self):
+        for Grid in self.Outputs.values():
+            Grid.flush()
+
+
+## \var _WorkerJob _GridJob of a worker process, set once by the pool initializer
+_WorkerJob = None
+
+
+## \fn _InitGridWorker Pool initializer; each worker opens the grids itself
+def _InitGridWorker(Inputs, Outputs, Round):
+    global _WorkerJob
+    _WorkerJob = _GridJob(Inputs, Outputs, Round)
+
+
+## \fn _RunTiles Compute a list of tiles (runs in a worker)
+def _RunTiles(TileList):
+    Cells = sum(_WorkerJob.Run(Tile) for Tile in TileList)
+    _WorkerJob.Flush()
+    return Cells
+
+
+## \fn iCalcIndexesGrid Compute ERC, SC, BI and IC grids
+## \param FuelModel Grid of FuelModelTable row indexes (see FuelModelGrid); NoFuel cells are skipped
+## \param MC Mapping of MC1..MCWOOD to grids or scalars
+## \param iWS 20ft wind speed grid or scalar (mph)
+## \param iSlopeCls Slope class grid or scalar (1-5)
+## \param KBDI Keetch-Byram Drought Index grid or scalar
+## \param FuelTemperature Fuel surface temperature grid or scalar
+## \param OutDir Directory for ERC.npy, SC.npy, BI.npy and IC.npy (created if needed)
+## \param TileShape Tile (rows, columns)
+## \param Workers Worker processes (0 = this process, None = os.cpu_count()); with workers,
+## grid inputs must be .npy paths or memory maps so each worker maps the files itself
+## \param Round Decimal places to round to, None for full precision
+## \param dtype Output data type
+## \param Progress Optional callback Progress(TilesDone, TilesTotal)
+## \return dict name -> read-only memory map of the output grid
+##
+## Grids are given as .npy paths, memory maps or arrays; grid inputs must all have the
+## fuel model grid's shape.
+def iCalcIndexesGrid(FuelModel, MC, iWS, iSlopeCls, KBDI, FuelTemperature, OutDir,
+                     TileShape=DefaultTileShape, Workers=0, Round=2, dtype=np.float32, Progress=None):
+    Inputs = {"FuelModel": FuelModel}
+    Inputs.update((Name, MC[Name]) for Name in MoistureFields)
+    Inputs.update(WS=iWS, SlopeCls=iSlopeCls, KBDI=KBDI, FuelTemperature=FuelTemperature)
+    Shape = np.shape(OpenGrid(FuelModel))
+    if len(Shape) != 2:
+        raise ValueError("The fuel model grid must be 2-D")
+    for Name, x in Inputs.items():
+        Opened = OpenGrid(x)
+        if np.ndim(Opened) != 0 and np.shape(Opened) != Shape:
+            raise ValueError("Grid %s has shape %s, expected %s" % (Name, np.shape(Opened), Shape))
+
+    os.makedirs(OutDir, exist_ok=True)
+    Outputs = {}
+    for Name in GridOutputs:
+        Outputs[Name] = os.path.join(OutDir, Name + ".npy")
+        np.lib.format.open_memmap(Outputs[Name], mode="w+", dtype=dtype, shape=Shape).flush()
+
+    TileList = Tiles(Shape, TileShape)
+    if Workers == 0:
+        Job = _GridJob(Inputs, Outputs, Round)
+        for i, Tile in enumerate(TileList):
+            Job.Run(Tile)
+            if Progress is not None:
+                Progress(i + 1, len(TileList))
+        Job.Flush()
+    else:
+        Specs = {Name: _Spec(Name, x) for Name, x in Inputs.items()}
+        Workers = Workers or os.cpu_count() or 1
+        # A few tiles per task keeps the scheduling overhead small without unbalancing the workers
+        PerTask = max(1, len(TileList) // (8 * Workers))
+        Tasks = [TileList[i:i + PerTask] for i in range(0, len(TileList), PerTask)]
+        Done = 0
+        with ProcessPoolExecutor(max_workers=Workers, initializer=_InitGridWorker,
+                                 initargs=(Specs, Outputs, Round)) as Executor:
+            for Task, _ in zip(Tasks, Executor.map(_RunTiles, Tasks)):
+                Done += len(Task)
+                if Progress is not None:
+                    Progress(Done, len(TileList))
+    return {Name: np.load(Path, mmap_mode="r") for Name, Path in Outputs.items()}
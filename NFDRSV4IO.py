@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming readers for station weather files.
+
+Handles the hourly fw21 CSV format (DateTime, Temperature(F), ...) and the
+space padded daily CSV format (DATE, MinT, MaxT, ...) in Data/045433.csv.
+Files are read in fixed-size record batches so multi-decade archives never
+need to be held in memory at once.
+
+"""
+
+import csv
+import os
+
+import numpy as np
+
+## \var DateColumns Column names recognised as the record date, in order of preference
+DateColumns = ("DateTime", "DATE", "Date")
+
+
+## \fn IsoDate Normalize a date string to "YYYY-MM-DDTHH:MM:SS"
+## \param s Date as "MM/DD/YYYY[ HH[:MM[:SS]]]" or ISO 8601 ("YYYY-MM-DD[THH:MM[:SS]][offset]")
+## \param DailyHour Hour assigned to values that only have a date
+## \return ISO string in local (wall clock) time; any UTC offset is dropped,
+## which matches the notebook's tz_localize(None)
+def IsoDate(s, DailyHour=0):
+    s = s.strip()
+    if "/" in s[:3]:
+        Date, _, Time = s.partition(" ")
+        m, d, y = Date.split("/")
+        Date = "%s-%02d-%02d" % (y, int(m), int(d))
+    else:
+        Date, Time = s[:10], s[11:]
+        for Sign in ("Z", "+", "-"):
+            i = Time.find(Sign)
+            if i >= 0:
+                Time = Time[:i]
+    Time = Time.strip()
+    if not Time:
+        return "%sT%02d:00:00" % (Date, DailyHour)
+    Parts = Time.split(":")
+    return Date + "T" + ":".join(("%02d" % int(float(p))) for p in (Parts + ["0", "0"])[:3])
+
+
+## \fn _DateKey Normalize a range bound (string, datetime, numpy or pandas timestamp);
+## date-only strings are taken at midnight
+def _DateKey(x):
+    if x is None:
+        return None
+    if isinstance(x, str):
+        return IsoDate(x)
+    return str(np.datetime64(x, "s"))
+
+
+## \fn _Column Convert a list of field strings to a typed array
+## \param Kind "f" for float64 (blank values become NaN), "U" for strings
+## \param Name, Dates Column name and record dates, for the error message
+## \exception ValueError for a non-blank value that is not a number in a float column
+def _Column(Values, Kind, Name="", Dates=()):
+    if Kind == "U":
+        return np.array([v.strip() for v in Values])
+    try:
+        return np.array(Values).astype(np.float64)
+    except ValueError:
+        Out = np.empty(len(Values))
+        for i, v in enumerate(Values):
+            try:
+                Out[i] = float(v)
+            except ValueError:
+                if v.strip():
+                    raise ValueError("Column %s was read as numbers from the first batch but has %r at %s; "
+                                     "leave it out with Columns or fix the file"
+                                     % (Name, v.strip(), Dates[i] if i < len(Dates) else "record %d" % i)) from None
+                Out[i] = np.nan
+        return Out
+
+
+## \fn _Kind Decide the column type from the first batch of values
+def _Kind(Values):
+    for v in Values:
+        v = v.strip()
+        if v:
+            try:
+                float(v)
+            except ValueError:
+                return "U"
+    return "f"
+
+
+## \fn ReadWeatherBatches Stream a weather CSV as fixed-size typed record batches
+## \param Source File name or an open text file (e.g. sys.stdin)
+## \param BatchSize Number of records per batch (the last batch may be shorter)
+## \param Start Only keep records at or after this date (inclusive)
+## \param End Only keep records before this date (exclusive)
+## \param Columns Names of the columns to keep (None keeps all); the date is always kept
+## \param DateColumn Name of the date column (default: first of DateColumns in the header)
+## \param DailyHour Hour assigned to date-only records (GetMet uses 13)
+## \param Sorted If True the file is in date order and reading stops at End
+## \param AsFrame Yield pandas DataFrames instead of dicts of arrays
+## \return generator of dict column -> numpy array (DateTime as datetime64[s])
+##
+## Header names are stripped once; empty header cells (the trailing comma of the
+## daily format) are dropped.  Records outside [Start, End) are skipped on their
+## date string before any other field is converted.  Each column is typed from the
+## first batch (numbers unless a non-blank value is not a number); a later value
+## that does not fit a numeric column raises ValueError rather than becoming NaN.
+def ReadWeatherBatches(Source, BatchSize=8760, Start=None, End=None, Columns=None, DateColumn=None,
+                       DailyHour=0, Sorted=False, AsFrame=False):
+    if BatchSize < 1:
+        raise ValueError("BatchSize must be at least 1")
+    Start = _DateKey(Start)
+    End = _DateKey(End)
+    Own = isinstance(Source, (str, os.PathLike))
+    File = open(Source, newline="") if Own else Source
+    try:
+        Reader = csv.reader(File)
+        Header = [h.strip() for h in next(Reader)]
+        if DateColumn is None:
+            DateColumn = next((c for c in DateColumns if c in Header), None)
+        if DateColumn not in Header:
+            raise ValueError("No date column found in %s" % (Header,))
+        DateIdx = Header.index(DateColumn)
+        Keep = [(i, h) for i, h in enumerate(Header)
+                if h and i != DateIdx and (Columns is None or h in Columns)]
+        Kinds = None
+        Dates = []
+        Fields = [[] for _ in Keep]
+
+        def MakeBatch():
+            nonlocal Kinds
+            if Kinds is None:
+                Kinds = [_Kind(f) for f in Fields]
+            Batch = {"DateTime": np.array(Dates, dtype="datetime64[s]")}
+            for (i, h), f, k in zip(Keep, Fields, Kinds):
+                Batch[h] = _Column(f, k, h, Dates)
+            if AsFrame:
+                import pandas as pd
+                return pd.DataFrame(Batch)
+            return Batch
+
+        for Row in Reader:
+            if len(Row) <= DateIdx or not Row[DateIdx].strip():
+                continue
+            Key = IsoDate(Row[DateIdx], DailyHour)
+            if Start is not None and Key < Start:
+                continue
+            if End is not None and Key >= End:
+                if Sorted:
+                    break
+                continue
+            Dates.append(Key)
+            n = len(Row)
+            for (i, h), f in zip(Keep, Fields):
+                f.append(Row[i] if i < n else "")
+            if len(Dates) == BatchSize:
+                yield MakeBatch()
+                Dates = []
+                Fields = [[] for _ in Keep]
+        if Dates:
+            yield MakeBatch()
+    finally:
+        if Own:
+            File.close()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in stage timings and branch counters for the index calculations.
+
+iCalcIndexes and the NFDRSV4Batch stages look up Active once per call and do
+nothing more while it is None, so the cost when disabled is one attribute
+load and a few `is not None` tests.  While enabled they record cumulative
+time per stage and how often the notable branches are taken, separately for
+the scalar and the batch paths.
+
+    with Instrumented() as Probe:
+        Results = list(RunStations(Manifest, ["Y"], Workers=0))
+    print(Probe.ToJSON())
+
+Only calls made in this process while recording are captured: results must be
+consumed inside the block (RunStations returns a generator), and work done in
+process-pool workers (NFDRSRunner, GSICalibrator and the grid mode with
+workers) is not recorded, since each worker has its own Active.  Run them
+in-process (Workers=0) to instrument them.  An Instrumentation is not meant to
+be shared by concurrent threads.
+
+"""
+
+from contextlib import contextmanager
+import json
+from time import perf_counter
+
+## \var Active The Instrumentation being recorded into, or None (disabled)
+Active = None
+
+
+## \class Instrumentation
+## \brief Cumulative per-stage timings and branch counters by calculation path
+##
+## Paths are "scalar" (iCalcIndexes) and "batch" (NFDRSV4Batch).  Scalar stages:
+## Drought (fuel model preparation, memoized, and the drought load transfer), FuelBed,
+## LiveExtinction, Spread, ERC and Ignition.  Batch stages: Drought, FuelBed,
+## Moisture (live extinction, reaction intensity, heat sink and ERC), Spread, BI and
+## Ignition.  Counters are per call on the scalar path and per element on the batch path.
+class Instrumentation:
+
+    def __init__(self):
+        self.Reset()
+
+    ## \fn Reset Clear all timings and counters
+    def Reset(self):
+        self.Timings = {}
+        self.Counters = {}
+        self._Path = None
+        self._Last = 0.0
+
+    ## \fn Begin Start timing one call on a path
+    def Begin(self, Path):
+        self._Path = Path
+        self.Timings.setdefault(Path, {})
+        Counters = self.Counters.setdefault(Path, {})
+        Counters["Calls"] = Counters.get("Calls", 0) + 1
+        self._Last = perf_counter()
+
+    ## \fn Lap Charge the time since the last Begin / Lap to a stage
+    def Lap(self, Stage):
+        Now = perf_counter()
+        Timings = self.Timings[self._Path]
+        Timings[Stage] = Timings.get(Stage, 0.0) + (Now - self._Last)
+        self._Last = Now
+
+    ## \fn Count Add to a counter of the current path
+    def Count(self, Name, n=1):
+        Counters = self.Counters[self._Path]
+        Counters[Name] = Counters.get(Name, 0) + int(n)
+
+    ## \fn AsDict Timings (seconds) and counters as nested dicts
+    def AsDict(self):
+        return {"Timings": {Path: dict(T) for Path, T in self.Timings.items()},
+                "Counters": {Path: dict(C) for Path, C in self.Counters.items()}}
+
+    ## \fn ToJSON AsDict() as a JSON string
+    def ToJSON(self, **Options):
+        return json.dumps(self.AsDict(), **Options)
+
+
+## \fn Enable Start recording
+## \param Probe Instrumentation to record into (default: a new one)
+## \return the active Instrumentation
+def Enable(Probe=None):
+    global Active
+    Active = Instrumentation() if Probe is None else Probe
+    return Active
+
+
+## \fn Disable Stop recording
+## \return the Instrumentation that was active, or None
+def Disable():
+    global Active
+    Probe, Active = Active, None
+    return Probe
+
+
+## \fn Instrumented Context manager recording into an Instrumentation while it is open
+@contextmanager
+def Instrumented(Probe=None):
+    Previous = Active
+    Probe = Enable(Probe)
+    try:
+        yield Probe
+    finally:
+        if Previous is None:
+            Disable()
+        else:
+            Enable(Previous)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental Keetch-Byram Drought Index for many stations at once.
+
+KBDI (0-800, hundredths of an inch of soil moisture deficit) is advanced one
+day at a time from the daily maximum temperature, the daily precipitation and
+each station's mean annual precipitation (Keetch and Byram 1968).  The state
+is the index and the running total of the current rain spell per station, so
+a nightly job adds a day in O(stations); the output is the KBDI argument of
+iCalcIndexes / iCalcIndexesBatch.
+
+    KB = KBDICalculator(AnnualPrecip)                # one normal (in) per station
+    KBDI = KB.Update(Tmax, Rain, Date="2024-07-01")  # arrays shaped (stations,)
+    ERC, SC, BI, IC = iCalcIndexesBatch(Codes, MC, WS, 1, KBDI, FuelTemperature)
+
+"""
+
+import json
+
+import numpy as np
+
+## \var KBDIMax Largest KBDI (8 inches of soil water deficit)
+KBDIMax = 800.0
+
+## \var KBDIStart Starting KBDI when none is given (as FireFamilyPlus)
+KBDIStart = 100.0
+
+## \var RainSpellThreshold Rain of a spell (in) absorbed by the canopy and litter before the
+## soil deficit is reduced
+RainSpellThreshold = 0.20
+
+
+## \fn DroughtFactor Daily KBDI increase (Keetch and Byram 1968, English units)
+## \param KBDI Index after the day's net rain
+## \param Tmax Daily maximum temperature (deg F)
+## \param AnnualPrecip Mean annual precipitation (in)
+## \return Increase, floored at 0 (cool days do not lower the index); 0 where Tmax is
+## missing (NaN), so a gap in the record neither dries the soil nor makes the index NaN
+def DroughtFactor(KBDI, Tmax, AnnualPrecip):
+    KBDI = np.asarray(KBDI, dtype=np.float64)
+    Tmax = np.asarray(Tmax, dtype=np.float64)
+    dQ = ((KBDIMax - KBDI) * (0.968 * np.exp(0.0486 * Tmax) - 8.30) * 0.001 /
+          (1.0 + 10.88 * np.exp(-0.0441 * np.asarray(AnnualPrecip, dtype=np.float64))))
+    return np.where(np.isnan(Tmax), 0.0, np.maximum(dQ, 0.0))
+
+
+## \class KBDICalculator
+## \brief Day-by-day KBDI of a set of stations
+##
+## Rain on consecutive days forms a spell; the first RainSpellThreshold inches of a spell
+## do not count, everything after lowers KBDI by 100 per inch.  A dry day ends the spell.
+class KBDICalculator:
+
+    ## \fn __init__
+    ## \param AnnualPrecip Mean annual precipitation (in), one value per station (or a scalar
+    ## for a single station)
+    ## \param Initial Starting KBDI (scalar or per station)
+    def __init__(self, AnnualPrecip, Initial=KBDIStart):
+        self.AnnualPrecip = np.atleast_1d(np.asarray(AnnualPrecip, dtype=np.float64)).copy()
+        n = len(self.AnnualPrecip)
+        self.KBDI = np.clip(np.broadcast_to(np.asarray(Initial, dtype=np.float64), (n,)), 0.0, KBDIMax).copy()
+        self.SpellRain = np.zeros(n)
+        self.LastDate = None
+
+    def __len__(self):
+        return len(self.KBDI)
+
+    ## \fn Update Add one day
+    ## \param Tmax Daily maximum temperature (deg F), per station or scalar; NaN counts as a
+    ## day without drying
+    ## \param Rain Daily precipitation (in), per station or scalar; NaN counts as no rain
+    ## \param Date Optional date of the day; if given it must be after the last dated day
+    ## \return KBDI of the day, one value per station (a copy)
+    def Update(self, Tmax, Rain, Date=None):
+        if Date is not None:
+            Date = str(np.datetime64(Date, "D"))
+            if self.LastDate is not None and Date <= self.LastDate:
+                raise ValueError("Day %s is not after the last day added (%s)" % (Date, self.LastDate))
+        Rain = np.nan_to_num(np.broadcast_to(np.asarray(Rain, dtype=np.float64), self.KBDI.shape))
+        Wet = Rain > 0
+        # Rain past the spell threshold: all of today's rain once the threshold was already
+        # met, otherwise the part of the spell total above it
+        Before = self.SpellRain
+        After = np.where(Wet, Before + Rain, 0.0)
+        NetRain = np.where(Before > RainSpellThreshold, Rain, np.maximum(After - RainSpellThreshold, 0.0))
+        self.SpellRain = After
+        KBDI = np.maximum(self.KBDI - 100.0 * NetRain, 0.0)
+        KBDI = KBDI + DroughtFactor(KBDI, Tmax, self.AnnualPrecip)
+        self.KBDI = np.minimum(KBDI, KBDIMax)
+        if Date is not None:
+            self.LastDate = Date
+        return self.KBDI.copy()
+
+    ## \fn Extend Add several days
+    ## \param Tmax, Rain Arrays shaped (days,) for one station or (days, stations)
+    ## \param Dates Optional dates of the days
+    ## \return KBDI array shaped (days, stations)
+    def Extend(self, Tmax, Rain, Dates=None):
+        Tmax = np.asarray(Tmax, dtype=np.float64)
+        Rain = np.asarray(Rain, dtype=np.float64)
+        Out = np.empty((len(Tmax), len(self)))
+        for i in range(len(Tmax)):
+            Out[i] = self.Update(Tmax[i], Rain[i], None if Dates is None else Dates[i])
+        return Out
+
+    ## \fn State JSON-serializable state
+    def State(self):
+        return {"AnnualPrecip": self.AnnualPrecip.tolist(), "KBDI": self.KBDI.tolist(),
+                "SpellRain": self.SpellRain.tolist(), "LastDate": self.LastDate}
+
+    ## \fn FromState Rebuild from State()
+    @classmethod
+    def FromState(cls, State):
+        KB = cls(State["AnnualPrecip"], State["KBDI"])
+        KB.SpellRain = np.array(State["SpellRain"], dtype=np.float64)
+        KB.LastDate = State["LastDate"]
+        return KB
+
+    ## \fn Dumps State as a JSON string
+    def Dumps(self):
+        return json.dumps(self.State())
+
+    ## \fn Loads Rebuild from Dumps()
+    @classmethod
+    def Loads(cls, s):
+        return cls.FromState(json.loads(s))
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Selectable compute backends for the batch NFDRS V4 indexes.
+
+"numpy" is the vectorized NFDRSV4Batch path.  "numba" compiles a per-element
+loop over the fuel bed, moisture, spread and ignition terms with Numba's JIT
+when Numba is installed; it is optional and nothing else depends on it.
+"python" runs the same loop uncompiled, which is slow but lets the kernel be
+checked against the NumPy path where Numba is not available.
+
+    SetBackend("auto")          # numba when installed, numpy otherwise
+    ERC, SC, BI, IC = CalcIndexes("Y", MC, WS, 1, KBDI, FuelTemperature)
+    python NFDRSV4Kernel.py --parity -n 100000
+
+"""
+
+import argparse
+import math
+import sys
+import types
+
+import numpy as np
+
+from NFDRSV4Batch import FuelParams, MoistureFields, PNORM1, PNORM2, _Field, iCalcIndexesBatch
+from NFDRSV4Calc import CTA, ETASD, ETASL, KBDIThreshold, RHOD, RHOL, STD, STL, FuelModelCodes, FuelModelFields
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+## \var BackendNames Backends known to CalcIndexes ("auto" picks numba when installed)
+BackendNames = ("auto", "numpy", "numba", "python")
+
+_Backend = "auto"
+_Compiled = None
+_prange = range   # numba.prange in the compiled kernel
+
+(_SG1, _SG10, _SG100, _SG1000, _SGWOOD, _SGHERB, _L1, _L10, _L100, _L1000, _LWOOD, _LHERB,
+ _DEPTH, _MXD, _HD, _SCM, _WNDFC, _DROUGHT) = range(len(FuelModelFields))
+
+
+## \fn _Eta1 Rothermel moisture damping polynomial clamped to [0,1]
+def _Eta1(r, a, b, c):
+    Eta = 1.0 - a * r + b * r ** 2.0 - c * r ** 3.0
+    return min(max(Eta, 0.0), 1.0)
+
+
+## \fn _ExpSG exp(-k / SG), 0 for an empty size class (SG = 0)
+def _ExpSG(k, SG):
+    return math.exp(-k / SG) if SG > 0 else 0.0
+
+
+## \fn _Cell ERC, SC, BI and IC of one element (same branches as NFDRSV4Batch)
+def _Cell(P, MC1, MC10, MC100, MC1000, MCHERB, MCWOOD, iWS, iSlopeCls, KBDI, FuelTemperature):
+    SG1 = P[_SG1]
+    SG10 = P[_SG10]
+    SG100 = P[_SG100]
+    SG1000 = P[_SG1000]
+    SGWOOD = P[_SGWOOD]
+    SGHERB = P[_SGHERB]
+    MXD = P[_MXD]
+    HD = P[_HD]
+
+    # Drought load transfer
+    W1 = P[_L1] * CTA
+    W10 = P[_L10] * CTA
+    W100 = P[_L100] * CTA
+    W1000 = P[_L1000] * CTA
+    WWOOD = P[_LWOOD] * CTA
+    WHERB = P[_LHERB] * CTA
+    fDEPTH = P[_DEPTH]
+    if KBDI > KBDIThreshold:
+        PackingRatio = (W1 + W10 + W100 + (WHERB + WWOOD)) / fDEPTH
+        if PackingRatio == 0:
+            PackingRatio = 1.0
+        WTOTD = W1 + W10 + W100 + W1000
+        DroughtUnit = P[_DROUGHT] * CTA / (800.0 - KBDIThreshold)
+        W1 = W1 + (W1 / WTOTD) * (KBDI - 100) * DroughtUnit
+        W10 = W10 + (W10 / WTOTD) * (KBDI - 100) * DroughtUnit
+        W100 = W100 + (W100 / WTOTD) * (KBDI - 100) * DroughtUnit
+        W1000 = W1000 + (W1000 / WTOTD) * (KBDI - 100) * DroughtUnit
+        fDEPTH = ((W1 + W10 + W100 + W1000 + (WHERB + WWOOD)) - W1000) / PackingRatio
+
+    # Fuel bed
+    fctCur = min(max(1.33 - .0111 * MCHERB, 0.0), 1.0)
+    W1P = W1 + WHERB * fctCur
+    WHERBP = WHERB * (1 - fctCur)
+    WTOTD = W1P + W10 + W100 + W1000
+    WTOTL = WHERBP + WWOOD
+    WTOT = WTOTD + WTOTL
+    W1N = W1P * (1.0 - STD)
+    W10N = W10 * (1.0 - STD)
+    W100N = W100 * (1.0 - STD)
+    WHERBN = WHERBP * (1.0 - STL)
+    WWOODN = WWOOD * (1.0 - STL)
+    WTOTLN = WTOTL * (1.0 - STL)
+
+    SA1 = (W1P / RHOD) * SG1
+    SA10 = (W10 / RHOD) * SG10
+    SA100 = (W100 / RHOD) * SG100
+    SAHERB = (WHERBP / RHOL) * SGHERB
+    SAWOOD = (WWOOD / RHOL) * SGWOOD
+    SADEAD = SA1 + SA10 + SA100
+    SALIVE = SAHERB + SAWOOD
+    if SADEAD <= 0:
+        return 0.0, 0.0, 0.0, 0.0
+
+    RHOBED = (WTOT - W1000) / fDEPTH
+    RHOBAR = ((WTOTL * RHOL) + (WTOTD * RHOD)) / WTOT
+    BETBAR = RHOBED / RHOBAR
+    EX1 = _ExpSG(138.0, SG1)
+    EX10 = _ExpSG(138.0, SG10)
+    EX100 = _ExpSG(138.0, SG100)
+
+    F1 = SA1 / SADEAD
+    F10 = SA10 / SADEAD
+    F100 = SA100 / SADEAD
+    if WTOTL <= 0:
+        FHERB = 0.0
+        FWOOD = 0.0
+        FHERBE = 0.0
+        FWOODE = 0.0
+    else:
+        FHERB = SAHERB / SALIVE
+        FWOOD = SAWOOD / SALIVE
+        FHERBE = WHERBP / WTOTL
+        FWOODE = WWOOD / WTOTL
+    FDEAD = SADEAD / (SADEAD + SALIVE)
+    FLIVE = SALIVE / (SADEAD + SALIVE)
+    WDEADN = (F1 * W1N) + (F10 * W10N) + (F100 * W100N)
+    if SGWOOD > 1200 and SGHERB > 1200:
+        WLIVEN = WTOTLN
+    else:
+        WLIVEN = (FWOOD * WWOODN) + (FHERB * WHERBN)
+
+    SGBRD = (F1 * SG1) + (F10 * SG10) + (F100 * SG100)
+    SGBRL = (FHERB * SGHERB) + (FWOOD * SGWOOD)
+    SGBRT = (FDEAD * SGBRD) + (FLIVE * SGBRL)
+    BETOP = 3.348 * SGBRT ** -0.8189
+    GMAMX = SGBRT ** 1.5 / (495.0 + 0.0594 * SGBRT ** 1.5)
+    AD = 133 * SGBRT ** -0.7913
+    GMAOP = GMAMX * (BETBAR / BETOP) ** AD * math.exp(AD * (1.0 - (BETBAR / BETOP)))
+    ZETA = math.exp((0.792 + 0.681 * SGBRT ** 0.5) * (BETBAR + 0.1))
+    ZETA = ZETA / (192.0 + 0.2595 * SGBRT)
+    B = 0.02526 * SGBRT ** 0.54
+    C = 7.47 * math.exp(-0.133 * SGBRT ** 0.55)
+    E = 0.715 * math.exp(-3.59 * 10.0 ** -4.0 * SGBRT)
+    UFACT = C * (BETBAR / BETOP) ** (-1 * E)
+
+    # Live fuel moisture of extinction
+    MXL = 0.0
+    if WTOTLN > 0:
+        HN1 = W1N * EX1
+        HN10 = W10N * EX10
+        HN100 = W100N * EX100
+        HNHERB = 0.0 if SGHERB <= 0 or (-500 / SGHERB) < -180.218 else WHERBN * _ExpSG(500.0, SGHERB)
+        HNWOOD = 0.0 if SGWOOD <= 0 or (-500 / SGWOOD) < -180.218 else WWOODN * _ExpSG(500.0, SGWOOD)
+        WRAT = 0.0 if HNHERB + HNWOOD == 0 else (HN1 + HN10 + HN100) / (HNHERB + HNWOOD)
+        MCLFE = ((MC1 * HN1) + (MC10 * HN10) + (MC100 * HN100)) / (HN1 + HN10 + HN100)
+        MXL = (2.9 * WRAT * (1.0 - MCLFE / MXD) - 0.226) * 100
+    if MXL < MXD:
+        MXL = MXD
+
+    # Reaction intensity, heat sink and spread component
+    WTMCD = (F1 * MC1) + (F10 * MC10) + (F100 * MC100)
+    WTMCL = (FHERB * MCHERB) + (FWOOD * MCWOOD)
+    ETAMD = _Eta1(WTMCD / MXD, 2.59, 5.11, 3.52)
+    ETAML = _Eta1(WTMCL / MXL, 2.59, 5.11, 3.52)
+    IR = GMAOP * ((WDEADN * HD * ETASD * ETAMD) + (WLIVEN * HD * ETASL * ETAML))
+    if 88.0 * iWS * P[_WNDFC] > 0.9 * IR:
+        PHIWND = UFACT * (0.9 * IR) ** B
+    else:
+        PHIWND = UFACT * (iWS * 88.0 * P[_WNDFC]) ** B
+    slpfct = 0.267
+    if iSlopeCls == 2:
+        slpfct = 0.533
+    elif iSlopeCls == 3:
+        slpfct = 1.068
+    elif iSlopeCls == 4:
+        slpfct = 2.134
+    elif iSlopeCls == 5:
+        slpfct = 4.273
+    PHISLP = slpfct * BETBAR ** -0.3
+    XF1 = F1 * EX1 * (250.0 + 11.16 * MC1)
+    XF10 = F10 * EX10 * (250.0 + 11.16 * MC10)
+    XF100 = F100 * EX100 * (250.0 + 11.16 * MC100)
+    XFHERB = FHERB * _ExpSG(138.0, SGHERB) * (250.0 + 11.16 * MCHERB)
+    XFWOOD = FWOOD * _ExpSG(138.0, SGWOOD) * (250.0 + 11.16 * MCWOOD)
+    HTSINK = RHOBED * (FDEAD * (XF1 + XF10 + XF100) + FLIVE * (XFHERB + XFWOOD))
+    SC = IR * ZETA * (1.0 + PHISLP + PHIWND) / HTSINK
+
+    # Energy release component
+    F1E = W1P / WTOTD
+    F10E = W10 / WTOTD
+    F100E = W100 / WTOTD
+    F1000E = W1000 / WTOTD
+    FDEADE = WTOTD / WTOT
+    FLIVEE = WTOTL / WTOT
+    WDEDNE = WTOTD * (1.0 - STD)
+    WLIVNE = WTOTL * (1.0 - STL)
+    SGBRDE = (F1E * SG1) + (F10E * SG10) + (F100E * SG100) + (F1000E * SG1000)
+    SGBRLE = (FHERBE * SGHERB) + (FWOODE * SGWOOD)
+    SGBRTE = (FDEADE * SGBRDE) + (FLIVEE * SGBRLE)
+    BETOPE = 3.348 * SGBRTE ** -0.8189
+    GMAMXE = SGBRTE ** 1.5 / (495.0 + 0.0594 * SGBRTE ** 1.5)
+    ADE = 133 * SGBRTE ** -0.7913
+    GMAOPE = GMAMXE * (BETBAR / BETOPE) ** ADE * math.exp(ADE * (1.0 - (BETBAR / BETOPE)))
+    WTMCDE = (F1E * MC1) + (F10E * MC10) + (F100E * MC100) + (F1000E * MC1000)
+    WTMCLE = (FHERBE * MCHERB) + (FWOODE * MCWOOD)
+    ETAMDE = _Eta1(WTMCDE / MXD, 2.0, 1.5, 0.5)
+    ETAMLE = _Eta1(WTMCLE / MXL, 2.0, 1.5, 0.5)
+    IRE = (FDEADE * WDEDNE * HD * ETASD * ETAMDE)
+    IRE = GMAOPE * (IRE + (FLIVEE * WLIVNE * (HD) * ETASL * ETAMLE))
+    ERC = 0.04 * IRE * (384.0 / SGBRT)
+    BI = (.301 * (SC * ERC) ** 0.46) * 10.0
+
+    # Ignition component
+    QIGN = (144.5 - (0.266 * FuelTemperature) - (0.00058 * FuelTemperature * FuelTemperature) -
+            (0.01 * FuelTemperature * MC1) + 18.54 * (1.0 - math.exp(-0.151 * MC1)) + 6.4 * MC1)
+    CHI = max((344.0 - QIGN) / 10.0, 0.0)
+    PI = min(max(((CHI ** 3.66 * 0.000923 / 50) - PNORM1) * 100.0 / PNORM2, 0.0), 100.0)
+    if P[_SCM] <= 0:
+        SCN = 100.0
+    else:
+        SCN = min(100.0 * SC / P[_SCM], 100.0)
+    IC = 0.0 if SC < 0.00001 else 0.10 * PI * SCN ** 0.5
+    return ERC, SC, BI, IC
+
+
+## \fn _Loop Evaluate _Cell over flat, equal-length inputs into Out (shape (4, n))
+def _Loop(Par, MC1, MC10, MC100, MC1000, MCHERB, MCWOOD, iWS, iSlopeCls, KBDI, FuelTemperature, Out):
+    for i in _prange(MC1.shape[0]):
+        ERC, SC, BI, IC = _Cell(Par[i], MC1[i], MC10[i], MC100[i], MC1000[i], MCHERB[i], MCWOOD[i],
+                                iWS[i], iSlopeCls[i], KBDI[i], FuelTemperature[i])
+        Out[0, i] = ERC
+        Out[1, i] = SC
+        Out[2, i] = BI
+        Out[3, i] = IC
+
+
+## \fn _CompiledLoop The Numba-compiled _Loop (compiled on first use)
+##
+## The kernel functions are rebuilt over their own globals, so the uncompiled "python"
+## backend keeps calling plain Python.
+def _CompiledLoop():
+    global _Compiled
+    if _Compiled is None:
+        if numba is None:
+            raise RuntimeError("The numba backend needs Numba to be installed")
+        Options = dict(cache=True, error_model="numpy")
+        Globals = dict(globals(), _prange=numba.prange)
+        for f in (_ExpSG, _Eta1, _Cell):
+            Globals[f.__name__] = numba.njit(**Options)(types.FunctionType(f.__code__, Globals, f.__name__))
+        _Compiled = numba.njit(parallel=True, **Options)(types.FunctionType(_Loop.__code__, Globals, "_Loop"))
+    return _Compiled
+
+
+## \fn AvailableBackends Backends that can run here
+def AvailableBackends():
+    return ["numpy", "python"] + (["numba"] if numba is not None else [])
+
+
+## \fn ResolveBackend Concrete backend for a name ("auto" and None use the current selection)
+def ResolveBackend(Name=None):
+    Name = _Backend if Name is None else Name
+    if Name not in BackendNames:
+        raise ValueError("Unknown backend %r; choose from %s" % (Name, BackendNames))
+    if Name == "auto":
+        return "numba" if numba is not None else "numpy"
+    if Name == "numba" and numba is None:
+        raise RuntimeError("The numba backend needs Numba to be installed")
+    return Name
+
+
+## \fn SetBackend Select the backend used by CalcIndexes
+## \param Name "auto", "numpy", "numba" or "python"
+## \return the previous selection
+def SetBackend(Name):
+    global _Backend
+    ResolveBackend(Name)
+    Previous, _Backend = _Backend, Name
+    return Previous
+
+
+## \fn GetBackend The backend CalcIndexes currently uses
+def GetBackend():
+    return ResolveBackend()
+
+
+## \fn _ParamMatrix Fuel parameters as an (n, len(FuelModelFields)) matrix
+def _ParamMatrix(P, n):
+    return np.ascontiguousarray(np.stack([np.broadcast_to(np.asarray(P[Name], dtype=np.float64), (n,))
+                                          for Name in FuelModelFields], axis=1))
+
+
+## \fn CalcIndexes Compute ERC, SC, BI and IC with the selected backend
+## \param FM, MC, iWS, iSlopeCls, KBDI, FuelTemperature, Round As NFDRSV4Batch.iCalcIndexesBatch
+## \param Backend Backend for this call (default: the SetBackend selection)
+## \return tuple (ERC, SC, BI, IC) of float64 arrays broadcast over all inputs
+def CalcIndexes(FM, MC, iWS, iSlopeCls, KBDI, FuelTemperature, Round=2, Backend=None):
+    Backend = ResolveBackend(Backend)
+    if Backend == "numpy":
+        return iCalcIndexesBatch(FM, MC, iWS, iSlopeCls, KBDI, FuelTemperature, Round=Round)
+    P = FuelParams(FM)
+    Inputs = np.broadcast_arrays(*[np.asarray(_Field(MC, Name), dtype=np.float64) for Name in MoistureFields],
+                                 np.asarray(iWS, dtype=np.float64), np.asarray(iSlopeCls, dtype=np.float64),
+                                 np.asarray(KBDI, dtype=np.float64), np.asarray(FuelTemperature, dtype=np.float64),
+                                 *[np.asarray(P[Name]) for Name in FuelModelFields])
+    Shape = Inputs[0].shape
+    n = int(np.prod(Shape))
+    Flat = [np.ascontiguousarray(x.reshape(n), dtype=np.float64) for x in Inputs[:10]]
+    Par = _ParamMatrix({Name: x.reshape(n) for Name, x in zip(FuelModelFields, Inputs[10:])}, n)
+    Out = np.empty((4, n))
+    (_CompiledLoop() if Backend == "numba" else _Loop)(Par, *Flat, Out)
+    if Round is not None:
+        Out = np.round(Out, Round)
+    return tuple(x.reshape(Shape) for x in Out)
+
+
+## \fn RandomInputs Random but plausible inputs for parity checks
+## \param N Number of elements
+## \param Seed Random seed
+## \return dict with FM (array of codes), MC (mapping), iWS, iSlopeCls, KBDI and FuelTemperature
+def RandomInputs(N, Seed=0):
+    Rng = np.random.default_rng(Seed)
+    MC = {"MC1": Rng.uniform(1, 35, N), "MC10": Rng.uniform(2, 40, N), "MC100": Rng.uniform(3, 45, N),
+          "MC1000": Rng.uniform(5, 50, N), "MCHERB": Rng.uniform(30, 250, N), "MCWOOD": Rng.uniform(50, 200, N)}
+    return {"FM": np.array(FuelModelCodes)[Rng.integers(0, len(FuelModelCodes), N)], "MC": MC,
+            "iWS": Rng.uniform(0, 40, N).round(), "iSlopeCls": Rng.integers(1, 6, N),
+            "KBDI": Rng.uniform(0, 800, N).round(), "FuelTemperature": Rng.uniform(20, 130, N)}
+
+
+## \fn CompareBackends Parity check: run two backends on the same random inputs
+## \param A, B Backend names (B defaults to numba when installed, else python)
+## \param N Number of random elements
+## \param Seed Random seed
+## \return dict index name -> largest absolute deviation (unrounded) where both are numbers,
+## "NaNMismatches": index name -> number of elements NaN in one backend only, plus Backends and N
+def CompareBackends(A="numpy", B=None, N=10000, Seed=0):
+    if B is None:
+        B = "numba" if numba is not None else "python"
+    Inputs = RandomInputs(N, Seed)
+    OutA = CalcIndexes(Round=None, Backend=A, **Inputs)
+    OutB = CalcIndexes(Round=None, Backend=B, **Inputs)
+    Report = {"Backends": (A, B), "N": N, "NaNMismatches": {}}
+    for Name, a, b in zip(("ERC", "SC", "BI", "IC"), OutA, OutB):
+        NaNA = np.isnan(a)
+        NaNB = np.isnan(b)
+        Both = ~(NaNA | NaNB)
+        Report[Name] = float(np.abs(a[Both] - b[Both]).max()) if Both.any() else 0.0
+        Report["NaNMismatches"][Name] = int(np.count_nonzero(NaNA != NaNB))
+    return Report
+
+
+## \fn main Command line parity check
+def main(argv=None):
+    Parser = argparse.ArgumentParser(description="Compare NFDRS V4 compute backends.")
+    Parser.add_argument("--parity", action="store_true", help="run the parity check (default)")
+    Parser.add_argument("-n", type=int, default=10000, help="number of random elements")
+    Parser.add_argument("--seed", type=int, default=0)
+    Parser.add_argument("-a", default="numpy", choices=BackendNames[1:], help="reference backend")
+    Parser.add_argument("-b", choices=BackendNames[1:], help="backend to check (default numba, or python)")
+    Parser.add_argument("--tolerance", type=float, default=1e-9, help="largest acceptable deviation")
+    Args = Parser.parse_args(argv)
+    Report = CompareBackends(Args.a, Args.b, Args.n, Args.seed)
+    print("%s vs %s over %d elements" % (Report["Backends"] + (Report["N"],)))
+    Worst = 0.0
+    Mismatches = 0
+    for Name in ("ERC", "SC", "BI", "IC"):
+        print("  %-3s max |deviation| = %.3g, NaN in one backend only: %d"
+              % (Name, Report[Name], Report["NaNMismatches"][Name]))
+        Worst = max(Worst, Report[Name])
+        Mismatches += Report["NaNMismatches"][Name]
+    return 0 if Worst <= Args.tolerance and Mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Live fuel moisture (LFM) observation store.
+
+Reads National Fuel Moisture Database (NFMD) tab-separated site files into
+arrays sorted by site, fuel and int64 day key, so one site and fuel is a
+contiguous slice.  JoinMap matches observations to a daily weather index
+once, exactly or as-of within a tolerance; model evaluations then gather
+with the stored indices instead of merging DataFrames.
+
+"""
+
+import csv
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from NFDRSV4IO import IsoDate
+
+## \var NFMDHour Hour attached to NFMD sample dates (ReadNFMDData appends " 13")
+NFMDHour = 13
+
+## \var JoinDirections As-of match directions accepted by JoinMap
+JoinDirections = ("backward", "forward", "nearest")
+
+
+## \fn DayKey Days since 1970-01-01 (int64) of dates (strings, datetime64, datetimes or DataFrame columns)
+def DayKey(Dates):
+    Dates = np.asarray(Dates)
+    if Dates.dtype.kind in "USO":
+        Dates = np.array([IsoDate(str(d))[:10] for d in Dates.ravel()], dtype="datetime64[D]").reshape(Dates.shape)
+    return Dates.astype("datetime64[D]").astype(np.int64)
+
+
+## \fn JoinMap Index of the matching weather day for each observation
+## \param WeatherDays Sorted, unique day keys of the daily weather (see DayKey)
+## \param ObsDays Day keys of the observations
+## \param Tolerance Largest allowed distance in days (0 = exact match)
+## \param Direction "backward" (latest weather day on or before the observation), "forward"
+## (earliest on or after) or "nearest" (closest, earlier on ties), as pandas merge_asof
+## \return int64 array shaped like ObsDays, -1 where no weather day is within Tolerance
+def JoinMap(WeatherDays, ObsDays, Tolerance=0, Direction="backward"):
+    if Direction not in JoinDirections:
+        raise ValueError("Direction must be one of %s" % (JoinDirections,))
+    WeatherDays = np.asarray(WeatherDays, dtype=np.int64)
+    ObsDays = np.asarray(ObsDays, dtype=np.int64)
+    n = len(WeatherDays)
+    Out = np.full(ObsDays.shape, -1, dtype=np.int64)
+    if n == 0:
+        return Out
+    # Candidate on or before (i - 1) and on or after (j) each observation
+    i = np.searchsorted(WeatherDays, ObsDays, side="right") - 1
+    j = np.searchsorted(WeatherDays, ObsDays, side="left")
+    Back = np.where(i >= 0, ObsDays - WeatherDays[np.clip(i, 0, n - 1)], np.iinfo(np.int64).max)
+    Fwd = np.where(j < n, WeatherDays[np.clip(j, 0, n - 1)] - ObsDays, np.iinfo(np.int64).max)
+    if Direction == "backward":
+        Idx, Dist = i, Back
+    elif Direction == "forward":
+        Idx, Dist = j, Fwd
+    else:
+        UseFwd = Fwd < Back
+        Idx, Dist = np.where(UseFwd, j, i), np.where(UseFwd, Fwd, Back)
+    Ok = Dist <= Tolerance
+    Out[Ok] = Idx[Ok]
+    return Out
+
+
+## \class LFMJoin
+## \brief Observations matched to a daily weather index
+## \param ObsIndex Positions of the matched observations in the selection
+## \param WeatherIndex Weather row of each matched observation
+## \param Percent Observed LFM (%) of each matched observation
+LFMJoin = namedtuple("LFMJoin", ("ObsIndex", "WeatherIndex", "Percent"))
+
+
+## \fn ReadNFMD Read an NFMD site file (GACC, State, Group, Site, Date, Fuel, Percent; tab separated)
+## \param Source File name or open text file
+## \return dict of arrays: Site, Fuel, Day (int64 day keys) and Percent (NaN where blank)
+def ReadNFMD(Source):
+    Own = isinstance(Source, (str, os.PathLike))
+    File = open(Source, newline="") if Own else Source
+    try:
+        Reader = csv.reader(File, delimiter="\t")
+        Header = [h.strip() for h in next(Reader)]
+        iSite, iDate, iFuel, iPercent = (Header.index(h) for h in ("Site", "Date", "Fuel", "Percent"))
+        Site, Fuel, Dates, Percent = [], [], [], []
+        for Row in Reader:
+            if len(Row) <= iPercent or not Row[iDate].strip():
+                continue
+            Site.append(Row[iSite].strip())
+            Fuel.append(Row[iFuel].strip())
+            Dates.append(IsoDate(Row[iDate])[:10])
+            try:
+                Percent.append(float(Row[iPercent]))
+            except ValueError:
+                Percent.append(np.nan)
+    finally:
+        if Own:
+            File.close()
+    return {"Site": np.array(Site, dtype=str), "Fuel": np.array(Fuel, dtype=str),
+            "Day": np.array(Dates, dtype="datetime64[D]").astype(np.int64), "Percent": np.array(Percent)}
+
+
+## \class LFMObservations
+## \brief LFM observations sorted by site, fuel and day
+class LFMObservations:
+
+    ## \fn __init__
+    ## \param Site, Fuel Site and fuel name of each observation
+    ## \param Day Day keys (see DayKey)
+    ## \param Percent Observed LFM (%)
+    def __init__(self, Site, Fuel, Day, Percent):
+        Site = np.asarray(Site, dtype=str)
+        Fuel = np.asarray(Fuel, dtype=str)
+        Day = np.asarray(Day, dtype=np.int64)
+        Order = np.lexsort((Day, Fuel, Site))
+        self.Site = Site[Order]
+        self.Fuel = Fuel[Order]
+        self.Day = Day[Order]
+        self.Percent = np.asarray(Percent, dtype=np.float64)[Order]
+        for a in (self.Site, self.Fuel, self.Day, self.Percent):
+            a.flags.writeable = False
+        self._Slices = {}
+        if len(self.Day):
+            Start = np.flatnonzero(np.concatenate(([True], (self.Site[1:] != self.Site[:-1]) |
+                                                   (self.Fuel[1:] != self.Fuel[:-1]))))
+            for a, b in zip(Start, np.append(Start[1:], len(self.Day))):
+                self._Slices[(str(self.Site[a]), str(self.Fuel[a]))] = slice(int(a), int(b))
+
+    ## \fn FromNFMD Read one or more NFMD site files
+    @classmethod
+    def FromNFMD(cls, *Sources):
+        Parts = [ReadNFMD(s) for s in Sources]
+        return cls(*(np.concatenate([p[k] for p in Parts]) for k in ("Site", "Fuel", "Day", "Percent")))
+
+    ## \fn FromFrame Build from a DataFrame such as ReadNFMDData returns
+    ## \param Date Date column (DateTime or Date)
+    @classmethod
+    def FromFrame(cls, df, Site="Site", Fuel="Fuel", Date=None, Percent="Percent"):
+        if Date is None:
+            Date = "DateTime" if "DateTime" in df else "Date"
+        Dates = df[Date].to_numpy()
+        return cls(df[Site].astype(str).to_numpy(), df[Fuel].astype(str).to_numpy(), DayKey(Dates),
+                   df[Percent].to_numpy(dtype=np.float64))
+
+    def __len__(self):
+        return len(self.Day)
+
+    ## \fn Keys (Site, Fuel) pairs in the store
+    def Keys(self):
+        return sorted(self._Slices)
+
+    ## \fn Sites Site names
+    def Sites(self):
+        return sorted({s for s, _ in self._Slices})
+
+    ## \fn Fuels Fuel names (of one site, or of all sites)
+    def Fuels(self, Site=None):
+        return sorted({f for s, f in self._Slices if Site is None or s == Site})
+
+    ## \fn _Rows Row selection for a site and / or fuel (a slice when it is one contiguous run)
+    def _Rows(self, Site=None, Fuel=None):
+        if Site is not None and Fuel is not None:
+            return self._Slices.get((Site, Fuel), slice(0, 0))
+        Keep = np.ones(len(self.Day), dtype=bool)
+        if Site is not None:
+            Keep &= self.Site == Site
+        if Fuel is not None:
+            Keep &= self.Fuel == Fuel
+        Rows = np.flatnonzero(Keep)
+        return Rows[np.argsort(self.Day[Rows], kind="stable")]
+
+    ## \fn Select Day keys and LFM of a site and / or fuel, in day order
+    ## \return (Day, Percent); read-only views for a single site and fuel
+    def Select(self, Site=None, Fuel=None):
+        Rows = self._Rows(Site, Fuel)
+        return self.Day[Rows], self.Percent[Rows]
+
+    ## \fn Dates Observation dates as datetime64[s] at NFMDHour, like ReadNFMDData's DateTime
+    def Dates(self, Site=None, Fuel=None):
+        return (self.Select(Site, Fuel)[0].astype("datetime64[D]").astype("datetime64[s]") +
+                np.timedelta64(NFMDHour, "h"))
+
+    ## \fn Join Match a site / fuel's observations to a daily weather index
+    ## \param WeatherDays Sorted unique weather day keys (or dates)
+    ## \param Tolerance, Direction See JoinMap
+    ## \return LFMJoin of the matched, non-missing observations
+    def Join(self, WeatherDays, Site=None, Fuel=None, Tolerance=0, Direction="backward"):
+        WeatherDays = np.asarray(WeatherDays)
+        if WeatherDays.dtype.kind != "i":
+            WeatherDays = DayKey(WeatherDays)
+        Day, Percent = self.Select(Site, Fuel)
+        Idx = JoinMap(WeatherDays, Day, Tolerance, Direction)
+        Ok = np.flatnonzero((Idx >= 0) & ~np.isnan(Percent))
+        return LFMJoin(Ok, Idx[Ok], Percent[Ok])
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-station NFDRS V4 runner.
+
+Splits a station manifest times a list of fuel models into chunks and computes
+them across a ProcessPoolExecutor with NFDRSV4Batch.  Results are streamed back
+in manifest order (station, then fuel model) whatever the worker count.
+
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import threading
+
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch
+from NFDRSV4Calc import FuelModelFields, USNFDRSFuelModel
+
+## \class Station
+## \brief One manifest entry
+## \param StationID Station identifier (e.g. RAWS number)
+## \param Data Mapping / DataFrame with MC1..MCWOOD, WS, KBDI and FuelTemperature columns,
+## or the path of a CSV file with those columns (read in the worker)
+## \param SlopeCls Station slope class; None uses a SlopeCls column or the runner default
+Station = namedtuple("Station", ("StationID", "Data", "SlopeCls"), defaults=(None,))
+
+## \class StationResult
+## \brief Indexes for one station and fuel model, one value per day
+## \param FuelModel The fuel model as given to Run (FMCode or model object)
+StationResult = namedtuple("StationResult", ("StationID", "FMCode", "ERC", "SC", "BI", "IC", "FuelModel"),
+                           defaults=(None,))
+
+
+## \fn _AsFuelModel USNFDRSFuelModel for an FMCode, a USNFDRSFuelModel or any object with the
+## FMCode and FuelModelFields attributes
+##
+## The model itself (not its code) is sent to the workers: a standard model pickles as its
+## code and a custom one with its parameters, so a custom model keeps its own values.
+def _AsFuelModel(FM):
+    if isinstance(FM, str):
+        return USNFDRSFuelModel(FM)
+    if isinstance(FM, USNFDRSFuelModel):
+        return FM
+    return USNFDRSFuelModel.Custom(FM.FMCode, **{Name: getattr(FM, Name) for Name in FuelModelFields})
+
+
+## \fn _LoadStation Read a station's data if it was given as a file name
+def _LoadStation(Data):
+    if isinstance(Data, str):
+        import pandas as pd
+        Data = pd.read_csv(Data)
+        Data.rename(columns=lambda x: x.strip(), inplace=True)
+    return Data
+
+
+## \fn _HasField True if a mapping / DataFrame has the named column
+def _HasField(Data, Name):
+    try:
+        return Name in Data
+    except TypeError:
+        return hasattr(Data, Name)
+
+
+## \fn _RunChunk Compute one chunk of (station, fuel model) work units (runs in a worker)
+## \param Units list of (Station, USNFDRSFuelModel)
+## \param SlopeCls Default slope class
+## \param Round Decimal places for the indexes (None for full precision)
+## \return list of StationResult in the order of Units
+def _RunChunk(Units, SlopeCls, Round):
+    Results = []
+    LastData = LoadedData = None
+    for Stn, FM in Units:
+        if Stn.Data is not LastData:
+            LastData = Stn.Data
+            LoadedData = _LoadStation(Stn.Data)
+        Slope = Stn.SlopeCls
+        if Slope is None:
+            Slope = LoadedData["SlopeCls"] if _HasField(LoadedData, "SlopeCls") else SlopeCls
+        MC = {Name: LoadedData[Name] for Name in MoistureFields}
+        ERC, SC, BI, IC = iCalcIndexesBatch(FM, MC, LoadedData["WS"], Slope,
+                                            LoadedData["KBDI"], LoadedData["FuelTemperature"], Round=Round)
+        Results.append(StationResult(Stn.StationID, FM.FMCode, ERC, SC, BI, IC))
+    return Results
+
+
+## \class NFDRSRunner
+## \brief Chunked, process-parallel NFDRS index runner
+class NFDRSRunner:
+
+    ## \fn __init__
+    ## \param Workers Number of worker processes (None = os.cpu_count(), 0 = run in this process)
+    ## \param ChunkSize Number of (station, fuel model) work units per task
+    ## \param Progress Optional callback Progress(UnitsDone, UnitsTotal), called as results are yielded
+    ## \param SlopeCls Default slope class for stations that do not give one
+    ## \param Round Decimal places for the indexes (None for full precision)
+    def __init__(self, Workers=None, ChunkSize=16, Progress=None, SlopeCls=1, Round=2):
+        if ChunkSize < 1:
+            raise ValueError("ChunkSize must be at least 1")
+        self.Workers = Workers
+        self.ChunkSize = ChunkSize
+        self.Progress = Progress
+        self.SlopeCls = SlopeCls
+        self.Round = Round
+        self._Cancel = threading.Event()
+
+    ## \fn Cancel Stop a running Run() after the chunk in progress; pending chunks are dropped
+    def Cancel(self):
+        self._Cancel.set()
+
+    ## \fn Cancelled True once Cancel() has been called
+    def Cancelled(self):
+        return self._Cancel.is_set()
+
+    ## \fn _Chunks Split the manifest x fuel models into chunks of work units
+    def _Chunks(self, Manifest, Models):
+        Chunk = []
+        for Item in Manifest:
+            Stn = Item if isinstance(Item, Station) else Station(*Item)
+            for FM in Models:
+                Chunk.append((Stn, FM))
+                if len(Chunk) == self.ChunkSize:
+                    yield Chunk
+                    Chunk = []
+        if Chunk:
+            yield Chunk
+
+    ## \fn Run Compute the indexes for every station and fuel model
+    ## \param Manifest Iterable of Station (or (StationID, Data[, SlopeCls]) tuples), or a dict StationID -> Data
+    ## \param FuelModels List of FMCodes, USNFDRSFuelModel (standard or custom) or objects with
+    ## the FMCode and FuelModelFields attributes
+    ## \return generator of StationResult in manifest order, then fuel model order; each
+    ## result's FuelModel is the entry of FuelModels it was computed for
+    ##
+    ## Run is not itself a generator: the run starts (and an earlier Cancel() is cleared) when
+    ## it is called, so a Cancel() issued before the results are iterated stops it.
+    def Run(self, Manifest, FuelModels):
+        self._Cancel.clear()
+        FuelModels = list(FuelModels)
+        return self._Label(self._Run(Manifest, [_AsFuelModel(FM) for FM in FuelModels]), FuelModels)
+
+    @staticmethod
+    def _Label(Results, FuelModels):
+        for i, Result in enumerate(Results):
+            yield Result._replace(FuelModel=FuelModels[i % len(FuelModels)])
+
+    def _Run(self, Manifest, Models):
+        if isinstance(Manifest, dict):
+            Manifest = list(Manifest.items())
+        else:
+            Manifest = list(Manifest)
+        Total = len(Manifest) * len(Models)
+        Chunks = self._Chunks(Manifest, Models)
+        Done = 0
+
+        if self.Workers == 0:
+            for Units in Chunks:
+                if self.Cancelled():
+                    return
+                for Result in _RunChunk(Units, self.SlopeCls, self.Round):
+                    yield Result
+                Done += len(Units)
+                if self.Progress is not None:
+                    self.Progress(Done, Total)
+            return
+
+        Workers = self.Workers or os.cpu_count() or 1
+        Executor = ProcessPoolExecutor(max_workers=Workers)
+        MaxPending = 2 * Workers
+        Pending = deque()
+        try:
+            for Units in Chunks:
+                if self.Cancelled():
+                    return
+                Pending.append((len(Units), Executor.submit(_RunChunk, Units, self.SlopeCls, self.Round)))
+                if len(Pending) < MaxPending:
+                    continue
+                n, Future = Pending.popleft()
+                for Result in Future.result():
+                    yield Result
+                Done += n
+                if self.Progress is not None:
+                    self.Progress(Done, Total)
+            while Pending and not self.Cancelled():
+                n, Future = Pending.popleft()
+                for Result in Future.result():
+                    yield Result
+                Done += n
+                if self.Progress is not None:
+                    self.Progress(Done, Total)
+        finally:
+            Executor.shutdown(wait=True, cancel_futures=True)
+
+
+## \fn RunStations Convenience wrapper around NFDRSRunner.Run
+## \return generator of StationResult
+def RunStations(Manifest, FuelModels, Workers=None, ChunkSize=16, Progress=None, SlopeCls=1, Round=2):
+    return NFDRSRunner(Workers, ChunkSize, Progress, SlopeCls, Round).Run(Manifest, FuelModels)
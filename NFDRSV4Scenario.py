@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Scenario sweeps of the NFDRS V4 indexes.
+
+Every input of iCalcIndexes can be given as a sequence of values; each
+sequence becomes an axis of the result cube.  The axes are laid out as an
+open grid, so each stage of NFDRSV4Batch is evaluated only over the axes it
+depends on: the drought and fuel bed terms once per fuel model, KBDI and
+herbaceous moisture, the moisture terms once per moisture combination, and
+wind and slope (which only enter PHIWND and PHISLP) as the innermost axes.
+
+    Cube = ScenarioSweep("Y", {"MC1": range(2, 21), "MC10": 8, "MC100": 12, "MC1000": 15,
+                               "MCHERB": [60, 120], "MCWOOD": 90}, iWS=range(0, 31, 5),
+                         iSlopeCls=[1, 3, 5], KBDI=300, FuelTemperature=80)
+    Cube.Dims          # ('MCHERB', 'MC1', 'iWS', 'iSlopeCls')
+    Cube.Sel(MCHERB=60, iSlopeCls=1)["BI"]
+
+"""
+
+import numpy as np
+
+from NFDRSV4Batch import CalcIndexesFromParams, FuelParams, MoistureFields, _Field
+
+## \var ScenarioAxes Possible axes of a sweep, outermost first
+ScenarioAxes = ("FM", "KBDI", "MCHERB", "MCWOOD", "MC1000", "MC100", "MC10", "MC1", "FuelTemperature",
+                "iWS", "iSlopeCls")
+
+## \var ScenarioOutputs Indexes held by a ScenarioCube
+ScenarioOutputs = ("ERC", "SC", "BI", "IC")
+
+
+## \fn _IsAxis Whether a sweep input is a sequence of values (an axis) rather than a fixed value
+def _IsAxis(x):
+    return not isinstance(x, str) and np.ndim(x) > 0
+
+
+## \class ScenarioCube
+## \brief Labeled N-dimensional result of a scenario sweep
+class ScenarioCube:
+
+    ## \fn __init__
+    ## \param Dims Axis names (a subset of ScenarioAxes, in that order)
+    ## \param Coords Axis name -> 1-D array of the axis values
+    ## \param Fixed Name -> value of the inputs that were not swept
+    ## \param Values Index name -> array shaped by Dims
+    def __init__(self, Dims, Coords, Fixed, Values):
+        self.Dims = tuple(Dims)
+        self.Coords = Coords
+        self.Fixed = Fixed
+        self.Values = Values
+
+    ## \fn shape Length of each axis
+    @property
+    def shape(self):
+        return tuple(len(self.Coords[d]) for d in self.Dims)
+
+    ## \fn __getitem__ Result array of one index
+    def __getitem__(self, Name):
+        return self.Values[Name]
+
+    ## \fn Sel Select one value along some axes
+    ## \param Labels Axis name -> axis value
+    ## \return ScenarioCube without the selected axes (they move to Fixed)
+    def Sel(self, **Labels):
+        Index = []
+        Fixed = dict(self.Fixed)
+        for d in self.Dims:
+            if d in Labels:
+                Hit = np.flatnonzero(self.Coords[d] == Labels[d])
+                if len(Hit) == 0:
+                    raise KeyError("%r is not on the %s axis" % (Labels[d], d))
+                Index.append(int(Hit[0]))
+                Fixed[d] = Labels[d]
+            else:
+                Index.append(slice(None))
+        Unknown = set(Labels) - set(self.Dims)
+        if Unknown:
+            raise KeyError("No axes named %s" % ", ".join(sorted(Unknown)))
+        Dims = [d for d in self.Dims if d not in Labels]
+        return ScenarioCube(Dims, {d: self.Coords[d] for d in Dims}, Fixed,
+                            {Name: v[tuple(Index)] for Name, v in self.Values.items()})
+
+    ## \fn ToFrame Long-format DataFrame, one row per scenario (needs pandas)
+    def ToFrame(self):
+        import pandas as pd
+        Grid = np.meshgrid(*[self.Coords[d] for d in self.Dims], indexing="ij")
+        Columns = {d: g.ravel() for d, g in zip(self.Dims, Grid)}
+        Columns.update((Name, np.ravel(v)) for Name, v in self.Values.items())
+        return pd.DataFrame(Columns)
+
+
+## \fn ScenarioSweep Compute ERC, SC, BI and IC over every combination of the swept inputs
+## \param FM Fuel model code (or USNFDRSFuelModel), or a sequence of codes to sweep
+## \param MC Mapping or object with MC1..MCWOOD; each a value or a sequence to sweep
+## \param iWS 20ft wind speed (mph), value or sequence
+## \param iSlopeCls Slope class (1-5), value or sequence
+## \param KBDI Keetch-Byram Drought Index, value or sequence
+## \param FuelTemperature Fuel surface temperature, value or sequence
+## \param Round Decimal places to round to, None for full precision
+## \return ScenarioCube with one axis per swept input, ordered as ScenarioAxes
+def ScenarioSweep(FM, MC, iWS, iSlopeCls, KBDI, FuelTemperature, Round=2):
+    Inputs = {"FM": FM, "KBDI": KBDI, "iWS": iWS, "iSlopeCls": iSlopeCls, "FuelTemperature": FuelTemperature}
+    Inputs.update((Name, _Field(MC, Name)) for Name in MoistureFields)
+    Dims = [d for d in ScenarioAxes if _IsAxis(Inputs[d])]
+    Coords = {d: np.asarray(list(Inputs[d]) if d == "FM" else Inputs[d]) for d in Dims}
+    for d in Dims:
+        if Coords[d].ndim != 1:
+            raise ValueError("Axis %s must be one-dimensional" % d)
+    Fixed = {d: x for d, x in Inputs.items() if d not in Dims}
+
+    # Each axis is shaped (1, ..., n, ..., 1) so the stages only broadcast over the axes they use
+    Shape = tuple(len(Coords[d]) for d in Dims)
+    Args = {}
+    for Name, x in Inputs.items():
+        if Name in Dims:
+            Open = [1] * len(Dims)
+            Open[Dims.index(Name)] = len(Coords[Name])
+            x = Coords[Name].reshape(Open)
+        Args[Name] = x
+
+    Values = {Name: np.empty(Shape) for Name in ScenarioOutputs}
+    Models = Coords["FM"] if "FM" in Dims else [FM]
+    for i, Model in enumerate(Models):
+        P = FuelParams(str(Model) if isinstance(Model, np.str_) else Model)
+        Out = CalcIndexesFromParams(P, *[Args[Name] for Name in MoistureFields], Args["iWS"], Args["iSlopeCls"],
+                                    Args["KBDI"], Args["FuelTemperature"])
+        Target = (i,) if "FM" in Dims else ()
+        for Name, x in zip(ScenarioOutputs, Out):
+            # x has a length 1 FM axis (or none); assignment broadcasts it into the model's slab
+            Values[Name][Target] = x
+    if Round is not None:
+        Values = {Name: np.round(x, Round) for Name, x in Values.items()}
+    return ScenarioCube(Dims, Coords, Fixed, Values)
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Embeddable asyncio index service with request micro-batching.
+
+Each request is one point: fuel model, MC1..MCWOOD, WS, SlopeCls, KBDI and
+FuelTemperature.  Requests that arrive within Window seconds of the first
+pending one (or until MaxBatch are pending) are computed together by one
+iCalcIndexesBatch call in an executor, off the event loop, and every caller's
+future is resolved with its own (ERC, SC, BI, IC).
+
+    Service = IndexService(Window=0.005)
+    Result = await Service.Submit({"FM": "Y", "MC1": 5, "MC10": 7, "MC100": 12, "MC1000": 15,
+                                   "MCHERB": 90, "MCWOOD": 110, "WS": 10, "SlopeCls": 1,
+                                   "KBDI": 300, "FuelTemperature": 30})
+
+The service can be exposed over HTTP on a TCP port or a Unix socket (POST
+/indexes with a JSON object, or a list of them; GET /health):
+
+    Server = await StartServer(Service, "127.0.0.1", 8765)
+    python -m NFDRSV4Service --port 8765 --window 0.005
+
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+
+import numpy as np
+
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch
+from NFDRSV4Calc import FuelModelCodes
+
+## \var RequestFields Numeric request parameters (SlopeCls defaults to 1)
+RequestFields = MoistureFields + ("WS", "SlopeCls", "KBDI", "FuelTemperature")
+
+## \var ResultFields Names of the values of a result
+ResultFields = ("ERC", "SC", "BI", "IC")
+
+## \var MaxBody Largest HTTP request body accepted (bytes)
+MaxBody = 1 << 20
+
+_Reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large"}
+
+
+## \fn ParseRequest Check one index request
+## \param Request Mapping with FM (case and surrounding blanks ignored) and the RequestFields
+## \return (FM code, tuple of RequestFields floats)
+## \exception ValueError for a missing, non-finite or invalid parameter
+def ParseRequest(Request):
+    if not isinstance(Request, dict):
+        raise ValueError("A request must be a JSON object")
+    FM = Request.get("FM")
+    Code = FM.strip().upper() if isinstance(FM, str) else FM
+    if Code not in FuelModelCodes:
+        raise ValueError("Unknown fuel model %r" % (FM,))
+    Values = []
+    for Name in RequestFields:
+        Value = Request.get(Name, 1 if Name == "SlopeCls" else None)
+        if Value is None:
+            raise ValueError("Missing %s" % Name)
+        try:
+            Value = float(Value)
+        except (TypeError, ValueError):
+            raise ValueError("%s must be a number, not %r" % (Name, Value)) from None
+        if not math.isfinite(Value):
+            raise ValueError("%s must be finite, not %r" % (Name, Value))
+        Values.append(Value)
+    if Values[RequestFields.index("SlopeCls")] not in (1, 2, 3, 4, 5):
+        raise ValueError("SlopeCls must be 1-5")
+    return Code, tuple(Values)
+
+
+## \fn ComputeBatch Indexes of a batch of parsed requests (runs in the executor)
+## \param Batch List of ParseRequest results
+## \param Round Decimal places to round to, None for full precision
+## \return list of dicts of ResultFields, in request order
+def ComputeBatch(Batch, Round=2):
+    Codes = np.array([FM for FM, _ in Batch])
+    Values = np.array([v for _, v in Batch], dtype=np.float64).reshape(len(Batch), len(RequestFields))
+    Columns = dict(zip(RequestFields, Values.T))
+    Out = iCalcIndexesBatch(Codes, {Name: Columns[Name] for Name in MoistureFields}, Columns["WS"],
+                            Columns["SlopeCls"], Columns["KBDI"], Columns["FuelTemperature"], Round=Round)
+    return [dict(zip(ResultFields, Row)) for Row in zip(*[x.tolist() for x in Out])]
+
+
+## \class IndexService
+## \brief Coalesces concurrent index requests into batches computed off the event loop
+##
+## Must be used from one event loop.  The first request of a batch starts the Window
+## timer; the batch is dispatched when the timer fires or MaxBatch requests are pending,
+## whichever comes first.  Batches run concurrently in the executor (the loop's default
+## thread pool when none is given; a ProcessPoolExecutor also works).
+class IndexService:
+
+    ## \fn __init__
+    ## \param Window Latency window (s) during which requests are gathered into a batch
+    ## \param MaxBatch Largest batch; reaching it dispatches at once
+    ## \param Executor concurrent.futures executor, None for the loop's default
+    ## \param Round Decimal places to round to, None for full precision
+    def __init__(self, Window=0.005, MaxBatch=1024, Executor=None, Round=2):
+        if Window < 0 or MaxBatch < 1:
+            raise ValueError("Window must be >= 0 and MaxBatch >= 1")
+        self.Window = float(Window)
+        self.MaxBatch = int(MaxBatch)
+        self.Executor = Executor
+        self.Round = Round
+        self.Requests = 0
+        self.Batches = 0
+        self._Pending = []
+        self._Timer = None
+        self._Running = set()
+
+    ## \fn Submit Compute the indexes of one request
+    ## \param Request Mapping with FM and the RequestFields
+    ## \return dict of ResultFields
+    ## \exception ValueError for an invalid request (raised before it is queued)
+    async def Submit(self, Request):
+        Parsed = ParseRequest(Request)
+        loop = asyncio.get_running_loop()
+        Future = loop.create_future()
+        self._Pending.append((Parsed, Future))
+        self.Requests += 1
+        if len(self._Pending) >= self.MaxBatch:
+            self._Dispatch()
+        elif self._Timer is None:
+            self._Timer = loop.call_later(self.Window, self._Dispatch)
+        return await Future
+
+    ## \fn SubmitMany Compute the indexes of several requests (queued together)
+    ## \return list of dicts of ResultFields
+    async def SubmitMany(self, Requests):
+        return list(await asyncio.gather(*[self.Submit(r) for r in Requests]))
+
+    ## \fn _Dispatch Send the pending requests to the executor as one batch
+    def _Dispatch(self):
+        if self._Timer is not None:
+            self._Timer.cancel()
+            self._Timer = None
+        Pending, self._Pending = self._Pending, []
+        if not Pending:
+            return
+        self.Batches += 1
+        loop = asyncio.get_running_loop()
+        Task = loop.create_task(self._Run(loop, Pending))
+        self._Running.add(Task)
+        Task.add_done_callback(self._Running.discard)
+
+    async def _Run(self, loop, Pending):
+        try:
+            Results = await loop.run_in_executor(self.Executor, ComputeBatch, [p for p, _ in Pending], self.Round)
+        except Exception as e:
+            for _, Future in Pending:
+                if not Future.done():
+                    Future.set_exception(e)
+            return
+        for (_, Future), Result in zip(Pending, Results):
+            # A caller may have been cancelled while its batch ran
+            if not Future.done():
+                Future.set_result(Result)
+
+    ## \fn Drain Dispatch what is pending and wait for all running batches
+    async def Drain(self):
+        self._Dispatch()
+        while self._Running:
+            await asyncio.gather(*list(self._Running), return_exceptions=True)
+
+    ## \fn Stats Request and batch counts
+    def Stats(self):
+        return {"Requests": self.Requests, "Batches": self.Batches, "Pending": len(self._Pending),
+                "Running": len(self._Running)}
+
+
+## \fn _Respond Write an HTTP response with a JSON body
+async def _Respond(Writer, Status, Body, KeepAlive):
+    Data = json.dumps(Body).encode()
+    Writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                  "Connection: %s\r\n\r\n" % (Status, _Reasons[Status], len(Data),
+                                               "keep-alive" if KeepAlive else "close")).encode() + Data)
+    await Writer.drain()
+
+
+## \fn _Handle One HTTP connection (several requests when kept alive)
+async def _Handle(Service, Reader, Writer):
+    try:
+        while True:
+            Line = await Reader.readline()
+            if not Line.strip():
+                break
+            Method, Target, Version = (Line.decode("latin-1").split() + ["", "", ""])[:3]
+            Headers = {}
+            while True:
+                h = await Reader.readline()
+                if not h.strip():
+                    break
+                Name, _, Value = h.decode("latin-1").partition(":")
+                Headers[Name.strip().lower()] = Value.strip()
+            KeepAlive = Headers.get("connection", "").lower() != "close" and Version == "HTTP/1.1"
+            try:
+                Length = int(Headers.get("content-length", 0) or 0)
+            except ValueError:
+                Length = -1
+            if Length < 0:
+                # The body cannot be delimited, so the connection cannot be reused
+                await _Respond(Writer, 400, {"error": "Invalid Content-Length"}, False)
+                break
+            if Length > MaxBody:
+                await _Respond(Writer, 413, {"error": "Request body too large"}, False)
+                break
+            Body = await Reader.readexactly(Length) if Length else b""
+            Path = Target.split("?")[0]
+            if Path == "/health":
+                Status, Out = 200, dict(Service.Stats(), status="ok")
+            elif Path != "/indexes":
+                Status, Out = 404, {"error": "Not found"}
+            elif Method != "POST":
+                Status, Out = 405, {"error": "Use POST"}
+            else:
+                try:
+                    Payload = json.loads(Body or b"null")
+                    if isinstance(Payload, list):
+                        Status, Out = 200, await Service.SubmitMany(Payload)
+                    else:
+                        Status, Out = 200, await Service.Submit(Payload)
+                except ValueError as e:
+                    Status, Out = 400, {"error": str(e)}
+            await _Respond(Writer, Status, Out, KeepAlive)
+            if not KeepAlive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        Writer.close()
+
+
+## \fn StartServer Serve an IndexService over HTTP
+## \param Host, Port TCP address (Port 0 picks a free port, see Server.sockets)
+## \param Path Unix socket path; used instead of Host and Port when given
+## \return asyncio.Server (already serving)
+async def StartServer(Service, Host="127.0.0.1", Port=0, Path=None):
+    def Handler(Reader, Writer):
+        return _Handle(Service, Reader, Writer)
+
+    if Path is not None:
+        return await asyncio.start_unix_server(Handler, path=Path)
+    return await asyncio.start_server(Handler, Host, Port)
+
+
+## \fn Query Send requests to a running server (a minimal client, e.g. for tests)
+## \param Payload One request object or a list of them
+## \return (HTTP status, decoded JSON body)
+async def Query(Payload, Host="127.0.0.1", Port=8765, Path=None):
+    if Path is not None:
+        Reader, Writer = await asyncio.open_unix_connection(Path)
+    else:
+        Reader, Writer = await asyncio.open_connection(Host, Port)
+    try:
+        Data = json.dumps(Payload).encode()
+        Writer.write(("POST /indexes HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                      "Content-Length: %d\r\nConnection: close\r\n\r\n" % (Host, len(Data))).encode() + Data)
+        await Writer.drain()
+        Status = int((await Reader.readline()).split()[1])
+        Length = 0
+        while True:
+            h = await Reader.readline()
+            if not h.strip():
+                break
+            Name, _, Value = h.decode("latin-1").partition(":")
+            if Name.strip().lower() == "content-length":
+                Length = int(Value)
+        return Status, json.loads(await Reader.readexactly(Length))
+    finally:
+        Writer.close()
+
+
+## \fn main Run the service until interrupted
+def main(argv=None):
+    Parser = argparse.ArgumentParser(description="NFDRS V4 index service (HTTP, micro-batched).")
+    Parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    Parser.add_argument("--port", type=int, default=8765, help="TCP port")
+    Parser.add_argument("--unix", help="Unix socket path (instead of --host/--port)")
+    Parser.add_argument("--window", type=float, default=0.005, help="batching window (s)")
+    Parser.add_argument("--max-batch", type=int, default=1024, help="largest batch")
+    Parser.add_argument("--round", type=int, default=2, help="decimal places")
+    Args = Parser.parse_args(argv)
+
+    async def Serve():
+        Service = IndexService(Args.window, Args.max_batch, Round=Args.round)
+        Server = await StartServer(Service, Args.host, Args.port, Args.unix)
+        print("Serving on %s" % (Args.unix or "http://%s:%d" % Server.sockets[0].getsockname()[:2]),
+              file=sys.stderr, flush=True)
+        async with Server:
+            await Server.serve_forever()
+
+    try:
+        asyncio.run(Serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
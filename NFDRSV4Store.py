@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar on-disk store for daily NFDRS index results.
+
+Each column (ERC, SC, BI, IC by default) is a flat float32 file in the store
+directory.  Results are appended in chunks of consecutive days for one station
+and fuel model; a small JSON lines index records where each run of days lives
+in the column files.  Reads of a date range inside one run are zero-copy
+slices of a read-only memory map.
+
+    Store = ResultStore("results")
+    Store.Append("045433", "Y", "2014-01-01", ERC=ERC, SC=SC, BI=BI, IC=IC)
+    Day = Store.Read("045433", "Y", Start="2018-06-01", End="2018-09-01")
+
+"""
+
+import json
+import os
+
+import numpy as np
+
+## \var ResultColumns Default store columns
+ResultColumns = ("ERC", "SC", "BI", "IC")
+
+
+## \fn DayNumber Days since 1970-01-01 for a date (string, datetime or datetime64)
+def DayNumber(Date):
+    return int(np.datetime64(Date, "D").astype(np.int64))
+
+
+## \class Segment
+## \brief One run of consecutive days for a station and fuel model
+class Segment:
+    __slots__ = ("StationID", "FMCode", "Start", "Count", "Offset")
+
+    def __init__(self, StationID, FMCode, Start, Count, Offset):
+        self.StationID = StationID
+        self.FMCode = FMCode
+        self.Start = Start       # first day (DayNumber)
+        self.Count = Count       # number of days
+        self.Offset = Offset     # first row in the column files
+
+    ## \fn End Day after the last day of the run
+    @property
+    def End(self):
+        return self.Start + self.Count
+
+    ## \fn Record Index record of the run
+    def Record(self):
+        return {"StationID": self.StationID, "FMCode": self.FMCode, "Start": self.Start,
+                "Count": self.Count, "Offset": self.Offset}
+
+
+## \class ResultStore
+## \brief Append-only columnar store of daily results by station, fuel model and date
+class ResultStore:
+    MetaFile = "meta.json"
+    IndexFile = "index.jsonl"
+
+    ## \fn __init__ Open a store, creating it if the directory has none
+    ## \param Root Store directory
+    ## \param Columns Column names of a new store (an existing store keeps its own)
+    ## \param dtype Storage type of a new store
+    def __init__(self, Root, Columns=ResultColumns, dtype="float32"):
+        self.Root = Root
+        MetaPath = os.path.join(Root, self.MetaFile)
+        if os.path.exists(MetaPath):
+            with open(MetaPath) as f:
+                Meta = json.load(f)
+        else:
+            os.makedirs(Root, exist_ok=True)
+            Meta = {"Columns": list(Columns), "dtype": np.dtype(dtype).str}
+            with open(MetaPath, "w") as f:
+                json.dump(Meta, f)
+        self.Columns = tuple(Meta["Columns"])
+        self.dtype = np.dtype(Meta["dtype"])
+        self.Rows = 0
+        self._Segments = {}
+        self._Maps = {}
+        Segments = {}
+        IndexPath = os.path.join(Root, self.IndexFile)
+        if os.path.exists(IndexPath):
+            with open(IndexPath) as f:
+                for Line in f:
+                    if Line.strip():
+                        Rec = json.loads(Line)
+                        # An extended run is re-recorded under the same offset; the last record wins
+                        Segments[Rec["Offset"]] = Segment(**Rec)
+        for Seg in sorted(Segments.values(), key=lambda s: s.Offset):
+            self._Segments.setdefault((Seg.StationID, Seg.FMCode), []).append(Seg)
+            self.Rows = max(self.Rows, Seg.Offset + Seg.Count)
+        for Runs in self._Segments.values():
+            Runs.sort(key=lambda s: s.Start)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *Exc):
+        self.Close()
+
+    ## \fn Close Drop the cached memory maps
+    def Close(self):
+        self._Maps.clear()
+
+    def __len__(self):
+        return self.Rows
+
+    ## \fn _Path File of a column
+    def _Path(self, Column):
+        return os.path.join(self.Root, Column + ".col")
+
+    ## \fn Keys (StationID, FMCode) pairs in the store
+    def Keys(self):
+        return sorted(self._Segments)
+
+    ## \fn Segments Runs of days stored for a station and fuel model, in date order
+    def Segments(self, StationID, FMCode):
+        return list(self._Segments.get((str(StationID), FMCode), ()))
+
+    ## \fn DateRange First and last+1 day stored for a station and fuel model (datetime64[D]), or None
+    def DateRange(self, StationID, FMCode):
+        Runs = self._Segments.get((str(StationID), FMCode))
+        if not Runs:
+            return None
+        return np.datetime64(Runs[0].Start, "D"), np.datetime64(Runs[-1].End, "D")
+
+    ## \fn Append Add results for consecutive days
+    ## \param StationID Station identifier
+    ## \param FMCode Fuel model code
+    ## \param Start Date of the first value
+    ## \param Values Column name -> 1-D array (every column, all the same length)
+    ##
+    ## Days already stored for the station and fuel model may not be written again.
+    ## A chunk that continues the most recently written run extends that run.
+    def Append(self, StationID, FMCode, Start, **Values):
+        StationID = str(StationID)
+        if set(Values) != set(self.Columns):
+            raise ValueError("Append needs exactly the columns %s" % (self.Columns,))
+        Arrays = [np.asarray(Values[Name], dtype=self.dtype).ravel() for Name in self.Columns]
+        Count = len(Arrays[0])
+        if any(len(a) != Count for a in Arrays):
+            raise ValueError("All columns must have the same length")
+        if Count == 0:
+            return
+        Start = DayNumber(Start)
+        Runs = self._Segments.setdefault((StationID, FMCode), [])
+        for Seg in Runs:
+            if Seg.Start < Start + Count and Start < Seg.End:
+                raise ValueError("%s/%s already has days from %s to %s" % (
+                    StationID, FMCode, np.datetime64(Seg.Start, "D"), np.datetime64(Seg.End - 1, "D")))
+
+        # Write the column data first; the index line makes the chunk visible
+        for Name, a in zip(self.Columns, Arrays):
+            if not os.path.exists(self._Path(Name)):
+                open(self._Path(Name), "wb").close()
+            with open(self._Path(Name), "r+b") as f:
+                f.seek(self.Rows * self.dtype.itemsize)
+                f.write(a.tobytes())
+                f.truncate()
+        Last = Runs[-1] if Runs else None
+        if Last is not None and Last.End == Start and Last.Offset + Last.Count == self.Rows:
+            Last.Count += Count
+            Seg = Last
+        else:
+            Seg = Segment(StationID, FMCode, Start, Count, self.Rows)
+            Runs.append(Seg)
+            Runs.sort(key=lambda s: s.Start)
+        with open(os.path.join(self.Root, self.IndexFile), "a") as f:
+            f.write(json.dumps(Seg.Record()) + "\n")
+        self.Rows += Count
+        self._Maps.clear()
+
+    ## \fn AppendResult Add a NFDRSV4Runner StationResult (or any object with the column attributes)
+    def AppendResult(self, Result, Start):
+        self.Append(Result.StationID, Result.FMCode, Start,
+                    **{Name: getattr(Result, Name) for Name in self.Columns})
+
+    ## \fn Column Read-only memory map of a whole column
+    def Column(self, Name):
+        Map = self._Maps.get(Name)
+        if Map is None:
+            if self.Rows == 0:
+                Map = np.empty(0, dtype=self.dtype)
+            else:
+                Map = np.memmap(self._Path(Name), dtype=self.dtype, mode="r", shape=(self.Rows,))
+            self._Maps[Name] = Map
+        return Map
+
+    ## \fn Read Values for a station and fuel model over a date range
+    ## \param Columns Column names (default: all)
+    ## \param Start First date (default: first stored day)
+    ## \param End Date after the last one wanted (default: after the last stored day)
+    ## \return dict with "Date" (datetime64[D]) and one array per column; days that are not
+    ## stored are NaN.  A range inside one stored run is returned as memory map slices.
+    def Read(self, StationID, FMCode, Columns=None, Start=None, End=None):
+        Columns = self.Columns if Columns is None else tuple(Columns)
+        Runs = self._Segments.get((str(StationID), FMCode), [])
+        if not Runs:
+            raise KeyError("No results for %s/%s" % (StationID, FMCode))
+        Start = Runs[0].Start if Start is None else DayNumber(Start)
+        End = Runs[-1].End if End is None else DayNumber(End)
+        n = max(0, End - Start)
+        Out = {"Date": np.arange(Start, Start + n).astype("datetime64[D]")}
+        Inside = [s for s in Runs if s.Start <= Start and End <= s.End]
+        if Inside:
+            First = Inside[0].Offset + Start - Inside[0].Start
+            for Name in Columns:
+                Out[Name] = self.Column(Name)[First:First + n]
+            return Out
+        for Name in Columns:
+            Values = np.full(n, np.nan, dtype=self.dtype)
+            Data = self.Column(Name)
+            for Seg in Runs:
+                Lo, Hi = max(Start, Seg.Start), min(End, Seg.End)
+                if Lo < Hi:
+                    Values[Lo - Start:Hi - Start] = Data[Seg.Offset + Lo - Seg.Start:Seg.Offset + Hi - Seg.Start]
+            Out[Name] = Values
+        return Out
+
+    ## \fn Quantile Quantiles of one column for a station and fuel model (missing days ignored)
+    ## \param q Quantile or sequence of quantiles (0-1)
+    def Quantile(self, StationID, FMCode, q, Column="ERC", Start=None, End=None):
+        return np.nanquantile(self.Read(StationID, FMCode, (Column,), Start, End)[Column], q)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The NFDRSV4 modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+## \fn Days Random daily inputs (in the range where the scalar code stays real)
+@pytest.fixture
+def Days():
+    Rng = np.random.default_rng(42)
+    n = 60
+    return {"MC1": Rng.uniform(2, 18, n), "MC10": Rng.uniform(4, 20, n), "MC100": Rng.uniform(8, 25, n),
+            "MC1000": Rng.uniform(10, 30, n), "MCHERB": Rng.uniform(30, 200, n),
+            "MCWOOD": Rng.uniform(60, 200, n), "WS": Rng.integers(0, 25, n).astype(float),
+            "KBDI": Rng.uniform(0, 700, n), "FuelTemperature": Rng.uniform(0, 40, n)}
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import NFDRSV4Batch
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch, iCalcIndexesModels
+from NFDRSV4Calc import FuelModelCodes, USNFDRSFuelModel, iCalcIndexes
+
+
+def _Scalar(FM, Days, i, SlopeCls):
+    Out = iCalcIndexes(FM, [Days[Name][i] for Name in MoistureFields], Days["WS"][i], SlopeCls, 0,
+                       Days["KBDI"][i], Days["FuelTemperature"][i])
+    return [0.0] * 4 if Out == 0 else Out
+
+
+@pytest.mark.parametrize("Code", FuelModelCodes)
+def test_batch_matches_scalar(Days, Code):
+    FM = USNFDRSFuelModel(Code)
+    MC = {Name: Days[Name] for Name in MoistureFields}
+    for SlopeCls in (1, 4):
+        Batch = np.array(iCalcIndexesBatch(FM, MC, Days["WS"], SlopeCls, Days["KBDI"], Days["FuelTemperature"]))
+        Scalar = np.array([_Scalar(FM, Days, i, SlopeCls) for i in range(len(Days["MC1"]))]).T
+        np.testing.assert_allclose(Batch, Scalar, rtol=0, atol=1e-9)
+
+
+
+def test_mixed_models_and_broadcast_models_match(Days):
+    MC = {Name: Days[Name] for Name in MoistureFields}
+    Models = ("V", "W", "X", "Y", "Z")
+    Stacked = iCalcIndexesModels(MC, Days["WS"], 2, Days["KBDI"], Days["FuelTemperature"], Models)
+    for j, Code in enumerate(Models):
+        Codes = np.full(len(Days["MC1"]), Code)
+        Each = iCalcIndexesBatch(Codes, MC, Days["WS"], 2, Days["KBDI"], Days["FuelTemperature"])
+        for a, b in zip(Stacked, Each):
+            np.testing.assert_array_equal(a[:, j], b)
+
+
+def test_models_are_chunked_without_changing_results(Days, monkeypatch):
+    # Two stations as columns, a slope class per station and a scalar fuel temperature
+    MC = {Name: np.stack([Days[Name], Days[Name][::-1]], axis=1) for Name in MoistureFields}
+    Args = (MC, np.stack([Days["WS"], Days["WS"][::-1]], axis=1), np.array([[1, 4]]),
+            np.stack([Days["KBDI"], Days["KBDI"][::-1]], axis=1), 60.0, FuelModelCodes)
+    Whole = iCalcIndexesModels(*Args, Round=None)
+    monkeypatch.setattr(NFDRSV4Batch, "ModelChunkCells", 7 * 2 * len(FuelModelCodes))
+    Chunked = iCalcIndexesModels(*Args, Round=None)
+    for a, b in zip(Chunked, Whole):
+        assert a.shape == (len(Days["MC1"]), 2, len(FuelModelCodes))
+        np.testing.assert_array_equal(a, b)
+    Scalar = iCalcIndexesModels({Name: Days[Name][0] for Name in MoistureFields}, 5.0, 1, 300.0, 60.0)
+    assert Scalar[0].shape == (5,)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import NFDRSV4Bench
+from NFDRSV4Bench import CompareBaseline, MakeCase, TimeCase
+
+
+def test_gate_needs_both_the_ratio_and_the_noise_floor():
+    Baseline = {"Fast/day": {"Seconds": 2e-6}, "Slow/decades": {"Seconds": 2.0}, "Same/year": {"Seconds": 0.01}}
+    Results = {"Fast/day": {"Seconds": 6e-6}, "Slow/decades": {"Seconds": 3.0}, "Same/year": {"Seconds": 0.0105},
+               "New/year": {"Seconds": 1.0}}
+    assert [s[0] for s in CompareBaseline(Results, Baseline)] == ["Slow/decades"]
+    assert [s[0] for s in CompareBaseline(Results, Baseline, Floor=0)] == ["Fast/day", "Slow/decades"]
+
+
+def test_timecase_reports_the_median_interval(monkeypatch):
+    monkeypatch.setattr(NFDRSV4Bench, "MinTime", 0.001)
+    Calls = []
+    Result = TimeCase(lambda: Calls.append(1), Repeat=5, Memory=False)
+    assert Result["Intervals"] == 5 and Result["Loops"] >= 1
+    assert Result["Min"] <= Result["Seconds"] <= 5 * Result["Mean"]
+    assert Result["PeakMB"] is None
+
+
+def test_scalar_case_runs_at_station_decades():
+    assert "decades" in NFDRSV4Bench.Cases["iCalcIndexes"]
+    Run, Units, Unit = MakeCase("iCalcIndexes", "decades")
+    assert (Units, Unit) == (1000 * 3652, "days")
+    with pytest.raises(KeyError):
+        MakeCase("NoSuchCase", "day")
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import os
+import random
+
+import pytest
+
+from NFDRSV4Calc import FuelModelCodes, USNFDRSFuelModel, iCalcIndexes
+
+Data = os.path.join(os.path.dirname(__file__), "data")
+
+## Attributes of every model (and of the Slash fallback, as "QQ") built by the original
+## if/elif USNFDRSFuelModel constructor
+with open(os.path.join(Data, "baseline_fuelmodels.json")) as f:
+    BaselineModels = json.load(f)
+
+
+@pytest.mark.parametrize("Code", sorted(BaselineModels))
+def test_fuel_model_table_matches_baseline_ladder(Code):
+    FM = USNFDRSFuelModel(Code.lower())
+    for Name, Value in BaselineModels[Code].items():
+        assert getattr(FM, Name) == Value, Name
+
+
+def test_every_baseline_model_is_registered():
+    assert set(FuelModelCodes) == set(BaselineModels) - {"QQ"}
+
+
+def test_unknown_code_is_one_shared_slash_model():
+    FM = USNFDRSFuelModel("zz")
+    assert FM is USNFDRSFuelModel("ZZ")
+    assert FM.FMCode == "ZZ"
+    assert FM.Params() == USNFDRSFuelModel("QQ").Params()
+
+
+def test_models_are_immutable_and_replace_copies():
+    FM = USNFDRSFuelModel("Y")
+    with pytest.raises(AttributeError):
+        FM.L1 = 3.0
+    Heavier = FM.Replace(L1=3.0)
+    assert Heavier.L1 == 3.0 and Heavier.W1 == 3.0 * FM.CTA
+    assert USNFDRSFuelModel("Y").L1 == BaselineModels["Y"]["L1"]
+
+
+## \fn _BaselineRows Inputs and outputs of the original iCalcIndexes, 24 random days per model
+def _BaselineRows():
+    with open(os.path.join(Data, "baseline_indexes.csv")) as f:
+        return [{k: v if k == "FM" else float(v) for k, v in Row.items()} for Row in csv.DictReader(f)]
+
+
+def test_cached_scalar_path_matches_baseline_outputs():
+    Rows = _BaselineRows()
+    # Twice over, interleaving models, so most calls hit the prepared model and bed caches
+    Order = list(range(len(Rows))) * 2
+    random.Random(0).shuffle(Order)
+    for i in Order:
+        Row = Rows[i]
+        Out = iCalcIndexes(USNFDRSFuelModel(Row["FM"]), [Row[k] for k in ("MC1", "MC10", "MC100", "MC1000",
+                           "MCHERB", "MCWOOD")], Row["WS"], int(Row["SlopeCls"]), 0, Row["KBDI"], Row["FuelTemperature"])
+        assert (Out or [0, 0, 0, 0]) == [Row[k] for k in ("ERC", "SC", "BI", "IC")], Row
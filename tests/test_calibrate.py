@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from scipy.stats import spearmanr
+
+from NFDRSV4Calibrate import CalibrationData, DefaultGSIParams, FailedScore, GSICalibrator
+from NFDRSV4GSI import CalcGSIArrays, GSILimits, SetGSILimits
+
+Lat = 40.0
+
+
+## \fn Data Synthetic 2014-2020 station weather with LFM observations every 10 days
+@pytest.fixture(scope="module")
+def Data():
+    Rng = np.random.default_rng(3)
+    Dates = np.arange("2013-12-01", "2021-01-01", dtype="datetime64[D]").astype("datetime64[s]")
+    Phase = 2 * np.pi * np.arange(len(Dates)) / 365.25
+    Tmin = 40 - 20 * np.cos(Phase) + Rng.normal(0, 5, len(Dates))
+    VPDMax = np.clip(2500 - 1800 * np.cos(Phase) + Rng.normal(0, 500, len(Dates)), 0, None)
+    Prcp = np.where(Rng.random(len(Dates)) < 0.2, Rng.exponential(0.3, len(Dates)), 0.0)
+    ObsDates = Dates[40::10] + np.timedelta64(13, "h")
+    ObsLFM = np.clip(130 - 60 * np.cos(Phase[40::10] - 0.5) + Rng.normal(0, 15, len(ObsDates)), 50, 250)
+    ObsLFM[::17] = np.nan
+    return CalibrationData(Dates, Tmin, VPDMax, Prcp, ObsDates, ObsLFM, Lat), (Dates, Tmin, VPDMax, Prcp)
+
+
+Candidates = [DefaultGSIParams, (-4, 6, 1000, 4500, 35000, 40000, 0.5, 1.7, 14, 0.3, 28),
+              (0, 8, 700, 3000, 36500, 39000, 1.0, 2.5, 30, 0.15, 10)]
+
+
+@pytest.mark.parametrize("UsePrcp", [True, False])
+def test_model_lfm_matches_calcgsi(Data, UsePrcp):
+    Calib, (Dates, Tmin, VPDMax, Prcp) = Data
+    Calib = CalibrationData(Dates, Tmin, VPDMax, Prcp, Calib.Dates[Calib.ObsIdx], Calib.ObsLFM, Lat,
+                            LFMMin=Calib.LFMMin, LFMMax=Calib.LFMMax, UsePrcp=UsePrcp)
+    Keep = (Dates > np.datetime64("2014-01-01")) & (Dates <= np.datetime64("2020-12-31"))
+    JDay = (Dates[Keep].astype("datetime64[D]") - Dates[Keep].astype("datetime64[Y]")).astype(int) + 1
+    Model = Calib.ModelLFM(Candidates)
+    for p, m in zip(Candidates, Model):
+        Lim = SetGSILimits(GSILimits(), p, Calib.LFMMin, Calib.LFMMax, Lat)
+        Out = CalcGSIArrays(Tmin[Keep], VPDMax[Keep], Prcp[Keep], JDay, Lim)
+        np.testing.assert_allclose(m, Out["LFMWoodP" if UsePrcp else "LFMWood"][Calib.ObsIdx], rtol=1e-12)
+
+
+def test_score_matches_spearman_and_mae(Data):
+    Calib = Data[0]
+    assert len(Calib.ObsLFM) > 200 and not np.isnan(Calib.ObsLFM).any()
+    Rho, MAE = Calib.Score(Candidates)
+    for p, r, e in zip(Candidates, Rho, MAE):
+        Pred = Calib.ModelLFM([p])[0]
+        assert r == pytest.approx(spearmanr(Calib.ObsLFM, Pred)[0], abs=1e-12)
+        assert e == pytest.approx(np.mean(np.abs(Calib.ObsLFM - Pred)), rel=1e-12)
+
+
+def test_degenerate_vectors_get_failed_score(Data):
+    Calib = Data[0]
+    Bad = list(DefaultGSIParams)
+    Bad[0] = Bad[1]
+    assert Calib.Degenerate(Bad) and not Calib.Degenerate(DefaultGSIParams)
+    (Params, Rho, MAE), = GSICalibrator(Calib).Evaluate([Bad])
+    assert (Rho, MAE) == FailedScore
+
+
+def test_grid_search_is_the_best_of_its_candidates(Data):
+    Calib = Data[0]
+    Axes = {"GSIPeriod": [14, 21, 28], "GUThresh": [0.15, 0.25, 0.35]}
+    Calibrator = GSICalibrator(Calib, BatchSize=4)
+    Best = Calibrator.GridSearch(Axes)
+    assert len(Calibrator.Results) == 9
+    assert Best[2] == min(MAE for _, MAE in Calibrator.Results.values())
+    Rho = GSICalibrator(Calib, Objective="Rho").GridSearch(Axes)
+    assert Rho[1] == max(r for r, _ in Calibrator.Results.values())
+    Descent = GSICalibrator(Calib).CoordinateDescent(Axes)
+    assert Descent[2] <= Calibrator.Evaluate([DefaultGSIParams])[0][2]
+
+
+def test_random_search_is_repeatable_and_workers_agree(Data):
+    Calib = Data[0]
+    Bounds = {"TminLow": (-5, 0), "TminUp": (3, 10), "GSIPeriod": (7, 35)}
+    First = GSICalibrator(Calib).RandomSearch(Bounds, 12, Seed=5)
+    with GSICalibrator(Calib, Workers=1, BatchSize=5) as Pool:
+        assert Pool.RandomSearch(Bounds, 12, Seed=5) == First
+    assert float(First[0][8]).is_integer()
+
+
+def test_checkpoint_resumes_without_rescoring(Data, tmp_path, monkeypatch):
+    Calib = Data[0]
+    Path = str(tmp_path / "scores.jsonl")
+    Scored = GSICalibrator(Calib, Checkpoint=Path).Evaluate(Candidates)
+    monkeypatch.setattr(Calib, "Score", lambda Params: pytest.fail("rescored a checkpointed vector"))
+    Resumed = GSICalibrator(Calib, Checkpoint=Path)
+    assert Resumed.Evaluate(Candidates) == Scored
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+import NFDRSV4CLI
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch
+from NFDRSV4Calc import FuelModelCodes
+
+Inputs = MoistureFields + ("WS", "KBDI", "FuelTemperature")
+
+
+def _Records(Days, n=12):
+    return [dict({Name: float(Days[Name][i]) for Name in Inputs}, Station="S%d" % i) for i in range(n)]
+
+
+def _Expected(Days, FM, n=12):
+    Out = iCalcIndexesBatch(FM, {Name: Days[Name][:n] for Name in MoistureFields}, Days["WS"][:n], 1,
+                            Days["KBDI"][:n], Days["FuelTemperature"][:n])
+    return np.array(Out).T
+
+
+def test_indexes_csv_file(Days, tmp_path, capsys):
+    Path = tmp_path / "days.csv"
+    with open(Path, "w", newline="") as f:
+        Writer = csv.DictWriter(f, fieldnames=("Station",) + Inputs)
+        Writer.writeheader()
+        Writer.writerows(_Records(Days))
+    assert NFDRSV4CLI.main(["indexes", "-f", "x", "--chunk", "5", str(Path)]) == 0
+    Rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert [r["Station"] for r in Rows] == ["S%d" % i for i in range(12)]
+    assert {r["FM"] for r in Rows} == {"X"}
+    Got = np.array([[float(r[k]) for k in NFDRSV4CLI.IndexColumns] for r in Rows])
+    np.testing.assert_array_equal(Got, _Expected(Days, "X"))
+
+
+def test_indexes_ndjson_stdin_per_record_models(Days, monkeypatch, capsys):
+    Records = _Records(Days)
+    for i, Rec in enumerate(Records):
+        Rec["FM"] = "VY"[i % 2]
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(r) + "\n" for r in Records)))
+    assert NFDRSV4CLI.main(["indexes", "--output", "ndjson"]) == 0
+    Rows = [json.loads(Line) for Line in capsys.readouterr().out.splitlines()]
+    Expected = {FM: _Expected(Days, FM) for FM in "VY"}
+    for i, Row in enumerate(Rows):
+        assert Row["FM"] == "VY"[i % 2]
+        assert [Row[k] for k in NFDRSV4CLI.IndexColumns] == Expected[Row["FM"]][i].tolist()
+
+
+def test_unknown_fuel_model_exits(Days, monkeypatch):
+    with pytest.raises(SystemExit, match="Unknown fuel model"):
+        NFDRSV4CLI.main(["indexes", "-f", "ZZ"])
+    Records = _Records(Days, 3)
+    Records[2]["FM"] = "YY"
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(dict(r, FM=r.get("FM", "Y"))) + "\n"
+                                                         for r in Records)))
+    with pytest.raises(SystemExit, match="records 1-3"):
+        NFDRSV4CLI.main(["indexes"])
+
+
+def test_models_lists_codes(capsys):
+    assert NFDRSV4CLI.main(["models"]) == 0
+    assert capsys.readouterr().out.split() == list(FuelModelCodes)
+
+
+def test_fuel_model_codes_are_normalized(Days, monkeypatch, capsys):
+    Records = [dict(r, FM=" y ") for r in _Records(Days)]
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(r) + "\n" for r in Records)))
+    assert NFDRSV4CLI.main(["indexes", "--output", "ndjson"]) == 0
+    Rows = [json.loads(Line) for Line in capsys.readouterr().out.splitlines()]
+    assert {Row["FM"] for Row in Rows} == {"Y"}
+    Got = np.array([[Row[k] for k in NFDRSV4CLI.IndexColumns] for Row in Rows])
+    np.testing.assert_array_equal(Got, _Expected(Days, "Y"))
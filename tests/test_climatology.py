@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from scipy.stats import percentileofscore
+
+import NFDRSV4Climatology
+from NFDRSV4Climatology import Climatology, DayOfYear, QuantileSketch
+from NFDRSV4Store import ResultStore
+
+
+## \fn Values Daily ERC-like values rounded as iCalcIndexes rounds them, with a few NaN
+@pytest.fixture
+def Values():
+    Rng = np.random.default_rng(7)
+    x = np.round(Rng.gamma(4.0, 12.0, 5000), 2)
+    x[::97] = np.nan
+    return x
+
+
+def test_sketch_matches_numpy_and_scipy(Values, monkeypatch):
+    monkeypatch.setattr(NFDRSV4Climatology, "_CompactSize", 500)
+    Sketch = QuantileSketch()
+    for Chunk in np.array_split(Values, 13):
+        Sketch.Add(Chunk)
+    Sketch.Add(42.0)
+    x = np.append(Values[~np.isnan(Values)], 42.0)
+    q = np.array([0, 0.1, 0.5, 0.9, 0.97, 1])
+    np.testing.assert_allclose(Sketch.Quantile(q), np.quantile(x, q), atol=1e-9)
+    assert Sketch.Count == len(x) and Sketch.Mean == pytest.approx(x.mean())
+    assert (Sketch.Min, Sketch.Max) == pytest.approx((x.min(), x.max()))
+    for Kind in ("weak", "strict", "mean"):
+        for v in (0.0, 17.5, float(x[3]), 42.0, 1e4):
+            assert Sketch.PercentileOf(v, Kind) == pytest.approx(percentileofscore(x, v, Kind)), (Kind, v)
+
+
+def test_sketch_merge_and_state(Values):
+    Parts = [QuantileSketch() for _ in range(3)]
+    for Sketch, Chunk in zip(Parts, np.array_split(Values, 3)):
+        Sketch.Add(Chunk)
+    Whole = QuantileSketch()
+    Whole.Add(Values)
+    Merged = QuantileSketch.Combine(QuantileSketch.FromState(s.State()) for s in Parts)
+    State = Whole.State()
+    np.testing.assert_array_equal(Merged.Keys, State["Keys"])
+    np.testing.assert_array_equal(Merged.Counts, State["Counts"])
+    assert Merged.Sum == pytest.approx(State["Sum"])
+    with pytest.raises(ValueError):
+        Merged.Merge(QuantileSketch(0.1))
+    assert np.isnan(QuantileSketch().Quantile(0.5))
+
+
+def test_climatology_by_station_and_day_of_year(Values, tmp_path):
+    Dates = np.datetime64("2010-01-01") + np.arange(len(Values))
+    BI = np.round(Values / 2, 2)
+    Clim = Climatology()
+    Clim.Add("A", "Y", Dates[:3000], ERC=Values[:3000], BI=BI[:3000], SC=Values[:3000])
+    Other = Climatology()
+    Other.Add("A", "Y", Dates[3000:], ERC=Values[3000:], BI=BI[3000:])
+    Other.Add("B", "V", Dates[:10], ERC=Values[:10], BI=BI[:10])
+    Clim = Climatology.Loads(Clim.Merge(Other).Dumps())
+    assert Clim.Keys() == [("A", "Y", "BI"), ("A", "Y", "ERC"), ("B", "V", "BI"), ("B", "V", "ERC")]
+    x = Values[~np.isnan(Values)]
+    assert Clim.Quantile("A", "Y", 0.9) == pytest.approx(np.quantile(x, 0.9))
+    assert Clim.Percentile("A", "Y", 30.0, "BI") == pytest.approx(percentileofscore(BI[~np.isnan(BI)], 30.0))
+    Days = Clim.DayOfYear("A", "Y")
+    JDay = DayOfYear(Dates)
+    for d in (1, 60, 200, 366):
+        v = Values[(JDay == d) & ~np.isnan(Values)]
+        assert Days["Count"][d - 1] == len(v)
+        assert Days["Mean"][d - 1] == pytest.approx(v.mean())
+        assert (Days["Min"][d - 1], Days["Max"][d - 1]) == (v.min(), v.max())
+    assert Clim.Combined([("A", "Y"), ("B", "V")]).Count == len(x) + np.count_nonzero(~np.isnan(Values[:10]))
+    with pytest.raises(KeyError):
+        Clim.Sketch("A", "Y", "SC")
+
+    Store = ResultStore(str(tmp_path))
+    Store.Append("A", "Y", Dates[0], ERC=Values, SC=Values, BI=BI, IC=Values)
+    FromStore = Climatology.FromStore(Store)
+    for Name in ("Keys", "Counts"):
+        np.testing.assert_array_equal(FromStore.Sketch("A", "Y").State()[Name], Clim.Sketch("A", "Y").State()[Name])
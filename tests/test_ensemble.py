@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import NFDRSV4Climatology
+from NFDRSV4Climatology import CellSketches, QuantileSketch
+from NFDRSV4Ensemble import EnsembleSummary, iCalcIndexesEnsemble
+
+
+def test_ensemble_merge_and_state_match_numpy():
+    Rng = np.random.default_rng(2)
+    Members = np.round(Rng.uniform(0, 100, (12, 5)), 2)
+    Options = dict(Columns=("ERC",), Thresholds={"ERC": (50.0,)})
+    a = EnsembleSummary((5,), **Options)
+    b = EnsembleSummary((5,), **Options)
+    for k, x in enumerate(Members):
+        (a if k < 7 else b).AddMember(ERC=x)
+    Merged = EnsembleSummary.Loads(a.Dumps()).Merge(EnsembleSummary.Loads(b.Dumps()))
+    Stats = Merged.Summary()["ERC"]
+    np.testing.assert_allclose(Stats["Mean"], Members.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(Stats["Spread"], Members.std(axis=0, ddof=1), rtol=1e-12)
+    np.testing.assert_array_equal(Stats["Exceedance"][0], (Members >= 50).mean(axis=0))
+    np.testing.assert_allclose(Stats["Quantiles"][1], np.median(Members, axis=0), atol=1e-9)
+
+
+def test_cell_sketches_match_a_quantile_sketch_per_cell(monkeypatch):
+    monkeypatch.setattr(NFDRSV4Climatology, "_CellCompactRows", 5)
+    Rng = np.random.default_rng(9)
+    Values = np.round(Rng.gamma(3.0, 10.0, (40, 6, 7)), 1)
+    Values[Rng.random(Values.shape) < 0.15] = np.nan
+    Values[:, 2, 3] = np.nan
+    Parts = [CellSketches(42), CellSketches(42)]
+    for k, x in enumerate(Values):
+        Parts[k % 2].Add(x)
+    Sketches = CellSketches.FromState(Parts[0].State()).Merge(CellSketches.FromState(Parts[1].State()))
+    assert len(Sketches.Keys) <= 40
+    q = (0.0, 0.1, 0.5, 0.9, 1.0)
+    Quantiles = Sketches.Quantile(q)
+    for c, Cell in enumerate(Values.reshape(40, -1).T):
+        One = QuantileSketch()
+        One.Add(Cell)
+        np.testing.assert_array_equal(Quantiles[:, c], One.Quantile(q))
+    np.testing.assert_array_equal(Sketches.Count(), (~np.isnan(Values)).sum(axis=0).ravel())
+    assert np.isnan(CellSketches(3).Quantile(0.5)).all()
+    with pytest.raises(ValueError):
+        Sketches.Merge(CellSketches(41))
+
+
+def test_ensemble_of_indexes(Days):
+    MC = {Name: Days[Name][:10] for Name in ("MC1", "MC10", "MC100", "MC1000", "MCHERB", "MCWOOD")}
+    Members = [(MC, Days["WS"][:10] + k, Days["KBDI"][:10], Days["FuelTemperature"][:10]) for k in range(8)]
+    Summary = iCalcIndexesEnsemble("Y", Members, Thresholds={"ERC": (40.0,)})
+    assert Summary.Shape == (10,) and Summary.Members == 8
+    Stats = Summary.Summary()
+    assert Stats["BI"]["Quantiles"].shape == (3, 10)
+    assert (Stats["SC"]["Quantiles"][0] <= Stats["SC"]["Quantiles"][2]).all()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch
+from NFDRSV4Calc import USNFDRSFuelModel
+from NFDRSV4Grid import FuelModelGrid, GridOutputs, NoFuel, Tiles, iCalcIndexesGrid
+
+Shape = (23, 31)
+
+
+## \fn Grid Fuel model codes, moisture and weather grids saved as .npy files
+@pytest.fixture
+def Grid(tmp_path):
+    Rng = np.random.default_rng(11)
+    Codes = Rng.choice(["V", "W", "X", "Y", "Z", "NB", "T"], Shape)
+    Inputs = {"MC1": Rng.uniform(2, 18, Shape), "MC10": Rng.uniform(4, 20, Shape),
+              "MC100": Rng.uniform(8, 25, Shape), "MC1000": Rng.uniform(10, 30, Shape),
+              "MCHERB": Rng.uniform(30, 200, Shape), "MCWOOD": Rng.uniform(60, 200, Shape),
+              "WS": Rng.integers(0, 25, Shape).astype(float), "KBDI": Rng.uniform(0, 700, Shape)}
+    Paths = {}
+    for Name, x in Inputs.items():
+        Paths[Name] = str(tmp_path / (Name + ".npy"))
+        np.save(Paths[Name], x)
+    FM = FuelModelGrid(Codes, Path=str(tmp_path / "FuelModel.npy"))
+    return Codes, FM, Inputs, Paths
+
+
+def test_tiles_cover_the_grid_once():
+    Count = np.zeros(Shape, dtype=int)
+    for Tile in Tiles(Shape, (7, 9)):
+        Count[Tile] += 1
+    assert (Count == 1).all()
+
+
+@pytest.mark.parametrize("Workers", [0, 1])
+def test_grid_matches_batch_per_cell(Grid, tmp_path, Workers):
+    Codes, FM, Inputs, Paths = Grid
+    assert (np.asarray(FM) == NoFuel).sum() == (Codes == "NB").sum()
+    Out = iCalcIndexesGrid(FM, Paths, Paths["WS"], 2, Paths["KBDI"], 30.0, str(tmp_path / "out"),
+                           TileShape=(7, 9), Workers=Workers, dtype=np.float64)
+    for Code in np.unique(Codes):
+        Mask = Codes == Code
+        if Code == "NB":
+            for Name in GridOutputs:
+                assert np.isnan(Out[Name][Mask]).all()
+            continue
+        Expected = iCalcIndexesBatch(USNFDRSFuelModel(Code), {k: Inputs[k][Mask] for k in MoistureFields},
+                                     Inputs["WS"][Mask], 2, Inputs["KBDI"][Mask], 30.0)
+        for Name, e in zip(GridOutputs, Expected):
+            np.testing.assert_array_equal(Out[Name][Mask], e, err_msg="%s %s" % (Code, Name))
+
+
+def test_grid_inputs_are_checked(Grid, tmp_path):
+    Codes, FM, Inputs, Paths = Grid
+    Bad = dict(Paths, MC1=np.zeros((2, 2)))
+    with pytest.raises(ValueError, match="MC1"):
+        iCalcIndexesGrid(FM, Bad, 5.0, 1, 100.0, 30.0, str(tmp_path / "out"))
+    # Workers reopen the inputs from their files, so in-memory grids are refused
+    InMemory = dict(Paths, MC1=Inputs["MC1"])
+    with pytest.raises(ValueError, match="MC1"):
+        iCalcIndexesGrid(FM, InMemory, 5.0, 1, 100.0, 30.0, str(tmp_path / "out"), Workers=1)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from NFDRSV4GSI import CalcGSIArrays, DaylGrid, GSIAccumulator, GSIColumns, GSILimits
+
+
+def test_daylgrid_file_is_rebuilt_for_other_lats(tmp_path):
+    Path = str(tmp_path / "dayl.npy")
+    First = DaylGrid([30.0, 40.0], Path=Path)
+    np.testing.assert_array_equal(DaylGrid([30.0, 40.0], Path=Path), First)
+    np.testing.assert_array_equal(DaylGrid([30.0, 41.0], Path=Path), DaylGrid([30.0, 41.0]))
+    np.testing.assert_array_equal(DaylGrid([30.0, 41.0], "DaylightHours", Path=Path),
+                                  DaylGrid([30.0, 41.0], "DaylightHours"))
+
+
+## \fn _Weather Synthetic daily GSI inputs
+def _Weather(n=400, Seed=1):
+    Rng = np.random.default_rng(Seed)
+    JDay = (np.arange(n) + 100) % 365 + 1
+    Tmin = 40 + 25 * np.sin(JDay / 365 * 2 * np.pi) + Rng.normal(0, 4, n)
+    VPDMax = Rng.uniform(300, 4500, n)
+    Prcp = np.where(Rng.random(n) < 0.2, Rng.uniform(0, 1, n), 0.0)
+    return Tmin, VPDMax, Prcp, JDay
+
+
+def test_gsi_accumulator_resumes_from_state():
+    Tmin, VPDMax, Prcp, JDay = _Weather()
+    gsilim = GSILimits()
+    gsilim.Lat = 38.5
+    Whole = GSIAccumulator(gsilim).Extend(Tmin, VPDMax, Prcp, JDay)
+    First = GSIAccumulator(gsilim)
+    Head = First.Extend(Tmin[:150], VPDMax[:150], Prcp[:150], JDay[:150])
+    Tail = GSIAccumulator.Loads(First.Dumps()).Extend(Tmin[150:], VPDMax[150:], Prcp[150:], JDay[150:])
+    for Name in GSIColumns:
+        np.testing.assert_allclose(np.concatenate([Head[Name], Tail[Name]]), Whole[Name],
+                                   rtol=1e-12, atol=1e-12, err_msg=Name)
+
+
+def test_gsi_accumulator_matches_calcgsiarrays():
+    Tmin, VPDMax, Prcp, JDay = _Weather(Seed=4)
+    gsilim = GSILimits()
+    gsilim.Lat = 44.0
+    Batch = CalcGSIArrays(Tmin, VPDMax, Prcp, JDay, gsilim)
+    Daily = GSIAccumulator(gsilim).Extend(Tmin, VPDMax, Prcp, JDay)
+    # Unscaled values agree every day; the running rescale agrees once the whole record is seen
+    for Name in ("Prcp_RT", "iGSI", "GSI", "iGSI_PE", "GSI_PE"):
+        np.testing.assert_allclose(Daily[Name], Batch[Name], rtol=1e-12, atol=1e-12, err_msg=Name)
+    for Name in ("GSI_RS", "GSI_PE_RS", "LFMWood", "LFMWoodP"):
+        np.testing.assert_allclose(Daily[Name][-1], Batch[Name][-1], rtol=1e-12, err_msg=Name)
+    Resumed = GSIAccumulator.FromHistory(Tmin[:300], VPDMax[:300], Prcp[:300], JDay[:300], gsilim)
+    Tail = Resumed.Extend(Tmin[300:], VPDMax[300:], Prcp[300:], JDay[300:])
+    for Name in GSIColumns:
+        np.testing.assert_allclose(Tail[Name], Daily[Name][300:], rtol=1e-12, atol=1e-12, err_msg=Name)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch, iCalcIndexesHourly
+from NFDRSV4Calc import USNFDRSFuelModel, iCalcIndexes
+
+Days, Hours = 15, 24
+
+
+## \fn Weather Hourly dead fuel moisture, wind and fuel temperature with daily live moisture and KBDI
+@pytest.fixture
+def Weather():
+    Rng = np.random.default_rng(5)
+    Hourly = lambda Low, High: Rng.uniform(Low, High, (Days, Hours))
+    Daily = lambda Low, High: Rng.uniform(Low, High, Days)
+    MC = {"MC1": Hourly(2, 18), "MC10": Hourly(4, 20), "MC100": Hourly(8, 25), "MC1000": Daily(10, 30),
+          "MCHERB": Daily(30, 200), "MCWOOD": Daily(60, 200)}
+    return MC, Rng.integers(0, 25, (Days, Hours)).astype(float), Daily(0, 700), Hourly(0, 40)
+
+
+@pytest.mark.parametrize("Code", ["V", "W", "X", "Y", "Z"])
+def test_hourly_matches_batch_on_expanded_days(Weather, Code):
+    MC, WS, KBDI, FuelTemperature = Weather
+    FM = USNFDRSFuelModel(Code)
+    Hourly = iCalcIndexesHourly(FM, MC, WS, 3, KBDI, FuelTemperature)
+    Expand = lambda x: np.broadcast_to(x[:, None], (Days, Hours)) if np.ndim(x) == 1 else x
+    Batch = iCalcIndexesBatch(FM, {k: Expand(v) for k, v in MC.items()}, WS, 3, Expand(KBDI), FuelTemperature)
+    for h, b in zip(Hourly, Batch):
+        assert h.shape == (Days, Hours)
+        np.testing.assert_array_equal(h, b)
+
+
+def test_hourly_matches_scalar(Weather):
+    MC, WS, KBDI, FuelTemperature = Weather
+    FM = USNFDRSFuelModel("Y")
+    Hourly = np.array(iCalcIndexesHourly(FM, MC, WS, 1, KBDI, FuelTemperature))
+    for d, h in ((0, 0), (4, 13), (14, 23)):
+        Moisture = [MC[k][d, h] if np.ndim(MC[k]) == 2 else MC[k][d] for k in MoistureFields]
+        Scalar = iCalcIndexes(FM, Moisture, WS[d, h], 1, 0, KBDI[d], FuelTemperature[d, h])
+        np.testing.assert_allclose(Hourly[:, d, h], [0.0] * 4 if Scalar == 0 else Scalar, rtol=0, atol=1e-9)
+
+
+def test_hourly_herbaceous_moisture_and_scalars(Weather):
+    MC, WS, KBDI, FuelTemperature = Weather
+    MC = dict(MC, MCHERB=np.repeat(MC["MCHERB"][:, None], Hours, axis=1) + np.arange(Hours))
+    Hourly = iCalcIndexesHourly("X", MC, 10.0, 2, 250.0, 20.0)
+    Batch = iCalcIndexesBatch("X", {k: np.broadcast_to(v[:, None], (Days, Hours)) if np.ndim(v) == 1 else v
+                                    for k, v in MC.items()}, 10.0, 2, 250.0, 20.0)
+    for h, b in zip(Hourly, Batch):
+        np.testing.assert_array_equal(h, b)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+
+import NFDRSV4Instrument
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch
+from NFDRSV4Calc import KBDIThreshold, USNFDRSFuelModel, iCalcIndexes
+from NFDRSV4Instrument import Instrumentation, Instrumented
+
+
+def _RunScalar(FM, Days):
+    return [iCalcIndexes(FM, [Days[Name][i] for Name in MoistureFields], Days["WS"][i], 2, 0,
+                         Days["KBDI"][i], Days["FuelTemperature"][i]) for i in range(len(Days["MC1"]))]
+
+
+def test_disabled_by_default_and_results_unchanged(Days):
+    FM = USNFDRSFuelModel("Y")
+    assert NFDRSV4Instrument.Active is None
+    Plain = _RunScalar(FM, Days)
+    with Instrumented() as Probe:
+        assert NFDRSV4Instrument.Active is Probe
+        Recorded = _RunScalar(FM, Days)
+    assert NFDRSV4Instrument.Active is None
+    assert Recorded == Plain
+
+
+def test_scalar_stages_and_counters(Days):
+    FM = USNFDRSFuelModel("Y")
+    with Instrumented() as Probe:
+        _RunScalar(FM, Days)
+    assert set(Probe.Timings) == {"scalar"}
+    assert set(Probe.Timings["scalar"]) == {"Drought", "FuelBed", "LiveExtinction", "Spread", "ERC", "Ignition"}
+    assert all(t >= 0 for t in Probe.Timings["scalar"].values())
+    Counters = Probe.Counters["scalar"]
+    assert Counters["Calls"] == len(Days["MC1"])
+    assert Counters["KBDI>Threshold"] == np.count_nonzero(Days["KBDI"] > KBDIThreshold)
+
+
+def test_batch_stages_and_counters(Days):
+    FM = USNFDRSFuelModel("Y")
+    MC = {Name: Days[Name] for Name in MoistureFields}
+    with Instrumented() as Probe:
+        iCalcIndexesBatch(FM, MC, Days["WS"], 2, Days["KBDI"], Days["FuelTemperature"])
+    assert set(Probe.Timings) == {"batch"}
+    assert set(Probe.Timings["batch"]) == {"Drought", "FuelBed", "Moisture", "Spread", "BI", "Ignition"}
+    Counters = Probe.Counters["batch"]
+    assert Counters["Calls"] == 1
+    assert Counters["Cells"] == len(Days["MC1"])
+    assert Counters["KBDI>Threshold"] == np.count_nonzero(Days["KBDI"] > KBDIThreshold)
+
+
+def test_nested_blocks_restore_the_previous_probe():
+    Outer = Instrumentation()
+    with Instrumented(Outer):
+        with Instrumented() as Inner:
+            assert NFDRSV4Instrument.Active is Inner
+        assert NFDRSV4Instrument.Active is Outer
+    assert NFDRSV4Instrument.Active is None
+
+
+def test_reset_and_json():
+    Probe = Instrumentation()
+    Probe.Begin("scalar")
+    Probe.Lap("Drought")
+    Probe.Count("SADEAD<=0", 3)
+    assert json.loads(Probe.ToJSON())["Counters"] == {"scalar": {"Calls": 1, "SADEAD<=0": 3}}
+    Probe.Reset()
+    assert Probe.AsDict() == {"Timings": {}, "Counters": {}}
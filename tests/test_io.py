@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+import numpy as np
+import pytest
+
+from NFDRSV4IO import IsoDate, ReadWeatherBatches
+
+Daily = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "045433.csv")
+
+
+@pytest.mark.parametrize("s, Hour, Expected", [
+    ("01/02/2000", 13, "2000-01-02T13:00:00"),
+    ("1/2/2000 7", 0, "2000-01-02T07:00:00"),
+    ("2000-01-02T07:30", 0, "2000-01-02T07:30:00"),
+    ("2000-01-02T07:00:00-07:00", 0, "2000-01-02T07:00:00"),
+    ("2000-01-02T07:00:00Z", 0, "2000-01-02T07:00:00"),
+])
+def test_iso_date(s, Hour, Expected):
+    assert IsoDate(s, Hour) == Expected
+
+
+def test_batches_concatenate_to_the_whole_file():
+    Whole = next(ReadWeatherBatches(Daily, BatchSize=10 ** 6, DailyHour=13))
+    Parts = list(ReadWeatherBatches(Daily, BatchSize=100, DailyHour=13))
+    assert all(len(p["DateTime"]) == 100 for p in Parts[:-1])
+    assert set(Whole) == {"DateTime", "MinT", "MaxT", "MnRH", "MxRH", "VPDM", "VPDA", "Rain", "FMH", "FMW"}
+    for k, v in Whole.items():
+        np.testing.assert_array_equal(np.concatenate([p[k] for p in Parts]), v)
+    assert Whole["DateTime"][0] == np.datetime64("2000-01-01T13:00:00")
+
+
+def test_start_end_and_columns():
+    Batch = next(ReadWeatherBatches(Daily, Start="2000-02-01", End="2000-03-01", Columns=["MaxT"],
+                                    DailyHour=13, Sorted=True))
+    assert set(Batch) == {"DateTime", "MaxT"}
+    Whole = next(ReadWeatherBatches(Daily, BatchSize=10 ** 6, DailyHour=13))
+    In = (Whole["DateTime"] >= np.datetime64("2000-02-01")) & (Whole["DateTime"] < np.datetime64("2000-03-01"))
+    np.testing.assert_array_equal(Batch["DateTime"], Whole["DateTime"][In])
+    np.testing.assert_array_equal(Batch["MaxT"], Whole["MaxT"][In])
+    assert str(Batch["DateTime"][0]) == "2000-02-01T13:00:00"
+    assert Batch["MaxT"].dtype == np.float64
+
+
+def test_blank_values_are_nan_and_text_columns_stay_text():
+    Text = "DateTime,Temperature(F),Station\n2000-01-01T00:00,50,A\n2000-01-01T01:00,,B\n"
+    Batch = next(ReadWeatherBatches(io.StringIO(Text)))
+    assert Batch["Temperature(F)"][0] == 50 and np.isnan(Batch["Temperature(F)"][1])
+    assert list(Batch["Station"]) == ["A", "B"]
+
+
+def test_non_numeric_value_in_a_later_batch_is_rejected():
+    Text = "DateTime,Temperature(F)\n2000-01-01T00:00,50\n2000-01-01T01:00,,\n2000-01-01T02:00,M\n"
+    Batches = ReadWeatherBatches(io.StringIO(Text), BatchSize=2)
+    First = next(Batches)
+    assert First["Temperature(F)"].dtype == np.float64
+    with pytest.raises(ValueError, match=r"Temperature\(F\).*'M'.*2000-01-01T02:00:00"):
+        next(Batches)
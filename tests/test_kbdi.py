@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+import pytest
+
+from NFDRSV4KBDI import DroughtFactor, KBDICalculator
+
+
+def test_kbdi_resumes_from_state():
+    Rng = np.random.default_rng(0)
+    Tmax = Rng.uniform(50, 105, (90, 3))
+    Rain = np.where(Rng.random((90, 3)) < 0.3, Rng.uniform(0, 1.5, (90, 3)), 0.0)
+    Dates = np.datetime64("2024-05-01") + np.arange(90)
+    Whole = KBDICalculator([20.0, 35.0, 50.0]).Extend(Tmax, Rain, Dates)
+    First = KBDICalculator([20.0, 35.0, 50.0])
+    Head = First.Extend(Tmax[:40], Rain[:40], Dates[:40])
+    Second = KBDICalculator.Loads(First.Dumps())
+    Tail = Second.Extend(Tmax[40:], Rain[40:], Dates[40:])
+    np.testing.assert_array_equal(np.vstack([Head, Tail]), Whole)
+    with pytest.raises(ValueError):
+        Second.Update(Tmax[0], Rain[0], Dates[-1])
+
+
+def test_rain_spell_threshold_and_drying():
+    KB = KBDICalculator(30.0, Initial=400.0)
+    Day1 = KB.Update(40.0, 0.15)        # cool day, spell still under the threshold
+    assert Day1[0] == 400.0
+    Day2 = KB.Update(40.0, 0.15)        # spell reaches 0.30 in: 0.10 in counts
+    assert Day2[0] == pytest.approx(390.0)
+    Day3 = KB.Update(95.0, 0.0)
+    assert Day3[0] == pytest.approx(390.0 + DroughtFactor(390.0, 95.0, 30.0))
+
+
+def test_missing_tmax_is_a_day_without_drying():
+    Tmax = np.array([[90.0, 90.0], [np.nan, 90.0], [92.0, np.nan], [88.0, 88.0]])
+    Rain = np.array([[0.0, 0.0], [0.0, 0.0], [0.0, 0.0], [0.6, 0.0]])
+    KB = KBDICalculator([30.0, 30.0], Initial=300.0)
+    Out = KB.Extend(Tmax, Rain)
+    assert not np.isnan(Out).any()
+    assert Out[1, 0] == Out[0, 0] and Out[2, 1] == Out[1, 1]
+    assert Out[3, 0] < Out[2, 0]
+    State = json.loads(KB.Dumps())
+    assert all(np.isfinite(State["KBDI"]))
+    Gapless = KBDICalculator([30.0], Initial=300.0).Extend(Tmax[[0, 2, 3], :1], Rain[[0, 2, 3], :1])
+    assert Out[3, 0] == Gapless[2, 0]
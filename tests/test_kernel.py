@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import NFDRSV4Kernel
+from NFDRSV4Kernel import AvailableBackends, CalcIndexes, CompareBackends, GetBackend, SetBackend
+
+
+@pytest.mark.parametrize("Backend", [b for b in AvailableBackends() if b != "numpy"])
+def test_backend_matches_numpy(Backend):
+    Report = CompareBackends("numpy", Backend, N=400, Seed=1)
+    assert max(Report[Name] for Name in ("ERC", "SC", "BI", "IC")) < 1e-9
+    assert not any(Report["NaNMismatches"].values())
+
+
+def test_backend_selection_and_broadcasting():
+    Previous = SetBackend("python")
+    try:
+        assert GetBackend() == "python"
+        MC = {"MC1": 5.0, "MC10": 7.0, "MC100": np.array([[10.0], [14.0]]), "MC1000": 18.0,
+              "MCHERB": 90.0, "MCWOOD": 110.0}
+        Out = CalcIndexes("Y", MC, np.array([0.0, 8.0, 20.0]), 2, 300.0, 80.0)
+        assert all(x.shape == (2, 3) for x in Out)
+        Reference = CalcIndexes("Y", MC, np.array([0.0, 8.0, 20.0]), 2, 300.0, 80.0, Backend="numpy")
+        for a, b in zip(Out, Reference):
+            np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+    finally:
+        SetBackend(Previous)
+    with pytest.raises(ValueError):
+        SetBackend("fortran")
+    if NFDRSV4Kernel.numba is None:
+        with pytest.raises(RuntimeError):
+            CalcIndexes("Y", MC, 5.0, 1, 100.0, 80.0, Backend="numba")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from NFDRSV4LFM import DayKey, JoinMap, LFMObservations, ReadNFMD
+
+NFMD = """GACC\tState\tGroup\tSite\tDate\tFuel\tPercent
+SOCC\tCA\tLA\tLaurel\t06/15/2018\tChamise, Old Growth\t71
+SOCC\tCA\tLA\tLaurel\t06/01/2018\tChamise, Old Growth\t80.5
+SOCC\tCA\tLA\tLaurel\t06/01/2018\tSage, Black\t120
+SOCC\tCA\tLA\tOlympus\t06/08/2018\tChamise, Old Growth\t
+SOCC\tCA\tLA\tOlympus\t06/22/2018\tChamise, Old Growth\t66
+"""
+
+
+@pytest.mark.parametrize("Direction", ["backward", "forward", "nearest"])
+@pytest.mark.parametrize("Tolerance", [0, 2, 5])
+def test_joinmap_matches_merge_asof(Direction, Tolerance):
+    Rng = np.random.default_rng(8)
+    Weather = np.sort(Rng.choice(np.arange(17500, 17800), 200, replace=False))
+    Obs = Rng.integers(17490, 17810, 80)
+    Idx = JoinMap(Weather, Obs, Tolerance, Direction)
+    Left = pd.DataFrame({"Day": Obs, "Order": np.arange(len(Obs))}).sort_values("Day")
+    Right = pd.DataFrame({"Day": Weather, "Row": np.arange(len(Weather))})
+    Merged = pd.merge_asof(Left, Right, on="Day", direction=Direction, tolerance=Tolerance).sort_values("Order")
+    np.testing.assert_array_equal(Idx, Merged["Row"].fillna(-1).to_numpy(dtype=np.int64))
+    with pytest.raises(ValueError):
+        JoinMap(Weather, Obs, Direction="sideways")
+
+
+def test_read_nfmd_and_select():
+    Raw = ReadNFMD(io.StringIO(NFMD))
+    assert list(Raw["Site"]) == ["Laurel", "Laurel", "Laurel", "Olympus", "Olympus"]
+    assert np.isnan(Raw["Percent"][3])
+    Obs = LFMObservations.FromNFMD(io.StringIO(NFMD))
+    assert len(Obs) == 5
+    assert Obs.Sites() == ["Laurel", "Olympus"]
+    assert Obs.Fuels("Laurel") == ["Chamise, Old Growth", "Sage, Black"]
+    Day, Percent = Obs.Select("Laurel", "Chamise, Old Growth")
+    np.testing.assert_array_equal(Day, DayKey(["2018-06-01", "2018-06-15"]))
+    np.testing.assert_array_equal(Percent, [80.5, 71])
+    assert not Percent.flags.writeable
+    assert str(Obs.Dates("Laurel", "Sage, Black")[0]) == "2018-06-01T13:00:00"
+    Day, Percent = Obs.Select(Fuel="Chamise, Old Growth")
+    np.testing.assert_array_equal(Day, DayKey(["2018-06-01", "2018-06-08", "2018-06-15", "2018-06-22"]))
+    Frame = pd.DataFrame({"Site": Raw["Site"], "Fuel": Raw["Fuel"], "Percent": Raw["Percent"],
+                          "DateTime": pd.to_datetime(Raw["Day"], unit="D") + pd.Timedelta(hours=13)})
+    FromFrame = LFMObservations.FromFrame(Frame)
+    for Name in ("Site", "Fuel", "Day"):
+        np.testing.assert_array_equal(getattr(FromFrame, Name), getattr(Obs, Name))
+
+
+def test_join_drops_missing_and_unmatched_observations():
+    Obs = LFMObservations.FromNFMD(io.StringIO(NFMD))
+    Weather = np.arange("2018-06-01", "2018-06-20", dtype="datetime64[D]")
+    Join = Obs.Join(Weather, "Olympus", "Chamise, Old Growth")
+    assert len(Join.Percent) == 0   # 06/08 is blank, 06/22 is after the weather
+    Join = Obs.Join(Weather, "Olympus", "Chamise, Old Growth", Tolerance=3)
+    np.testing.assert_array_equal(Join.ObsIndex, [1])
+    np.testing.assert_array_equal(Join.WeatherIndex, [18])
+    np.testing.assert_array_equal(Join.Percent, [66])
+    Join = Obs.Join(Weather.astype(str), "Laurel", "Chamise, Old Growth")
+    np.testing.assert_array_equal(Join.WeatherIndex, [0, 14])
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch
+from NFDRSV4Calc import USNFDRSFuelModel
+from NFDRSV4Runner import NFDRSRunner, RunStations
+
+
+@pytest.mark.parametrize("Workers", [0, 1])
+def test_custom_model_keeps_its_parameters(Days, Workers):
+    Stock = USNFDRSFuelModel("Y")
+    Custom = Stock.Replace(L1=6.0, DEPTH=1.2)
+    Results = list(RunStations({"S1": Days, "S2": Days}, ["Y", Custom], Workers=Workers))
+    assert [(r.StationID, r.FuelModel) for r in Results] == [("S1", "Y"), ("S1", Custom), ("S2", "Y"),
+                                                            ("S2", Custom)]
+    assert not np.array_equal(Results[0].ERC, Results[1].ERC)
+    assert np.array_equal(Results[1].ERC, Results[3].ERC)
+    Direct = iCalcIndexesBatch(Custom, {Name: Days[Name] for Name in MoistureFields}, Days["WS"], 1,
+                               Days["KBDI"], Days["FuelTemperature"])
+    np.testing.assert_array_equal(Results[1].ERC, Direct[0])
+
+
+@pytest.mark.parametrize("Workers", [0, 1])
+def test_cancel_before_iterating_stops_the_run(Days, Workers):
+    Runner = NFDRSRunner(Workers=Workers, ChunkSize=1)
+    Results = Runner.Run({"S1": Days, "S2": Days}, ["Y", "Z"])
+    Runner.Cancel()
+    assert list(Results) == []
+    assert Runner.Cancelled()
+    # A new run clears the earlier cancel
+    assert len(list(Runner.Run({"S1": Days}, ["Y"]))) == 1
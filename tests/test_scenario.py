@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+import pytest
+
+from NFDRSV4Batch import MoistureFields, iCalcIndexesBatch
+from NFDRSV4Calc import USNFDRSFuelModel
+from NFDRSV4Scenario import ScenarioOutputs, ScenarioSweep
+
+MC = {"MC1": [3, 8, 15], "MC10": 9, "MC100": 12, "MC1000": [12, 20], "MCHERB": [40, 120], "MCWOOD": 90}
+Swept = dict(iWS=[0, 10, 25], iSlopeCls=[1, 4], KBDI=[100, 600], FuelTemperature=85)
+
+
+def test_sweep_matches_batch_at_every_point():
+    Cube = ScenarioSweep(["Y", "V"], MC, **Swept)
+    assert Cube.Dims == ("FM", "KBDI", "MCHERB", "MC1000", "MC1", "iWS", "iSlopeCls")
+    assert Cube.shape == (2, 2, 2, 2, 3, 3, 2)
+    assert Cube.Fixed["FuelTemperature"] == 85
+    Points = list(itertools.product(*(Cube.Coords[d] for d in Cube.Dims)))
+    Columns = {d: np.array([p[k] for p in Points]) for k, d in enumerate(Cube.Dims)}
+    for Code in ("Y", "V"):
+        Rows = Columns["FM"] == Code
+        Inputs = {Name: np.asarray(Columns[Name][Rows] if Name in Cube.Dims else Cube.Fixed[Name], dtype=float)
+                  for Name in MoistureFields}
+        Expected = iCalcIndexesBatch(USNFDRSFuelModel(Code), Inputs, Columns["iWS"][Rows].astype(float),
+                                     Columns["iSlopeCls"][Rows].astype(float),
+                                     Columns["KBDI"][Rows].astype(float), 85.0)
+        for Name, e in zip(ScenarioOutputs, Expected):
+            np.testing.assert_array_equal(Cube[Name].reshape(-1)[Rows], e, err_msg="%s %s" % (Code, Name))
+
+
+def test_sel_and_frame():
+    Cube = ScenarioSweep("Y", MC, **Swept)
+    assert "FM" not in Cube.Dims
+    Slice = Cube.Sel(MCHERB=40, iSlopeCls=4)
+    assert Slice.Dims == ("KBDI", "MC1000", "MC1", "iWS")
+    assert Slice.Fixed["MCHERB"] == 40
+    np.testing.assert_array_equal(Slice["BI"], Cube["BI"][:, 0, :, :, :, 1])
+    Frame = Cube.ToFrame()
+    assert len(Frame) == np.prod(Cube.shape)
+    Row = Frame[(Frame.KBDI == 600) & (Frame.MCHERB == 120) & (Frame.MC1000 == 20) & (Frame.MC1 == 3) &
+                (Frame.iWS == 25) & (Frame.iSlopeCls == 1)]
+    assert Row["SC"].item() == Cube["SC"][1, 1, 1, 0, 2, 0]
+    with pytest.raises(KeyError):
+        Cube.Sel(MCHERB=41)
+    with pytest.raises(KeyError):
+        Cube.Sel(FM="Y")
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+import pytest
+
+from NFDRSV4Service import IndexService, ParseRequest, Query, ComputeBatch, RequestFields, StartServer
+
+
+def _Requests(Days, n=20):
+    return [dict({Name: float(Days[Name][i]) for Name in RequestFields if Name != "SlopeCls"},
+                 FM="VWXYZ"[i % 5], SlopeCls=1 + i % 5) for i in range(n)]
+
+
+def test_http_requests_are_batched(Days):
+    Requests = _Requests(Days)
+
+    async def Session():
+        Service = IndexService(Window=0.05)
+        Server = await StartServer(Service)
+        Port = Server.sockets[0].getsockname()[1]
+        async with Server:
+            Replies = await asyncio.gather(*[Query(r, Port=Port) for r in Requests[:10]],
+                                           Query(Requests[10:], Port=Port),
+                                           Query(dict(Requests[0], FM="ZZ"), Port=Port))
+            await Service.Drain()
+        return Replies, Service.Stats()
+
+    Replies, Stats = asyncio.run(Session())
+    Expected = ComputeBatch([ParseRequest(r) for r in Requests])
+    assert [Body for _, Body in Replies[:10]] == Expected[:10]
+    assert Replies[10] == (200, Expected[10:])
+    assert Replies[11][0] == 400 and "Unknown fuel model" in Replies[11][1]["error"]
+    assert Stats["Requests"] == len(Requests)
+    assert Stats["Batches"] < Stats["Requests"]
+
+
+def test_fuel_model_codes_are_normalized(Days):
+    Request = _Requests(Days, 1)[0]
+    assert ParseRequest(dict(Request, FM=" v ")) == ParseRequest(Request)
+    with pytest.raises(ValueError, match="Unknown fuel model"):
+        ParseRequest(dict(Request, FM=7))
+
+
+@pytest.mark.parametrize("Value", [float("nan"), float("inf"), "-inf", "NaN"])
+def test_non_finite_inputs_are_rejected(Days, Value):
+    with pytest.raises(ValueError, match="KBDI must be finite"):
+        ParseRequest(dict(_Requests(Days, 1)[0], KBDI=Value))
+
+
+def test_bad_content_length_is_a_bad_request(Days):
+    Body = json.dumps(_Requests(Days, 1)[0]).encode()
+
+    async def Session():
+        Server = await StartServer(IndexService(Window=0))
+        Port = Server.sockets[0].getsockname()[1]
+        async with Server:
+            Replies = []
+            for Length in ("abc", "-5"):
+                Reader, Writer = await asyncio.open_connection("127.0.0.1", Port)
+                Writer.write(("POST /indexes HTTP/1.1\r\nContent-Length: %s\r\n\r\n" % Length).encode() + Body)
+                await Writer.drain()
+                Replies.append(await Reader.read())
+                Writer.close()
+            # A NaN sent by a client is rejected rather than answered with invalid JSON
+            Replies.append(await Query(dict(_Requests(Days, 1)[0], WS=float("nan")), Port=Port))
+        return Replies
+
+    Bad, Negative, NaN = asyncio.run(Session())
+    for Reply in (Bad, Negative):
+        assert Reply.startswith(b"HTTP/1.1 400 ")
+        assert json.loads(Reply.split(b"\r\n\r\n", 1)[1]) == {"error": "Invalid Content-Length"}
+    assert NaN[0] == 400 and "WS must be finite" in NaN[1]["error"]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from NFDRSV4Store import ResultColumns, ResultStore
+
+
+## \fn _Values Distinct float32-exact column values for a run of days
+def _Values(n, Base):
+    return {Name: Base + k * 1000 + np.arange(n, dtype=np.float64) for k, Name in enumerate(ResultColumns)}
+
+
+def test_append_read_and_reopen(tmp_path):
+    Root = str(tmp_path / "store")
+    with ResultStore(Root) as Store:
+        Store.Append("045433", "Y", "2018-01-01", **_Values(40, 0))
+        Store.Append("045433", "Y", "2018-02-10", **_Values(20, 40))   # extends the run
+        Store.Append("045433", "V", "2018-01-01", **_Values(10, 500))
+        Store.Append("045433", "Y", "2018-04-01", **_Values(5, 900))   # after a gap
+        assert len(Store.Segments("045433", "Y")) == 2
+    Store = ResultStore(Root)
+    assert len(Store) == 75
+    assert Store.Keys() == [("045433", "V"), ("045433", "Y")]
+    assert Store.DateRange("045433", "Y") == (np.datetime64("2018-01-01"), np.datetime64("2018-04-06"))
+    Run = Store.Read("045433", "Y", Start="2018-01-31", End="2018-02-15")
+    assert isinstance(Run["ERC"], np.memmap)
+    np.testing.assert_array_equal(Run["ERC"], np.arange(30, 45))
+    np.testing.assert_array_equal(Run["SC"], 1000 + np.arange(30, 45))
+    Gap = Store.Read("045433", "Y", Columns=("BI",), Start="2018-02-27", End="2018-04-03")
+    assert set(Gap) == {"Date", "BI"} and len(Gap["Date"]) == 35
+    np.testing.assert_array_equal(Gap["BI"][:3], 2000 + np.arange(57, 60))
+    assert np.isnan(Gap["BI"][3:-2]).all()
+    np.testing.assert_array_equal(Gap["BI"][-2:], 2900 + np.arange(2))
+    np.testing.assert_array_equal(Store.Read("045433", "V")["IC"], 3500 + np.arange(10))
+    assert Store.Quantile("045433", "Y", 0.5, Start="2018-01-01", End="2018-01-11") == 4.5
+
+
+def test_overlapping_and_malformed_appends_are_rejected(tmp_path):
+    Store = ResultStore(str(tmp_path))
+    Store.Append(1, "Y", "2018-01-01", **_Values(10, 0))
+    with pytest.raises(ValueError, match="already has days"):
+        Store.Append(1, "Y", "2018-01-05", **_Values(10, 0))
+    with pytest.raises(ValueError, match="columns"):
+        Store.Append(1, "Y", "2018-02-01", ERC=np.zeros(3))
+    Bad = _Values(3, 0)
+    Bad["IC"] = np.zeros(2)
+    with pytest.raises(ValueError, match="same length"):
+        Store.Append(1, "Y", "2018-02-01", **Bad)
+    with pytest.raises(KeyError):
+        Store.Read(1, "Z")
+    assert len(ResultStore(str(tmp_path))) == 10